@@ -1,16 +1,142 @@
+import csv
+import io
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from enum import Enum
 from pathlib import Path
+from typing import Iterator, Optional
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from prometheus_client import Gauge
+from utils.arrow_export import (
+    build_schema,
+    build_select_columns,
+    generate_columnar_stream,
+)
+from utils.async_db_manager import AsyncPowerPlantDBManager
+from utils.async_db_pool import AsyncPowerPlantDBPool
+from utils.bulk_ingestion import parse_bulk_payload, validate_rows
 from utils.db_manager import PowerPlantDBManager
+from utils.db_pool import PoolTimeoutError, PowerPlantDBPool
+from utils.json_response import ORJSONResponse
 from utils.logger import get_logger
+from utils.metrics import metrics_middleware, metrics_response, stage_timer
 from utils.power_plant_data import PowerPlantData
-
-app = FastAPI()
-
+from utils.row_filter import RowFilter
+from utils.serialization import rows_to_ndjson
 
 logger = get_logger(Path(__file__).stem)
 
 TABLE_NAME = "powerplant"
+BULK_MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS", 100000))
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 10000))
+EXPORT_POOL_MAX_SIZE = int(os.environ.get("EXPORT_POOL_MAX_SIZE", 2))
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ColumnarFormat(str, Enum):
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One async connection pool per worker process, shared by all the requests it serves. The streamed exports
+    # run in the threadpool with blocking server-side cursors, so they get their own small synchronous pool
+    app.state.async_db_pool = AsyncPowerPlantDBPool()
+    await app.state.async_db_pool.open()
+    app.state.db_pool = PowerPlantDBPool(min_size=1, max_size=EXPORT_POOL_MAX_SIZE)
+    yield
+    app.state.db_pool.close()
+    await app.state.async_db_pool.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.middleware("http")(metrics_middleware)
+
+# Connection pool metrics, computed when scraped
+DB_POOL_CONNECTIONS_IN_USE = Gauge("db_pool_connections_in_use", "Connections currently checked out", ["pool"])
+DB_POOL_MEAN_CHECKOUT_WAIT = Gauge(
+    "db_pool_mean_checkout_wait_seconds", "Mean time waited to check out a connection", ["pool"]
+)
+for pool_name, pool_attribute in [("requests", "async_db_pool"), ("exports", "db_pool")]:
+    DB_POOL_CONNECTIONS_IN_USE.labels(pool=pool_name).set_function(
+        lambda attribute=pool_attribute: (
+            getattr(app.state, attribute).stats()["in_use"] if hasattr(app.state, attribute) else 0
+        )
+    )
+    DB_POOL_MEAN_CHECKOUT_WAIT.labels(pool=pool_name).set_function(
+        lambda attribute=pool_attribute: (
+            getattr(app.state, attribute).stats()["mean_checkout_wait_seconds"] if hasattr(app.state, attribute) else 0
+        )
+    )
+
+
+async def get_db_manager(request: Request):
+    """Yields an AsyncPowerPlantDBManager borrowing a connection from the pool, returning it once the request is done.
+
+    Args:
+        request (Request): Incoming request, used to access the application's connection pool.
+
+    Yields:
+        AsyncPowerPlantDBManager: Database manager using a pooled connection.
+    """
+    async with AsyncPowerPlantDBManager(pool=request.app.state.async_db_pool) as powerplant_db_manager:
+        yield powerplant_db_manager
+
+
+def get_row_filter(
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    plant_id: Optional[int] = None,
+    value_range: Optional[list[str]] = Query(None),
+) -> RowFilter:
+    """Builds the RowFilter of the endpoints reading a subset of the rows from their query parameters.
+
+    Args:
+        start_id (Optional[int], optional): If given, only rows with an id greater or equal to this one are
+            included. Defaults to None.
+        end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are included.
+            Defaults to None.
+        start_time (Optional[datetime], optional): If given, only rows recorded at or after this time are included.
+            Needs the table to have a time column. Defaults to None.
+        end_time (Optional[datetime], optional): If given, only rows recorded before this time are included. Needs
+            the table to have a time column. Defaults to None.
+        plant_id (Optional[int], optional): If given, only rows of this plant are included. Needs the table to have
+            a plant column. Defaults to None.
+        value_range (Optional[list[str]], optional): Inclusive value ranges formatted as column:min:max, where min
+            or max can be left empty, can be repeated. E.g. temperature:10:20. Defaults to None.
+
+    Returns:
+        RowFilter: Filter to apply.
+    """
+    try:
+        value_ranges = RowFilter.parse_value_ranges(value_range)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return RowFilter(
+        start_id=start_id,
+        end_id=end_id,
+        start_time=start_time,
+        end_time=end_time,
+        plant_id=plant_id,
+        value_ranges=value_ranges,
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, error: PoolTimeoutError) -> JSONResponse:
+    logger.warning(f"Rejecting request to {request.url.path}: {error}")
+    return JSONResponse(status_code=503, content={"detail": str(error)}, headers={"Retry-After": "1"})
 
 
 @app.get("/")
@@ -19,46 +145,371 @@ def read_root():
 
 
 @app.post("/power_plant_data/add")
-async def add_power_plant_data(powerplant_data: PowerPlantData) -> dict:
+async def add_power_plant_data(
+    powerplant_data: PowerPlantData, powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager)
+) -> dict:
     logger.info(f"Adding new row of data to Power Plant database")
-    powerplant_db_manager = PowerPlantDBManager()
-    powerplant_db_manager.insert_row(table_name=TABLE_NAME, args_dict=powerplant_data.to_dict())
+    await powerplant_db_manager.insert_row(table_name=TABLE_NAME, args_dict=powerplant_data.to_dict())
     return {"data_added": powerplant_data.to_dict()}
 
 
+@app.post("/power_plant_data/add_bulk")
+async def add_power_plant_data_bulk(request: Request) -> dict:
+    """Adds multiple rows of data in a single transaction, loading them with COPY.
+
+    The body can be a JSON array of objects (application/json), one JSON object per line (application/x-ndjson),
+    or a CSV file with a header (text/csv). Each row is validated as PowerPlantData, invalid rows are reported
+    back and the valid ones are inserted. A pooled connection is only borrowed for the COPY, so slow or large
+    uploads don't hold one while they are received and parsed.
+
+    Args:
+        request (Request): Incoming request containing the rows to add.
+
+    Returns:
+        dict: Dictionary containing the amount of rows accepted and rejected, the rejection reasons and the elapsed
+            time in seconds.
+    """
+    time_start = time.perf_counter()
+    try:
+        rows = parse_bulk_payload(await request.body(), request.headers.get("content-type", "application/json"))
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=f"Could not parse bulk payload: {error}")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Got {len(rows)} rows, the maximum is {BULK_MAX_ROWS}")
+
+    accepted, rejected = validate_rows(rows, PowerPlantData)
+    logger.info(f"Adding {len(accepted)} rows of data to Power Plant database, {len(rejected)} rows rejected")
+    async with AsyncPowerPlantDBManager(pool=request.app.state.async_db_pool) as powerplant_db_manager:
+        rows_inserted = await powerplant_db_manager.copy_rows(table_name=TABLE_NAME, rows=accepted)
+    return {
+        "rows_accepted": rows_inserted,
+        "rows_rejected": len(rejected),
+        "rejected": rejected,
+        "elapsed_seconds": time.perf_counter() - time_start,
+    }
+
+
 @app.get("/power_plant_data/column_names")
-async def get_power_plant_column_names(return_id: bool = False) -> dict:
-    powerplant_db_manager = PowerPlantDBManager()
-    column_names = powerplant_db_manager.retrieve_column_names(table_name=TABLE_NAME, ignore_id=not return_id)
+async def get_power_plant_column_names(
+    return_id: bool = False, powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager)
+) -> dict:
+    column_names = await powerplant_db_manager.retrieve_column_names(table_name=TABLE_NAME, ignore_id=not return_id)
     return {"column_names": column_names}
 
 
 @app.get("/power_plant_data/column_types")
-async def get_power_plant_column_types(return_id: bool = False) -> dict:
-    powerplant_db_manager = PowerPlantDBManager()
-    column_names = powerplant_db_manager.retrieve_column_types(table_name=TABLE_NAME, ignore_id=not return_id)
+async def get_power_plant_column_types(
+    return_id: bool = False, powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager)
+) -> dict:
+    column_names = await powerplant_db_manager.retrieve_column_types(table_name=TABLE_NAME, ignore_id=not return_id)
     return column_names
 
 
 @app.get("/power_plant_data/total_rows")
-async def get_power_plant_rows() -> dict:
-    powerplant_db_manager = PowerPlantDBManager()
-    row_count = powerplant_db_manager.count_rows(table_name=TABLE_NAME)
+async def get_power_plant_rows(powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager)) -> dict:
+    row_count = await powerplant_db_manager.count_rows(table_name=TABLE_NAME)
     return {"rows": row_count}
 
 
+@app.get("/power_plant_data/id_range")
+async def get_power_plant_id_range(
+    powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager),
+) -> dict:
+    return await powerplant_db_manager.retrieve_id_range(table_name=TABLE_NAME)
+
+
+@app.get("/power_plant_data/fingerprint")
+async def get_power_plant_fingerprint(
+    end_id: Optional[int] = None, powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager)
+) -> dict:
+    return await powerplant_db_manager.retrieve_fingerprint(table_name=TABLE_NAME, end_id=end_id)
+
+
 @app.get("/power_plant_data/retrieve_range")
-async def get_plants(skip: int = 0, limit: int = 100) -> dict:
-    powerplant_db_manager = PowerPlantDBManager()
-    row_info = powerplant_db_manager.retrieve_rows(table_name=TABLE_NAME, limit=limit, offset=skip)
-    return row_info
+async def get_plants(
+    skip: int = 0, limit: int = 100, powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager)
+) -> ORJSONResponse:
+    row_info = await powerplant_db_manager.retrieve_rows(table_name=TABLE_NAME, limit=limit, offset=skip)
+    return ORJSONResponse(row_info)
+
+
+@app.get("/power_plant_data/retrieve_page")
+async def get_plants_page(
+    after_id: int = 0,
+    limit: int = 100,
+    end_id: Optional[int] = None,
+    powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager),
+) -> ORJSONResponse:
+    """Retrieves a page of rows ordered by id. Unlike retrieve_range, the cost of a page doesn't grow with its
+    position in the table.
+
+    Args:
+        after_id (int, optional): Only rows with an id greater than this one are returned. Use the next_cursor of the
+            previous page to get the next one. Defaults to 0.
+        limit (int, optional): Maximum amount of rows to return. Defaults to 100.
+        end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are returned.
+            Defaults to None.
+
+    Returns:
+        ORJSONResponse: JSON object containing the rows indexed by id and the next_cursor (null once there are no
+            more rows).
+    """
+    rows, next_cursor = await powerplant_db_manager.retrieve_rows_after(
+        table_name=TABLE_NAME, after_id=after_id, limit=limit, end_id=end_id
+    )
+    return ORJSONResponse({"rows": rows, "next_cursor": next_cursor})
+
+
+@app.get("/power_plant_data/retrieve_filtered")
+async def get_plants_filtered(
+    after_id: int = 0,
+    limit: int = 100,
+    row_filter: RowFilter = Depends(get_row_filter),
+    powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager),
+) -> ORJSONResponse:
+    """Retrieves a page of the rows matching a filter on their id, time, plant or values (see get_row_filter), ordered
+    by id. The filters use the table's indexes, created by the database initialization script.
+
+    Args:
+        after_id (int, optional): Only rows with an id greater than this one are returned. Use the next_cursor of the
+            previous page to get the next one. Defaults to 0.
+        limit (int, optional): Maximum amount of rows to return. Defaults to 100.
+        row_filter (RowFilter): Conditions the rows need to match.
+
+    Returns:
+        ORJSONResponse: JSON object containing the rows indexed by id and the next_cursor (null once there are no
+            more rows).
+    """
+    try:
+        rows, next_cursor = await powerplant_db_manager.retrieve_filtered_rows(
+            table_name=TABLE_NAME, row_filter=row_filter, after_id=after_id, limit=limit
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return ORJSONResponse({"rows": rows, "next_cursor": next_cursor})
+
+
+@app.get("/power_plant_data/summary")
+async def get_plants_summary(
+    columns: Optional[list[str]] = Query(None),
+    quantiles: Optional[list[float]] = Query(None),
+    bins: int = 10,
+    row_filter: RowFilter = Depends(get_row_filter),
+    powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager),
+) -> ORJSONResponse:
+    """Returns summary statistics of the numeric columns, computed by the database in a single pass over the rows.
+    The rows can be filtered with the parameters of get_row_filter (id, time, plant and value ranges).
+
+    Args:
+        columns (Optional[list[str]], optional): Columns to summarize, can be repeated. If None, all the numeric
+            columns are summarized. Defaults to None.
+        quantiles (Optional[list[float]], optional): Quantiles to compute, can be repeated. If None, the quartiles
+            are computed. Defaults to None.
+        bins (int, optional): Amount of equal width histogram buckets between each column's min and max, 0 to skip
+            the histograms. Defaults to 10.
+        row_filter (RowFilter): Conditions the summarized rows need to match.
+
+    Returns:
+        ORJSONResponse: JSON object containing the amount of rows and the count, mean, std, min, max, quantiles and
+            histogram of each column.
+    """
+    try:
+        summary = await powerplant_db_manager.retrieve_summary(
+            table_name=TABLE_NAME, columns=columns, quantiles=quantiles, bins=bins, row_filter=row_filter
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return ORJSONResponse(summary)
+
+
+@app.get("/power_plant_data/downsample")
+async def get_plants_downsampled(
+    columns: Optional[list[str]] = Query(None),
+    points: int = 500,
+    bucket_size: Optional[int] = None,
+    time_bucket: Optional[str] = None,
+    row_filter: RowFilter = Depends(get_row_filter),
+    powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager),
+) -> ORJSONResponse:
+    """Returns a downsampled series of the numeric columns, grouping consecutive ids (or the rows recorded in the
+    same period of time) in buckets and aggregating each bucket to its mean, min and max in the database. The rows
+    can be filtered with the parameters of get_row_filter (id, time, plant and value ranges).
+
+    Args:
+        columns (Optional[list[str]], optional): Columns to downsample, can be repeated. If None, all the numeric
+            columns are downsampled. Defaults to None.
+        points (int, optional): Approximate amount of buckets to return, used when bucket_size isn't given.
+            Defaults to 500.
+        bucket_size (Optional[int], optional): Amount of consecutive ids per bucket. Defaults to None.
+        time_bucket (Optional[str], optional): If given, rows are grouped by the minute, hour, day, week, month or
+            year they were recorded in instead. Needs the table to have a time column. Defaults to None.
+        row_filter (RowFilter): Conditions the downsampled rows need to match.
+
+    Returns:
+        ORJSONResponse: JSON object containing the bucket size or time bucket and, as one list per field, the start
+            time (for time buckets), first and last id and amount of rows of each bucket and the mean, min and max
+            of each column.
+    """
+    try:
+        downsampled = await powerplant_db_manager.retrieve_downsampled(
+            table_name=TABLE_NAME,
+            columns=columns,
+            points=points,
+            bucket_size=bucket_size,
+            time_bucket=time_bucket,
+            row_filter=row_filter,
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return ORJSONResponse(downsampled)
+
+
+def generate_export(
+    db_pool: PowerPlantDBPool,
+    export_format: ExportFormat,
+    start_id: Optional[int],
+    end_id: Optional[int],
+    chunk_size: int,
+) -> Iterator[bytes]:
+    # The generator outlives the request handler, so it borrows (and returns) its own pooled connection
+    with PowerPlantDBManager(pool=db_pool) as powerplant_db_manager:
+        header_written = False
+        for columns, rows in powerplant_db_manager.stream_rows(
+            table_name=TABLE_NAME, start_id=start_id, end_id=end_id, chunk_size=chunk_size
+        ):
+            with stage_timer(f"{export_format.value}_serialization"):
+                if export_format is ExportFormat.csv:
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    if not header_written:
+                        writer.writerow(columns)
+                        header_written = True
+                    writer.writerows(rows)
+                    chunk = buffer.getvalue().encode()
+                else:
+                    chunk = rows_to_ndjson(columns, rows)
+            yield chunk
+
+
+@app.get("/power_plant_data/export")
+def export_plants(
+    request: Request,
+    export_format: ExportFormat = ExportFormat.ndjson,
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> StreamingResponse:
+    """Streams the whole table, or an id range of it, as NDJSON or CSV. Rows are read from the database in chunks
+    through a server-side cursor, so memory usage stays flat regardless of the table size.
+
+    Args:
+        request (Request): Incoming request, used to access the application's connection pool.
+        export_format (ExportFormat, optional): Either ndjson or csv. Defaults to ndjson.
+        start_id (Optional[int], optional): If given, only rows with an id greater or equal to this one are
+            exported. Defaults to None.
+        end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are exported.
+            Defaults to None.
+        chunk_size (int, optional): Amount of rows read from the database at a time. Defaults to EXPORT_CHUNK_SIZE.
+
+    Returns:
+        StreamingResponse: Streamed rows.
+    """
+    media_type = "text/csv" if export_format is ExportFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        generate_export(request.app.state.db_pool, export_format, start_id, end_id, chunk_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={TABLE_NAME}.{export_format.value}"},
+    )
+
+
+def generate_columnar_export(
+    db_pool: PowerPlantDBPool,
+    columnar_format: ColumnarFormat,
+    start_id: Optional[int],
+    end_id: Optional[int],
+    chunk_size: int,
+) -> Iterator[bytes]:
+    with PowerPlantDBManager(pool=db_pool) as powerplant_db_manager:
+        column_types = powerplant_db_manager.retrieve_column_types(table_name=TABLE_NAME, ignore_id=False)
+        row_chunks = (
+            rows
+            for _, rows in powerplant_db_manager.stream_rows(
+                table_name=TABLE_NAME,
+                start_id=start_id,
+                end_id=end_id,
+                chunk_size=chunk_size,
+                select_columns=build_select_columns(column_types),
+            )
+        )
+        yield from generate_columnar_stream(row_chunks, build_schema(column_types), columnar_format.value)
+
+
+@app.get("/power_plant_data/export_columnar")
+def export_plants_columnar(
+    request: Request,
+    columnar_format: ColumnarFormat = ColumnarFormat.arrow,
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> StreamingResponse:
+    """Streams the whole table, or an id range of it, as an Arrow IPC stream or a Parquet file with typed columns,
+    which is much smaller and faster to decode than JSON for large amounts of rows.
+
+    Args:
+        request (Request): Incoming request, used to access the application's connection pool.
+        columnar_format (ColumnarFormat, optional): Either arrow or parquet. Defaults to arrow.
+        start_id (Optional[int], optional): If given, only rows with an id greater or equal to this one are
+            exported. Defaults to None.
+        end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are exported.
+            Defaults to None.
+        chunk_size (int, optional): Amount of rows per record batch (Arrow) or row group (Parquet).
+            Defaults to EXPORT_CHUNK_SIZE.
+
+    Returns:
+        StreamingResponse: Streamed table.
+    """
+    if columnar_format is ColumnarFormat.arrow:
+        media_type = "application/vnd.apache.arrow.stream"
+    else:
+        media_type = "application/vnd.apache.parquet"
+    return StreamingResponse(
+        generate_columnar_export(request.app.state.db_pool, columnar_format, start_id, end_id, chunk_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={TABLE_NAME}.{columnar_format.value}"},
+    )
 
 
 @app.get("/power_plant_data/{id}")
-async def get_plant(id: int) -> dict:
-    powerplant_db_manager = PowerPlantDBManager()
-    row_info = powerplant_db_manager.retrieve_row(table_name=TABLE_NAME, row_id=id)
-    return row_info
+async def get_plant(
+    id: int, powerplant_db_manager: AsyncPowerPlantDBManager = Depends(get_db_manager)
+) -> ORJSONResponse:
+    row_info = await powerplant_db_manager.retrieve_row(table_name=TABLE_NAME, row_id=id)
+    return ORJSONResponse(row_info)
+
+
+@app.get("/db_pool/stats")
+def get_db_pool_stats(request: Request) -> dict:
+    """Returns the connection pool metrics, including checkout counts and wait times.
+
+    Args:
+        request (Request): Incoming request, used to access the application's connection pools.
+
+    Returns:
+        dict: Dictionary containing the metrics of the pool used by the request handlers and of the one used by the
+            streamed exports.
+    """
+    return {"requests": request.app.state.async_db_pool.stats(), "exports": request.app.state.db_pool.stats()}
+
+
+@app.get("/metrics")
+def get_metrics() -> Response:
+    """Returns the metrics in the Prometheus text format: request latencies per route, latencies of the internal
+    stages (connection checkout, SQL execution and serialization) and the connection pool state.
+
+    Returns:
+        Response: Metrics in the Prometheus text format.
+    """
+    return metrics_response()
 
 
 @app.get("/health")
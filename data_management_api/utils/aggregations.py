@@ -0,0 +1,198 @@
+import math
+from typing import Optional
+
+# Data types (as reported by information_schema) that can be aggregated
+NUMERIC_DATA_TYPES = {"bigint", "double precision", "integer", "numeric", "real", "smallint"}
+# Units time buckets can be truncated to
+TIME_BUCKETS = ("minute", "hour", "day", "week", "month", "year")
+
+
+def select_numeric_columns(
+    column_types: dict, columns: Optional[list[str]] = None, excluded_columns: tuple[str, ...] = ()
+) -> list[str]:
+    """Returns the columns to aggregate, checking they exist and are numeric.
+
+    Args:
+        column_types (dict): Column names and their PostgreSQL data types, without the id.
+        columns (Optional[list[str]], optional): Requested columns. If None, all the numeric columns are used.
+            Defaults to None.
+        excluded_columns (tuple[str, ...], optional): Numeric columns that can't be aggregated, e.g. identifiers.
+            Defaults to ().
+
+    Raises:
+        ValueError: If a requested column doesn't exist or isn't numeric.
+
+    Returns:
+        list[str]: Columns to aggregate, in the table order.
+    """
+    numeric_columns = [
+        column
+        for column, data_type in column_types.items()
+        if data_type in NUMERIC_DATA_TYPES and column not in excluded_columns
+    ]
+    if columns is None:
+        return numeric_columns
+    invalid_columns = [column for column in columns if column not in numeric_columns]
+    if invalid_columns:
+        raise ValueError(f"Columns {invalid_columns} can't be aggregated, available columns: {numeric_columns}")
+    return [column for column in numeric_columns if column in columns]
+
+
+def build_summary_query(table_name: str, columns: list[str], condition: str, quantiles_param: str) -> str:
+    # A single scan computing every statistic of every column
+    statistics = ["COUNT(*)"]
+    for column in columns:
+        value = f"{column}::double precision"
+        statistics += [
+            f"COUNT({column})",
+            f"AVG({value})",
+            f"STDDEV_SAMP({value})",
+            f"MIN({value})",
+            f"MAX({value})",
+            f"PERCENTILE_CONT({quantiles_param}::double precision[]) WITHIN GROUP (ORDER BY {value})",
+        ]
+    return f"SELECT {', '.join(statistics)} FROM {table_name} {condition}"
+
+
+def parse_summary(values: tuple, columns: list[str], quantiles: list[float]) -> dict:
+    """Converts the result of the summary query into a dictionary per column.
+
+    Args:
+        values (tuple): Values returned by the summary query.
+        columns (list[str]): Summarized columns.
+        quantiles (list[float]): Computed quantiles.
+
+    Returns:
+        dict: Dictionary containing the amount of rows and the statistics of each column.
+    """
+    summary = {"rows": values[0], "columns": {}}
+    for position, column in enumerate(columns):
+        count, mean, std, minimum, maximum, quantile_values = values[1 + position * 6 : 7 + position * 6]
+        summary["columns"][column] = {
+            "count": count,
+            "mean": mean,
+            "std": std,
+            "min": minimum,
+            "max": maximum,
+            "quantiles": dict(zip(map(str, quantiles), quantile_values or [None] * len(quantiles))),
+        }
+    return summary
+
+
+def build_histogram_query(
+    table_name: str, columns: list[str], limits: list[tuple[float, float]], condition: str, params: list, bins: int
+) -> str:
+    """Builds the query counting the values of each column falling in each of `bins` equal width buckets between
+    the column's minimum and maximum, in a single scan.
+
+    Args:
+        table_name (str): Name of the table.
+        columns (list[str]): Columns for which to compute the histogram.
+        limits (list[tuple[float, float]]): Minimum and maximum of each column.
+        condition (str): WHERE clause restricting the rows.
+        params (list): Query parameters already used by the condition, to which the amount of bins and the limits
+            are appended.
+        bins (int): Amount of buckets.
+
+    Returns:
+        str: Query returning the column position, the bucket (from 1 to bins) and the amount of values in it.
+    """
+    params.append(bins)
+    bins_param = f"${len(params)}"
+    values = []
+    for position, (column, (low, high)) in enumerate(zip(columns, limits)):
+        params += [low, high]
+        values.append(
+            f"({position}, {column}::double precision, ${len(params) - 1}::double precision, "
+            f"${len(params)}::double precision)"
+        )
+    # The maximum falls in bucket bins + 1 for width_bucket, it's counted in the last bucket instead
+    row_condition = "v.value IS NOT NULL AND v.high > v.low"
+    condition = f"{condition} AND {row_condition}" if condition else f"WHERE {row_condition}"
+    return f"""SELECT v.position, LEAST(WIDTH_BUCKET(v.value, v.low, v.high, {bins_param}), {bins_param}), COUNT(*)
+        FROM {table_name} CROSS JOIN LATERAL (VALUES {', '.join(values)}) AS v(position, value, low, high)
+        {condition}
+        GROUP BY 1, 2"""
+
+
+def histogram_edges(low: float, high: float, bins: int) -> list[float]:
+    if high <= low:
+        return [low, high]
+    width = (high - low) / bins
+    return [low + bucket * width for bucket in range(bins)] + [high]
+
+
+def bucket_size_for_points(min_id: int, max_id: int, points: int) -> int:
+    return max(1, math.ceil((max_id - min_id + 1) / points))
+
+
+def build_downsample_query(
+    table_name: str,
+    columns: list[str],
+    condition: str,
+    params: list,
+    bucket_size: Optional[int] = None,
+    time_column: Optional[str] = None,
+    time_bucket: Optional[str] = None,
+) -> str:
+    """Builds the query grouping the rows in buckets, either of `bucket_size` consecutive ids or of the rows recorded
+    in the same `time_bucket`, returning the id range, amount of rows and the mean, minimum and maximum of each
+    column for each bucket.
+
+    Args:
+        table_name (str): Name of the table.
+        columns (list[str]): Columns to downsample.
+        condition (str): WHERE clause restricting the rows.
+        params (list): Query parameters already used by the condition, to which the bucket size or time bucket is
+            appended.
+        bucket_size (Optional[int], optional): Amount of consecutive ids per bucket. Defaults to None.
+        time_column (Optional[str], optional): Column containing the time of each row, needed for time buckets.
+            Defaults to None.
+        time_bucket (Optional[str], optional): Unit the time column is truncated to, one of TIME_BUCKETS. If given,
+            the query starts with the start time of each bucket. Defaults to None.
+
+    Returns:
+        str: Downsampling query, ordered by bucket.
+    """
+    statistics = ["MIN(id)", "MAX(id)", "COUNT(*)"]
+    for column in columns:
+        value = f"{column}::double precision"
+        statistics += [f"AVG({value})", f"MIN({value})", f"MAX({value})"]
+    if time_bucket is not None:
+        params.append(time_bucket)
+        bucket = f"DATE_TRUNC(${len(params)}, {time_column})"
+        statistics.insert(0, bucket)
+    else:
+        params.append(bucket_size)
+        bucket = f"id / ${len(params)}"
+    return f"""SELECT {', '.join(statistics)} FROM {table_name} {condition}
+        GROUP BY {bucket} ORDER BY {bucket}"""
+
+
+def parse_downsampled(
+    records: list[tuple], columns: list[str], bucket_size: Optional[int] = None, time_bucket: Optional[str] = None
+) -> dict:
+    """Converts the result of the downsampling query into column oriented lists, which are more compact than a
+    dictionary per bucket.
+
+    Args:
+        records (list[tuple]): Rows returned by the downsampling query.
+        columns (list[str]): Downsampled columns.
+        bucket_size (Optional[int], optional): Amount of consecutive ids per bucket. Defaults to None.
+        time_bucket (Optional[str], optional): Unit the time column was truncated to. Defaults to None.
+
+    Returns:
+        dict: Dictionary containing the bucket size or time bucket, the start time (for time buckets), first and
+            last id and amount of rows of each bucket, and the mean, min and max of each column per bucket.
+    """
+    values = list(zip(*records)) if records else [()] * (3 + 3 * len(columns) + (time_bucket is not None))
+    downsampled = {"bucket_size": bucket_size, "time_bucket": time_bucket}
+    if time_bucket is not None:
+        downsampled["start_time"] = list(values.pop(0))
+    downsampled.update(start_id=list(values[0]), end_id=list(values[1]), count=list(values[2]), columns={})
+    for position, column in enumerate(columns):
+        downsampled["columns"][column] = {
+            statistic: list(values[3 + position * 3 + offset])
+            for offset, statistic in enumerate(["mean", "min", "max"])
+        }
+    return downsampled
@@ -0,0 +1,109 @@
+import io
+from typing import Iterable, Iterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# PostgreSQL data types (as reported by information_schema) mapped to the type they are cast to when queried,
+# and the Arrow type used to represent them
+POSTGRESQL_ARROW_TYPES = {
+    "bigint": ("bigint", pa.int64()),
+    "boolean": ("boolean", pa.bool_()),
+    "character": ("text", pa.string()),
+    "character varying": ("text", pa.string()),
+    "date": ("date", pa.date32()),
+    "double precision": ("double precision", pa.float64()),
+    "integer": ("integer", pa.int32()),
+    "numeric": ("double precision", pa.float64()),
+    "real": ("real", pa.float32()),
+    "smallint": ("smallint", pa.int16()),
+    "text": ("text", pa.string()),
+    "timestamp with time zone": ("timestamp with time zone", pa.timestamp("us", tz="UTC")),
+    "timestamp without time zone": ("timestamp without time zone", pa.timestamp("us")),
+}
+
+
+def build_select_columns(column_types: dict) -> list[str]:
+    """Builds the select expressions casting each column to a type that maps directly to Arrow (e.g. NUMERIC is
+    cast to DOUBLE PRECISION, which avoids converting Python Decimal objects one by one).
+
+    Args:
+        column_types (dict): Column names and their PostgreSQL data types.
+
+    Returns:
+        list[str]: Select expressions.
+    """
+    return [
+        f"{column}::{POSTGRESQL_ARROW_TYPES.get(data_type, ('text', None))[0]} AS {column}"
+        for column, data_type in column_types.items()
+    ]
+
+
+def build_schema(column_types: dict) -> pa.Schema:
+    """Builds the Arrow schema for a table.
+
+    Args:
+        column_types (dict): Column names and their PostgreSQL data types.
+
+    Returns:
+        pa.Schema: Arrow schema, with unknown data types represented as strings.
+    """
+    fields = []
+    for column, data_type in column_types.items():
+        fields.append((column, POSTGRESQL_ARROW_TYPES.get(data_type, ("text", pa.string()))[1]))
+    return pa.schema(fields)
+
+
+def rows_to_record_batch(rows: list[tuple], schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+    )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object buffering what's written to it until it's drained."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def generate_columnar_stream(
+    row_chunks: Iterable[list[tuple]], schema: pa.Schema, columnar_format: str = "arrow"
+) -> Iterator[bytes]:
+    """Serializes chunks of rows as an Arrow IPC stream or a Parquet file (one row group per chunk), yielding the
+    bytes written for each chunk right away so the whole table never needs to be held in memory.
+
+    Args:
+        row_chunks (Iterable[list[tuple]]): Chunks of rows, with the values in the same order as the schema.
+        schema (pa.Schema): Arrow schema of the rows.
+        columnar_format (str, optional): Either arrow or parquet. Defaults to arrow.
+
+    Yields:
+        Iterator[bytes]: Serialized data.
+    """
+    sink = _ChunkSink()
+    if columnar_format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    elif columnar_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        raise ValueError(f"Columnar format {columnar_format} not recognized")
+    with writer:
+        for rows in row_chunks:
+            writer.write_batch(rows_to_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,415 @@
+import io
+import logging
+from decimal import Decimal
+from typing import Optional
+
+import asyncpg
+from utils.aggregations import (
+    TIME_BUCKETS,
+    bucket_size_for_points,
+    build_downsample_query,
+    build_histogram_query,
+    build_summary_query,
+    histogram_edges,
+    parse_downsampled,
+    parse_summary,
+    select_numeric_columns,
+)
+from utils.arrow_export import build_select_columns
+from utils.async_db_pool import AsyncPowerPlantDBPool
+from utils.json_response import rows_to_dict
+from utils.logger import get_logger
+from utils.metrics import stage_timer
+from utils.row_filter import (
+    PLANT_COLUMN,
+    TIME_COLUMN,
+    RowFilter,
+    select_insert_columns,
+    write_rows_csv,
+)
+from utils.schema_cache import SCHEMA_CACHE, TableMetadata, TableMetadataCache
+
+
+class AsyncPowerPlantDBManager:
+    """asyncio counterpart of PowerPlantDBManager, used by the API request handlers so queries don't block the event
+    loop. It exposes the same methods (as coroutines) and returns the same structures, and shares the table metadata
+    cache with it. Rows are returned with their values as plain Python types, ready to be serialized with orjson.
+
+    A connection is checked out from the pool on the first query and returned when the manager is exited.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncPowerPlantDBPool,
+        logger: logging.Logger = get_logger("AsyncPowerPlantManager"),
+        schema_cache: TableMetadataCache = SCHEMA_CACHE,
+    ):
+        self.pool = pool
+        self.logger = logger
+        self.schema_cache = schema_cache
+        self.conn: Optional[asyncpg.Connection] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close_connection()
+
+    async def generate_connection(self) -> asyncpg.Connection:
+        if self.conn is None:
+            with stage_timer("db_connection_checkout"):
+                self.conn = await self.pool.getconn()
+        return self.conn
+
+    async def close_connection(self):
+        if self.conn is not None:
+            await self.pool.putconn(self.conn)
+            self.conn = None
+
+    async def _fetch(self, query: str, *params) -> list[asyncpg.Record]:
+        conn = await self.generate_connection()
+        with stage_timer("sql_execution"):
+            return await conn.fetch(query, *params)
+
+    async def _fetchrow(self, query: str, *params) -> asyncpg.Record:
+        conn = await self.generate_connection()
+        with stage_timer("sql_execution"):
+            return await conn.fetchrow(query, *params)
+
+    async def _fetch_rows(self, table_name: str, condition: str, *params) -> dict:
+        # The values are cast in the query to types orjson serializes natively (e.g. NUMERIC to DOUBLE PRECISION),
+        # and indexed by id straight from the returned tuples
+        column_types = await self.retrieve_column_types(table_name)
+        select_columns = ", ".join(["id"] + build_select_columns(column_types))
+        records = await self._fetch(f"SELECT {select_columns} FROM {table_name} {condition}", *params)
+        with stage_timer("json_serialization"):
+            return rows_to_dict(["id"] + list(column_types.keys()), [tuple(record) for record in records])
+
+    async def get_table_metadata(self, table_name: str) -> TableMetadata:
+        """Returns the table existence and its ordered column types, querying the database only if they aren't cached.
+
+        Args:
+            table_name (str): Name of the table.
+
+        Returns:
+            TableMetadata: Metadata of the table.
+        """
+        metadata = self.schema_cache.get(table_name)
+        if metadata is None:
+            query = """SELECT column_name, data_type FROM information_schema.columns
+                        WHERE table_catalog=current_database() AND table_schema='public' AND table_name=$1
+                        ORDER BY ordinal_position;"""
+            records = await self._fetch(query, table_name)
+            metadata = TableMetadata(
+                exists=len(records) > 0,
+                column_types={record["column_name"]: record["data_type"] for record in records},
+            )
+            self.schema_cache.set(table_name, metadata)
+        return metadata
+
+    async def table_exists(self, table_name: str) -> bool:
+        return (await self.get_table_metadata(table_name)).exists
+
+    async def retrieve_column_names(self, table_name: str, ignore_id: bool = True) -> list:
+        return list((await self.retrieve_column_types(table_name, ignore_id)).keys())
+
+    async def retrieve_column_types(self, table_name: str, ignore_id: bool = True) -> dict:
+        column_types = (await self.get_table_metadata(table_name)).column_types
+        if ignore_id:
+            column_types = {column: data_type for column, data_type in column_types.items() if column != "id"}
+        return dict(column_types)
+
+    async def insert_row(self, table_name: str, args_dict: dict):
+        args_dict_lowercase = {str(k).lower(): v for k, v in args_dict.items()}
+        if await self.table_exists(table_name):
+            column_types = await self.retrieve_column_types(table_name)
+            columns = select_insert_columns(list(column_types.keys()), [args_dict_lowercase])
+            placeholders = ", ".join(f"${position}" for position in range(1, len(columns) + 1))
+            query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+            params = [self._to_parameter(args_dict_lowercase[column], column_types[column]) for column in columns]
+            conn = await self.generate_connection()
+            with stage_timer("sql_execution"):
+                await conn.execute(query, *params)
+
+    @staticmethod
+    def _to_parameter(value, data_type: str):
+        # asyncpg binds parameters in binary, so floats going to NUMERIC columns are converted through their
+        # shortest representation instead of their exact binary value (e.g. 14.96 instead of 14.9600000000000008...)
+        if data_type == "numeric" and isinstance(value, float):
+            return Decimal(repr(value))
+        return value
+
+    async def copy_rows(self, table_name: str, rows: list[dict]) -> int:
+        """Inserts multiple rows in a single statement using COPY FROM STDIN.
+
+        Args:
+            table_name (str): Name of the table.
+            rows (list[dict]): Rows to insert, containing a value for each of the table's columns (besides the id and
+                the optional time and plant columns).
+
+        Returns:
+            int: Amount of rows inserted.
+        """
+        if not await self.table_exists(table_name) or len(rows) == 0:
+            return 0
+        rows_lowercase = [{str(k).lower(): v for k, v in row.items()} for row in rows]
+        columns = select_insert_columns(await self.retrieve_column_names(table_name), rows_lowercase)
+        buffer = io.StringIO()
+        write_rows_csv(buffer, columns, rows_lowercase)
+        conn = await self.generate_connection()
+        with stage_timer("sql_execution"):
+            await conn.copy_to_table(
+                table_name, source=io.BytesIO(buffer.getvalue().encode()), columns=columns, format="csv"
+            )
+        return len(rows)
+
+    async def retrieve_data(self, table_name: str) -> dict:
+        if not await self.table_exists(table_name):
+            return {}
+        return await self._fetch_rows(table_name, "")
+
+    async def retrieve_rows(self, table_name: str, limit: int = 100, offset: int = 0) -> dict:
+        if not await self.table_exists(table_name):
+            return {}
+        return await self._fetch_rows(table_name, "LIMIT $1 OFFSET $2", limit, offset)
+
+    async def retrieve_row(self, table_name: str, row_id: int) -> dict:
+        if not await self.table_exists(table_name):
+            return {}
+        return await self._fetch_rows(table_name, "WHERE id=$1", row_id)
+
+    async def retrieve_rows_after(
+        self, table_name: str, after_id: int = 0, limit: int = 100, end_id: Optional[int] = None
+    ) -> tuple[dict, Optional[int]]:
+        """Retrieves a page of rows ordered by id using keyset pagination. See
+        PowerPlantDBManager.retrieve_rows_after.
+
+        Args:
+            table_name (str): Name of the table.
+            after_id (int, optional): Only rows with an id greater than this one are returned. Defaults to 0.
+            limit (int, optional): Maximum amount of rows to return. Defaults to 100.
+            end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are
+                returned. Defaults to None.
+
+        Returns:
+            tuple[dict, Optional[int]]: Rows indexed by id, and the cursor to request the next page with (None if
+                there are no more rows).
+        """
+        if not await self.table_exists(table_name):
+            return {}, None
+        condition = "WHERE id > $1"
+        params = [after_id]
+        if end_id is not None:
+            params.append(end_id)
+            condition += f" AND id <= ${len(params)}"
+        params.append(limit)
+        condition += f" ORDER BY id LIMIT ${len(params)}"
+        rows = await self._fetch_rows(table_name, condition, *params)
+        # Dictionaries keep the insertion order, so the last key is the highest id of the page
+        next_cursor = next(reversed(rows)) if len(rows) == limit else None
+        return rows, next_cursor
+
+    async def retrieve_all(self, table_name: str) -> list:
+        if not await self.table_exists(table_name):
+            return []
+        return [tuple(record) for record in await self._fetch(f"SELECT * FROM {table_name}")]
+
+    async def retrieve_id_range(self, table_name: str) -> dict:
+        """Returns the lowest and highest ids of a table, as well as its amount of rows.
+
+        Args:
+            table_name (str): Name of the table.
+
+        Returns:
+            dict: Dictionary containing the min_id, max_id (None if the table is empty) and rows.
+        """
+        if not await self.table_exists(table_name):
+            return {"min_id": None, "max_id": None, "rows": 0}
+        min_id, max_id, rows = await self._fetchrow(f"SELECT MIN(id), MAX(id), COUNT(*) FROM {table_name}")
+        return {"min_id": min_id, "max_id": max_id, "rows": rows}
+
+    async def retrieve_fingerprint(self, table_name: str, end_id: Optional[int] = None) -> dict:
+        """Returns a fingerprint of the contents of a table, or of the rows up to an id. See
+        PowerPlantDBManager.retrieve_fingerprint.
+
+        Args:
+            table_name (str): Name of the table.
+            end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are included.
+                Defaults to None.
+
+        Returns:
+            dict: Dictionary containing the min_id, max_id (None if there are no rows), rows and checksum.
+        """
+        if not await self.table_exists(table_name):
+            return {"min_id": None, "max_id": None, "rows": 0, "checksum": "0"}
+        query = f"""SELECT MIN(id), MAX(id), COUNT(*),
+            COALESCE(SUM(('x' || SUBSTR(MD5(t::text), 1, 16))::bit(64)::bigint), 0)
+            FROM {table_name} AS t"""
+        params = []
+        if end_id is not None:
+            query += " WHERE id <= $1"
+            params.append(end_id)
+        min_id, max_id, rows, checksum = await self._fetchrow(query, *params)
+        return {"min_id": min_id, "max_id": max_id, "rows": rows, "checksum": str(checksum)}
+
+    async def count_rows(self, table_name: str) -> int:
+        if not await self.table_exists(table_name):
+            return 0
+        return (await self._fetchrow(f"SELECT COUNT(*) FROM {table_name}"))[0]
+
+    async def retrieve_filtered_rows(
+        self, table_name: str, row_filter: RowFilter, after_id: int = 0, limit: int = 100
+    ) -> tuple[dict, Optional[int]]:
+        """Retrieves a page of the rows matching a filter, ordered by id using keyset pagination.
+
+        Args:
+            table_name (str): Name of the table.
+            row_filter (RowFilter): Conditions the rows need to match.
+            after_id (int, optional): Only rows with an id greater than this one are returned. Defaults to 0.
+            limit (int, optional): Maximum amount of rows to return. Defaults to 100.
+
+        Raises:
+            ValueError: If the filter uses columns the table doesn't have.
+
+        Returns:
+            tuple[dict, Optional[int]]: Rows indexed by id, and the cursor to request the next page with (None if
+                there are no more rows).
+        """
+        if not await self.table_exists(table_name):
+            return {}, None
+        params = []
+        condition = row_filter.build_condition(params, await self.retrieve_column_types(table_name))
+        params.append(after_id)
+        condition = f"{condition} AND id > ${len(params)}" if condition else f"WHERE id > ${len(params)}"
+        params.append(limit)
+        condition += f" ORDER BY id LIMIT ${len(params)}"
+        rows = await self._fetch_rows(table_name, condition, *params)
+        next_cursor = next(reversed(rows)) if len(rows) == limit else None
+        return rows, next_cursor
+
+    async def retrieve_summary(
+        self,
+        table_name: str,
+        columns: Optional[list[str]] = None,
+        quantiles: Optional[list[float]] = None,
+        bins: int = 10,
+        row_filter: Optional[RowFilter] = None,
+    ) -> dict:
+        """Computes summary statistics (count, mean, std, min, max, quantiles and a histogram) of numeric columns in
+        the database, so only the statistics are returned instead of the rows.
+
+        Args:
+            table_name (str): Name of the table.
+            columns (Optional[list[str]], optional): Columns to summarize. If None, all the numeric columns are
+                summarized. Defaults to None.
+            quantiles (Optional[list[float]], optional): Quantiles to compute, between 0 and 1. If None, the
+                quartiles are computed. Defaults to None.
+            bins (int, optional): Amount of equal width histogram buckets. If 0, no histogram is computed.
+                Defaults to 10.
+            row_filter (Optional[RowFilter], optional): Conditions the summarized rows need to match. If None, all
+                the rows are summarized. Defaults to None.
+
+        Raises:
+            ValueError: If a column can't be summarized or filtered by, or the quantiles or bins are out of range.
+
+        Returns:
+            dict: Dictionary containing the amount of rows and the statistics of each column.
+        """
+        quantiles = [0.25, 0.5, 0.75] if quantiles is None else quantiles
+        if any(quantile < 0 or quantile > 1 for quantile in quantiles):
+            raise ValueError(f"Quantiles need to be between 0 and 1, got {quantiles}")
+        if bins < 0 or bins > 1000:
+            raise ValueError(f"bins needs to be between 0 and 1000, got {bins}")
+        if not await self.table_exists(table_name):
+            return {"rows": 0, "columns": {}}
+        row_filter = row_filter or RowFilter()
+        column_types = await self.retrieve_column_types(table_name)
+        columns = select_numeric_columns(column_types, columns, excluded_columns=(PLANT_COLUMN,))
+
+        params = []
+        condition = row_filter.build_condition(params, column_types)
+        params.append(quantiles)
+        query = build_summary_query(table_name, columns, condition, quantiles_param=f"${len(params)}")
+        summary = parse_summary(tuple(await self._fetchrow(query, *params)), columns, quantiles)
+        if bins == 0 or not columns:
+            return summary
+
+        limits = [(summary["columns"][column]["min"], summary["columns"][column]["max"]) for column in columns]
+        params = []
+        condition = row_filter.build_condition(params, column_types)
+        query = build_histogram_query(table_name, columns, limits, condition, params, bins)
+        counts = {(position, bucket): count for position, bucket, count in await self._fetch(query, *params)}
+        for position, (column, (low, high)) in enumerate(zip(columns, limits)):
+            column_summary = summary["columns"][column]
+            if low is None:
+                column_summary["histogram"] = {"edges": [], "counts": []}
+            elif high <= low:
+                # All the values are the same, a single bucket holds all of them
+                column_summary["histogram"] = {"edges": [low, high], "counts": [column_summary["count"]]}
+            else:
+                column_summary["histogram"] = {
+                    "edges": histogram_edges(low, high, bins),
+                    "counts": [counts.get((position, bucket), 0) for bucket in range(1, bins + 1)],
+                }
+        return summary
+
+    async def retrieve_downsampled(
+        self,
+        table_name: str,
+        columns: Optional[list[str]] = None,
+        points: int = 500,
+        bucket_size: Optional[int] = None,
+        time_bucket: Optional[str] = None,
+        row_filter: Optional[RowFilter] = None,
+    ) -> dict:
+        """Downsamples numeric columns in the database, grouping the rows in buckets of consecutive ids or of the
+        same period of time and returning the mean, min and max of each bucket.
+
+        Args:
+            table_name (str): Name of the table.
+            columns (Optional[list[str]], optional): Columns to downsample. If None, all the numeric columns are
+                downsampled. Defaults to None.
+            points (int, optional): Approximate amount of id buckets to return, used to compute the bucket size when
+                it isn't given. Defaults to 500.
+            bucket_size (Optional[int], optional): Amount of consecutive ids per bucket. Buckets are aligned to
+                multiples of it, so the same bucket always covers the same ids. Defaults to None.
+            time_bucket (Optional[str], optional): If given, rows are grouped by the period of time they were
+                recorded in instead, one of TIME_BUCKETS (e.g. hour). Needs the table to have a time column.
+                Defaults to None.
+            row_filter (Optional[RowFilter], optional): Conditions the downsampled rows need to match. If None, all
+                the rows are downsampled. Defaults to None.
+
+        Raises:
+            ValueError: If a column can't be downsampled or filtered by, the points or bucket size aren't positive,
+                or the time bucket isn't supported.
+
+        Returns:
+            dict: Dictionary containing the bucket size or time bucket, the start time (for time buckets), first and
+                last id and amount of rows of each bucket, and the mean, min and max of each column per bucket.
+        """
+        if points < 1 or (bucket_size is not None and bucket_size < 1):
+            raise ValueError(f"points and bucket_size need to be positive, got {points} and {bucket_size}")
+        if time_bucket is not None and time_bucket not in TIME_BUCKETS:
+            raise ValueError(f"time_bucket needs to be one of {TIME_BUCKETS}, got {time_bucket}")
+        if not await self.table_exists(table_name):
+            return parse_downsampled([], [], bucket_size, time_bucket)
+        column_types = await self.retrieve_column_types(table_name)
+        if time_bucket is not None and TIME_COLUMN not in column_types:
+            raise ValueError(f"Can't downsample by time, the table doesn't have a {TIME_COLUMN} column")
+        columns = select_numeric_columns(column_types, columns, excluded_columns=(PLANT_COLUMN,))
+        row_filter = row_filter or RowFilter()
+
+        params = []
+        condition = row_filter.build_condition(params, column_types)
+        if time_bucket is not None:
+            bucket_size = None
+        elif bucket_size is None:
+            min_id, max_id = await self._fetchrow(f"SELECT MIN(id), MAX(id) FROM {table_name} {condition}", *params)
+            if min_id is None:
+                return parse_downsampled([], columns, 1)
+            bucket_size = bucket_size_for_points(min_id, max_id, points)
+        query = build_downsample_query(
+            table_name, columns, condition, params, bucket_size, time_column=TIME_COLUMN, time_bucket=time_bucket
+        )
+        records = await self._fetch(query, *params)
+        return parse_downsampled([tuple(record) for record in records], columns, bucket_size, time_bucket)
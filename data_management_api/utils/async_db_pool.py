@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import asyncpg
+from utils.db_pool import PoolTimeoutError
+from utils.logger import get_logger
+
+
+class AsyncPowerPlantDBPool:
+    """asyncio pool of PostgreSQL connections shared by the AsyncPowerPlantDBManager instances of a process.
+
+    Waiting for a connection or a query suspends the request instead of blocking the event loop, so the amount of
+    requests a worker serves concurrently is bounded by the pool size. The time spent waiting for a connection is
+    recorded, so the pool size can be tuned looking at the checkout metrics.
+    """
+
+    def __init__(
+        self,
+        min_size: int = int(os.environ.get("POSTGRES_POOL_MIN_SIZE", 1)),
+        max_size: int = int(os.environ.get("POSTGRES_POOL_MAX_SIZE", 10)),
+        checkout_timeout: float = float(os.environ.get("POSTGRES_POOL_TIMEOUT", 5)),
+        max_inactive_connection_lifetime: float = float(os.environ.get("POSTGRES_POOL_MAX_IDLE_SECONDS", 300)),
+        logger: logging.Logger = get_logger("AsyncPowerPlantDBPool"),
+    ) -> None:
+        """Configures the connection pool. The connections are opened by `open`, which needs a running event loop.
+
+        Args:
+            min_size (int, optional): Connections kept open at all times. Defaults to the POSTGRES_POOL_MIN_SIZE
+                environment variable, or 1.
+            max_size (int, optional): Maximum amount of open connections. Defaults to the POSTGRES_POOL_MAX_SIZE
+                environment variable, or 10.
+            checkout_timeout (float, optional): Seconds to wait for a free connection before giving up. Defaults to
+                the POSTGRES_POOL_TIMEOUT environment variable, or 5.
+            max_inactive_connection_lifetime (float, optional): Seconds after which idle connections are closed.
+                Defaults to the POSTGRES_POOL_MAX_IDLE_SECONDS environment variable, or 300.
+            logger (logging.Logger, optional): Logger to use to log information.
+                Defaults to get_logger("AsyncPowerPlantDBPool").
+        """
+        self.logger = logger
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_inactive_connection_lifetime = max_inactive_connection_lifetime
+
+        self._pool: Optional[asyncpg.Pool] = None
+        self._stats = {
+            "checkouts": 0,
+            "checkout_wait_seconds": 0.0,
+            "max_checkout_wait_seconds": 0.0,
+            "timeouts": 0,
+            "in_use": 0,
+        }
+
+    async def open(self):
+        if self._pool is None:
+            self.logger.info(f"Creating async PostgreSQL connection pool (min: {self.min_size}, max: {self.max_size})")
+            self._pool = await asyncpg.create_pool(
+                host=os.environ.get("POSTGRES_HOST"),
+                database=os.environ.get("POSTGRES_DB"),
+                user=os.environ.get("POSTGRES_USER"),
+                password=os.environ.get("POSTGRES_PASSWORD"),
+                port=5432,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
+            )
+
+    async def getconn(self) -> asyncpg.Connection:
+        """Checks out a connection from the pool.
+
+        Raises:
+            PoolTimeoutError: If no connection became available within the checkout timeout.
+
+        Returns:
+            asyncpg.Connection: asyncpg connection.
+        """
+        checkout_start = time.perf_counter()
+        try:
+            # asyncpg resets the connections when released and replaces the ones that were closed
+            conn = await self._pool.acquire(timeout=self.checkout_timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise PoolTimeoutError(f"No PostgreSQL connection available after {self.checkout_timeout} seconds")
+
+        checkout_wait = time.perf_counter() - checkout_start
+        self._stats["checkouts"] += 1
+        self._stats["checkout_wait_seconds"] += checkout_wait
+        self._stats["max_checkout_wait_seconds"] = max(self._stats["max_checkout_wait_seconds"], checkout_wait)
+        self._stats["in_use"] += 1
+        return conn
+
+    async def putconn(self, conn: asyncpg.Connection):
+        """Returns a connection to the pool.
+
+        Args:
+            conn (asyncpg.Connection): asyncpg connection checked out with getconn.
+        """
+        self._stats["in_use"] -= 1
+        await self._pool.release(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            self.logger.info("Closing async PostgreSQL connection pool")
+            await self._pool.close()
+            self._pool = None
+
+    def stats(self) -> dict:
+        """Returns the pool metrics, including checkout counts and wait times.
+
+        Returns:
+            dict: Dictionary containing the pool metrics.
+        """
+        # Only modified from the event loop, no lock needed
+        stats = dict(self._stats)
+        stats["mean_checkout_wait_seconds"] = (
+            stats["checkout_wait_seconds"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        )
+        stats["min_size"] = self.min_size
+        stats["max_size"] = self.max_size
+        stats["open_connections"] = self._pool.get_size() if self._pool is not None else 0
+        return stats
@@ -0,0 +1,95 @@
+"""
+Compares the previous read path of the row endpoints (pandas DataFrame built with read_sql_query, converted with
+to_dict and serialized by FastAPI's jsonable_encoder and JSONResponse) against the current one (tuples fetched from
+the cursor, indexed by id and serialized with orjson), for requests of different sizes.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from logger import get_logger
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.arrow_export import build_select_columns
+from utils.db_manager import PowerPlantDBManager
+from utils.json_response import ORJSONResponse, rows_to_dict
+
+logger = get_logger(Path(__file__).stem)
+TABLE_NAME = "powerplant"
+
+
+def pandas_path(powerplant_db_manager: PowerPlantDBManager, limit: int) -> bytes:
+    import pandas as pd
+
+    df = pd.read_sql_query(
+        f"SELECT * FROM {TABLE_NAME} ORDER BY id LIMIT %s", powerplant_db_manager.conn, params=(limit,)
+    )
+    content = df.set_index("id").to_dict(orient="index")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def lean_path(powerplant_db_manager: PowerPlantDBManager, limit: int) -> bytes:
+    column_types = powerplant_db_manager.retrieve_column_types(TABLE_NAME)
+    select_columns = ", ".join(["id"] + build_select_columns(column_types))
+    cur = powerplant_db_manager.conn.cursor()
+    cur.execute(f"SELECT {select_columns} FROM {TABLE_NAME} ORDER BY id LIMIT %s", (limit,))
+    rows = cur.fetchall()
+    cur.close()
+    return ORJSONResponse(rows_to_dict(["id"] + list(column_types.keys()), rows)).body
+
+
+def time_path(path: Callable, powerplant_db_manager: PowerPlantDBManager, limit: int, repeats: int) -> float:
+    path(powerplant_db_manager, limit)  # Warm up
+    times = []
+    for _ in range(repeats):
+        time_start = time.perf_counter()
+        path(powerplant_db_manager, limit)
+        times.append(time.perf_counter() - time_start)
+    return statistics.median(times)
+
+
+def time_import(module: str) -> float:
+    # Measured in a new interpreter, as the module might already be imported in this one
+    time_start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - time_start
+
+
+def benchmark_serialization(row_counts: list[int], repeats: int = 20):
+    """Logs the median time of each read path for each amount of rows, and the time it takes to import pandas.
+
+    Args:
+        row_counts (list[int]): Amounts of rows requested.
+        repeats (int, optional): Times each request is repeated. Defaults to 20.
+    """
+    with PowerPlantDBManager() as powerplant_db_manager:
+        available_rows = powerplant_db_manager.count_rows(TABLE_NAME)
+        for limit in row_counts:
+            if limit > available_rows:
+                logger.warning(f"Requesting {limit} rows, but the table only has {available_rows}")
+            pandas_time = time_path(pandas_path, powerplant_db_manager, limit, repeats)
+            lean_time = time_path(lean_path, powerplant_db_manager, limit, repeats)
+            logger.info(
+                f"{limit} rows: pandas path {pandas_time * 1000:.2f} ms, lean path {lean_time * 1000:.2f} ms "
+                f"({pandas_time / lean_time:.1f}x speedup)"
+            )
+    baseline_time = time_import("sys")
+    logger.info(f"Importing pandas takes {time_import('pandas') - baseline_time:.2f} seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 10000], help="Rows requested")
+    parser.add_argument("--repeats", type=int, default=20, help="Times each request is repeated")
+    args = parser.parse_args()
+    benchmark_serialization(args.rows, repeats=args.repeats)
+
+
+if __name__ == "__main__":
+    main()
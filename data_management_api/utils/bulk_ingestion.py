@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+
+from pydantic import BaseModel, ValidationError
+
+JSON_CONTENT_TYPES = ("application/json",)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+
+
+def parse_bulk_payload(body: bytes, content_type: str) -> list[dict]:
+    """Parses a bulk upload into a list of rows.
+
+    Args:
+        body (bytes): Request body.
+        content_type (str): Content type of the body. Either JSON (an array of objects), NDJSON (one object per line)
+            or CSV (with a header containing the column names).
+
+    Raises:
+        ValueError: If the content type isn't supported or the body can't be parsed.
+
+    Returns:
+        list[dict]: Parsed rows.
+    """
+    content_type = content_type.split(";")[0].strip().lower()
+    text = body.decode("utf-8")
+    if content_type in JSON_CONTENT_TYPES:
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("JSON payload needs to be an array of objects")
+    elif content_type in NDJSON_CONTENT_TYPES:
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif content_type in CSV_CONTENT_TYPES:
+        try:
+            rows = list(csv.DictReader(io.StringIO(text)))
+        except csv.Error as error:
+            raise ValueError(f"CSV payload can't be parsed: {error}") from error
+    else:
+        raise ValueError(
+            f"Content type {content_type} not supported, use one of "
+            f"{', '.join(JSON_CONTENT_TYPES + NDJSON_CONTENT_TYPES + CSV_CONTENT_TYPES)}"
+        )
+    return rows
+
+
+def validate_rows(rows: list, model: type[BaseModel]) -> tuple[list[dict], list[dict]]:
+    """Validates each row against a pydantic model.
+
+    Args:
+        rows (list): Rows to validate.
+        model (type[BaseModel]): Pydantic model each row needs to conform to, e.g. PowerPlantData.
+
+    Returns:
+        tuple[list[dict], list[dict]]: Accepted rows as dictionaries, and the rejected rows' index and error.
+    """
+    accepted, rejected = [], []
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError(f"Expected an object, got {type(row).__name__}")
+            accepted.append(model(**{str(k).lower(): v for k, v in row.items()}).to_dict())
+        except (ValidationError, ValueError) as error:
+            rejected.append({"index": index, "error": str(error)})
+    return accepted, rejected
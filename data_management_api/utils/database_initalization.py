@@ -10,12 +10,16 @@ A combined cycle power plant (CCPP) is composed of gas turbines (GT), steam turb
 For comparability with our baseline studies, and to allow 5x2 fold statistical tests be carried out, we provide the data shuffled five times. For each shuffling 2-fold CV is carried out and the resulting 10 measurements are used for statistical testing.
 We provide the data both in .ods and in .xlsx formats.
 """
+import argparse
+import io
 import logging
 import sys
 import tempfile
+import time
 import zipfile
+from datetime import date
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import pandas as pd
 import psycopg2
@@ -24,6 +28,7 @@ from logger import get_logger
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from utils.db_manager import PowerPlantDBManager
+from utils.row_filter import PLANT_COLUMN, TIME_COLUMN
 
 logger = get_logger(Path(__file__).stem)
 TABLE_NAME = "powerplant"
@@ -34,13 +39,16 @@ TABLE_NAMES_CONVERSION = {
     "RH": "relative_humidity",
     "PE": "electrical_output",
 }
+# DOUBLE PRECISION arithmetic is much faster than NUMERIC, and the readings don't need exact decimals
 TABLE_VARIABLES = {
-    "temperature": "NUMERIC",
-    "exhaust_vacuum": "NUMERIC",
-    "atmospheric_pressure": "NUMERIC",
-    "relative_humidity": "NUMERIC",
-    "electrical_output": "NUMERIC",
+    "temperature": "DOUBLE PRECISION",
+    "exhaust_vacuum": "DOUBLE PRECISION",
+    "atmospheric_pressure": "DOUBLE PRECISION",
+    "relative_humidity": "DOUBLE PRECISION",
+    "electrical_output": "DOUBLE PRECISION",
 }
+COLUMN_TYPES = ("DOUBLE PRECISION", "NUMERIC", "REAL")
+PARTITION_INTERVALS = ("month", "year")
 
 
 def download_file(url: str, local_file_path: Path) -> Path:
@@ -59,18 +67,135 @@ class PowerPlantDBInitializer(PowerPlantDBManager):
     def __init__(self, logger: logging.Logger = get_logger("PowerPlantInitializer")):
         super().__init__(logger)
 
-    def create_table(self, table_name: str, columns: dict):
-        if not self.table_exists(table_name):
-            self.logger.info(f"Creating table: {table_name}")
-            create_command = f"""CREATE TABLE {table_name} (id SERIAL PRIMARY KEY, """
-            dtypes_command = ", ".join([f"{col} {columns[col]} NOT NULL" for col in columns])
-            full_command = create_command + dtypes_command + ")"
-            self.generate_connection()
-            cur = self.conn.cursor()
-            cur.execute(full_command)
-            cur.close()
-            self.commit_connection()
-            self.logger.info(f"Table: {table_name} created successfully")
+    def create_table(
+        self,
+        table_name: str,
+        columns: dict,
+        time_column: bool = False,
+        plant_column: bool = False,
+        partition_interval: Optional[str] = None,
+        partition_start: Optional[date] = None,
+        partitions: int = 12,
+    ):
+        """Creates a table with a serial id and the given columns, if it doesn't exist yet.
+
+        Args:
+            table_name (str): Name of the table.
+            columns (dict): Column names and their PostgreSQL data types.
+            time_column (bool, optional): Whether to add a column with the time each row was recorded, which
+                defaults to the insertion time. Defaults to False.
+            plant_column (bool, optional): Whether to add a column with the id of the plant of each row.
+                Defaults to False.
+            partition_interval (Optional[str], optional): If given, the table is partitioned by the time column in
+                ranges of this interval, one of PARTITION_INTERVALS. Needs the time column. Defaults to None.
+            partition_start (Optional[date], optional): Date of the first partition. If None, the current date is
+                used. Defaults to None.
+            partitions (int, optional): Amount of partitions created, rows outside of them are stored in a default
+                partition. Defaults to 12.
+
+        Raises:
+            ValueError: If partitioning is requested without the time column, or the interval isn't supported.
+        """
+        if self.table_exists(table_name):
+            return
+        if partition_interval is not None and (not time_column or partition_interval not in PARTITION_INTERVALS):
+            raise ValueError(
+                f"Partitioning needs the time column and an interval in {PARTITION_INTERVALS}, got {partition_interval}"
+            )
+        self.logger.info(f"Creating table: {table_name}")
+        column_definitions = ["id SERIAL"] + [f"{col} {columns[col]} NOT NULL" for col in columns]
+        if time_column:
+            column_definitions.append(f"{TIME_COLUMN} TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()")
+        if plant_column:
+            column_definitions.append(f"{PLANT_COLUMN} INTEGER")
+        # The primary key of a partitioned table needs to include the partitioning column
+        primary_key = f"id, {TIME_COLUMN}" if partition_interval is not None else "id"
+        commands = [f"CREATE TABLE {table_name} ({', '.join(column_definitions)}, PRIMARY KEY ({primary_key}))"]
+        if partition_interval is not None:
+            commands[0] += f" PARTITION BY RANGE ({TIME_COLUMN})"
+            commands += self.build_partition_commands(
+                table_name, partition_interval, partition_start or date.today(), partitions
+            )
+
+        self.generate_connection()
+        cur = self.conn.cursor()
+        for command in commands:
+            cur.execute(command)
+        cur.close()
+        self.commit_connection()
+        self.schema_cache.invalidate(table_name)
+        self.logger.info(f"Table: {table_name} created successfully")
+
+    @staticmethod
+    def build_partition_commands(table_name: str, interval: str, start: date, partitions: int) -> list[str]:
+        """Builds the commands creating consecutive time range partitions, and a default one for the rows outside of
+        them. Rows recorded after the last partition end up in the default partition, so new partitions need to be
+        created before that happens.
+
+        Args:
+            table_name (str): Name of the partitioned table.
+            interval (str): Time covered by each partition, one of PARTITION_INTERVALS.
+            start (date): Date within the first partition.
+            partitions (int): Amount of partitions to create.
+
+        Returns:
+            list[str]: Partition creation commands.
+        """
+        period_start = start.replace(month=1, day=1) if interval == "year" else start.replace(day=1)
+        commands = []
+        for _ in range(partitions):
+            if interval == "year":
+                period_end = period_start.replace(year=period_start.year + 1)
+                suffix = period_start.strftime("%Y")
+            else:
+                period_end = period_start.replace(
+                    year=period_start.year + period_start.month // 12, month=period_start.month % 12 + 1
+                )
+                suffix = period_start.strftime("%Y_%m")
+            commands.append(
+                f"CREATE TABLE IF NOT EXISTS {table_name}_{suffix} PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{period_start.isoformat()}') TO ('{period_end.isoformat()}')"
+            )
+            period_start = period_end
+        commands.append(f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT")
+        return commands
+
+    def create_indexes(self, table_name: str, indexed_columns: Optional[list[str]] = None):
+        """Creates the indexes used by the filtered queries, if they don't exist yet. The time column gets a BRIN
+        index, which is tiny and fast for data inserted in time order, and the plant and value columns get B-tree
+        indexes.
+
+        Args:
+            table_name (str): Name of the table.
+            indexed_columns (Optional[list[str]], optional): Value columns to index for range filters.
+                Defaults to None.
+        """
+        column_names = self.retrieve_column_names(table_name)
+        commands = []
+        if TIME_COLUMN in column_names:
+            commands.append(
+                f"CREATE INDEX IF NOT EXISTS {table_name}_{TIME_COLUMN}_brin ON {table_name} USING BRIN ({TIME_COLUMN})"
+            )
+        if PLANT_COLUMN in column_names:
+            # Filtering a plant's time range uses a single index scan
+            plant_index_columns = f"{PLANT_COLUMN}, {TIME_COLUMN}" if TIME_COLUMN in column_names else PLANT_COLUMN
+            commands.append(
+                f"CREATE INDEX IF NOT EXISTS {table_name}_{PLANT_COLUMN}_idx ON {table_name} ({plant_index_columns})"
+            )
+        for column in indexed_columns or []:
+            if column not in column_names:
+                raise ValueError(f"Can't index {column}, the table doesn't have that column")
+            commands.append(f"CREATE INDEX IF NOT EXISTS {table_name}_{column}_idx ON {table_name} ({column})")
+        if not commands:
+            return
+
+        self.logger.info(f"Creating {len(commands)} indexes on table: {table_name}")
+        self.generate_connection()
+        cur = self.conn.cursor()
+        for command in commands:
+            cur.execute(command)
+        cur.close()
+        self.commit_connection()
 
     def delete_table(self, table_name: str):
         self.logger.info(f"Deleting table: {table_name}")
@@ -80,36 +205,174 @@ class PowerPlantDBInitializer(PowerPlantDBManager):
         cur.execute(delete_command)
         cur.close()
         self.commit_connection()
+        self.schema_cache.invalidate(table_name)
         self.logger.info(f"Table {table_name} deleted from database")
 
+    def copy_dataframe(self, table_name: str, df: pd.DataFrame) -> int:
+        """Loads a dataframe into a table using COPY FROM STDIN, in a single transaction.
+
+        Args:
+            table_name (str): Name of the table.
+            df (pd.DataFrame): Data to load, containing a column for each of the table's columns (besides the id).
+
+        Returns:
+            int: Amount of rows loaded.
+        """
+        df = df.rename(columns=lambda column: str(column).lower())
+        # Optional columns the data doesn't have (e.g. the time) are filled with their default
+        columns = [column for column in self.retrieve_column_names(table_name) if column in df.columns]
+        buffer = io.StringIO()
+        df[columns].to_csv(buffer, header=False, index=False)
+        buffer.seek(0)
+        self.copy_csv_buffer(table_name, columns, buffer)
+        return len(df)
+
+
+def load_rows_bulk(db_initializer: PowerPlantDBInitializer, table_name: str, df: pd.DataFrame, chunk_size: int):
+    """Loads a dataframe into a table in chunks, each one committed in its own COPY transaction.
+
+    Args:
+        db_initializer (PowerPlantDBInitializer): Initializer connected to the database.
+        table_name (str): Name of the table.
+        df (pd.DataFrame): Data to load.
+        chunk_size (int): Amount of rows loaded per transaction.
+    """
+    rows_loaded = 0
+    time_start = time.perf_counter()
+    for chunk_start in range(0, len(df), chunk_size):
+        rows_loaded += db_initializer.copy_dataframe(table_name, df.iloc[chunk_start : chunk_start + chunk_size])
+        elapsed_time = time.perf_counter() - time_start
+        logger.info(f"Loaded {rows_loaded}/{len(df)} rows ({rows_loaded / elapsed_time:.0f} rows/second)")
+
+
+def load_rows_row_by_row(db_initializer: PowerPlantDBInitializer, table_name: str, df: pd.DataFrame):
+    for row in df.iterrows():
+        db_initializer.insert_row(table_name, row[1].to_dict())
+
+
+def create_tables(
+    pplant_data_path: Union[Path, str],
+    chunk_size: int = 5000,
+    reset: bool = False,
+    column_type: str = "DOUBLE PRECISION",
+    time_column: bool = False,
+    plant_id: Optional[int] = None,
+    partition_interval: Optional[str] = None,
+    partition_start: Optional[date] = None,
+    partitions: int = 12,
+    indexed_columns: Optional[list[str]] = None,
+):
+    """Creates the power plant table and loads the power plant data into it.
 
-def create_tables(pplant_data_path: Union[Path, str]):
-    df = pd.read_excel(str(pplant_data_path / "CCPP" / "Folds5x2_pp.xlsx"))
+    Loading is resumable: rows are loaded in order in chunks committed one at a time, so if the table already
+    contains part of the data only the remaining rows are loaded.
+
+    Args:
+        pplant_data_path (Union[Path, str]): Directory containing the uncompressed power plant data.
+        chunk_size (int, optional): Amount of rows loaded per transaction. Defaults to 5000.
+        reset (bool, optional): Whether to delete the table before loading the data. Defaults to False.
+        column_type (str, optional): Data type of the reading columns, one of COLUMN_TYPES.
+            Defaults to "DOUBLE PRECISION".
+        time_column (bool, optional): Whether to add a column with the time each row was recorded. The dataset
+            doesn't include it, so the loaded rows get the insertion time. Defaults to False.
+        plant_id (Optional[int], optional): If given, a plant column is added and the loaded rows are assigned to
+            this plant. Defaults to None.
+        partition_interval (Optional[str], optional): If given, the table is partitioned by time in ranges of this
+            interval. See PowerPlantDBInitializer.create_table. Defaults to None.
+        partition_start (Optional[date], optional): Date of the first partition. Defaults to None.
+        partitions (int, optional): Amount of partitions created. Defaults to 12.
+        indexed_columns (Optional[list[str]], optional): Reading columns to index for range filters.
+            Defaults to None.
+    """
+    df = pd.read_excel(str(Path(pplant_data_path) / "CCPP" / "Folds5x2_pp.xlsx"))
     df = df.rename(columns=TABLE_NAMES_CONVERSION)
+    if plant_id is not None:
+        df[PLANT_COLUMN] = plant_id
 
+    powerplant_db_initializer = None
     try:
         powerplant_db_initializer = PowerPlantDBInitializer()
-        if powerplant_db_initializer.table_exists(TABLE_NAME):
+        if reset and powerplant_db_initializer.table_exists(TABLE_NAME):
             powerplant_db_initializer.delete_table(TABLE_NAME)
-        powerplant_db_initializer.create_table(TABLE_NAME, TABLE_VARIABLES)
+        powerplant_db_initializer.create_table(
+            TABLE_NAME,
+            {column: column_type for column in TABLE_VARIABLES},
+            time_column=time_column,
+            plant_column=plant_id is not None,
+            partition_interval=partition_interval,
+            partition_start=partition_start,
+            partitions=partitions,
+        )
+        powerplant_db_initializer.create_indexes(TABLE_NAME, indexed_columns)
 
-        if powerplant_db_initializer.count_rows(TABLE_NAME) < 1:
+        existing_rows = powerplant_db_initializer.count_rows(TABLE_NAME)
+        if existing_rows < len(df):
+            if existing_rows > 0:
+                logger.info(f"Table already contains {existing_rows} rows of data, resuming initialization")
             logger.info(f"Pushing power plant data to PostgreSQL")
-            for row in df.iterrows():
-                powerplant_db_initializer.insert_row(TABLE_NAME, row[1].to_dict())
+            load_rows_bulk(powerplant_db_initializer, TABLE_NAME, df.iloc[existing_rows:], chunk_size)
         else:
-            logger.warning(
-                f"Database already contains {powerplant_db_initializer.count_rows(table_name=TABLE_NAME)} rows of data, skipping initialization"
-            )
+            logger.warning(f"Database already contains {existing_rows} rows of data, skipping initialization")
 
     except (Exception, psycopg2.DatabaseError) as error:
         print(error)
     finally:
-        if powerplant_db_initializer.conn is not None:
+        if powerplant_db_initializer is not None and powerplant_db_initializer.conn is not None:
             powerplant_db_initializer.close_connection()
 
 
+def benchmark_loaders(pplant_data_path: Union[Path, str], chunk_size: int = 5000, rows: int = 2000):
+    """Compares the loading time of the bulk loader against inserting the data row by row, using a scratch table.
+
+    Args:
+        pplant_data_path (Union[Path, str]): Directory containing the uncompressed power plant data.
+        chunk_size (int, optional): Amount of rows loaded per transaction by the bulk loader. Defaults to 5000.
+        rows (int, optional): Amount of rows to load with each loader. Defaults to 2000.
+    """
+    df = pd.read_excel(str(Path(pplant_data_path) / "CCPP" / "Folds5x2_pp.xlsx"))
+    df = df.rename(columns=TABLE_NAMES_CONVERSION).head(rows)
+    benchmark_table_name = f"{TABLE_NAME}_benchmark"
+    loaders = {
+        "row_by_row": lambda db_initializer: load_rows_row_by_row(db_initializer, benchmark_table_name, df),
+        "bulk": lambda db_initializer: load_rows_bulk(db_initializer, benchmark_table_name, df, chunk_size),
+    }
+
+    with PowerPlantDBInitializer() as powerplant_db_initializer:
+        loading_times = {}
+        for loader_name, loader in loaders.items():
+            if powerplant_db_initializer.table_exists(benchmark_table_name):
+                powerplant_db_initializer.delete_table(benchmark_table_name)
+            powerplant_db_initializer.create_table(benchmark_table_name, TABLE_VARIABLES)
+            time_start = time.perf_counter()
+            loader(powerplant_db_initializer)
+            loading_times[loader_name] = time.perf_counter() - time_start
+            logger.info(
+                f"{loader_name} loader: {len(df)} rows in {loading_times[loader_name]:.2f} seconds "
+                f"({len(df) / loading_times[loader_name]:.0f} rows/second)"
+            )
+        powerplant_db_initializer.delete_table(benchmark_table_name)
+    logger.info(f"Bulk loader speedup: {loading_times['row_by_row'] / loading_times['bulk']:.1f}x")
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows loaded per transaction")
+    parser.add_argument("--reset", action="store_true", help="Delete the table before loading the data")
+    parser.add_argument(
+        "--benchmark", action="store_true", help="Compare the bulk loader against row by row inserts instead"
+    )
+    parser.add_argument("--benchmark-rows", type=int, default=2000, help="Rows loaded by each benchmarked loader")
+    parser.add_argument("--column-type", choices=COLUMN_TYPES, default="DOUBLE PRECISION", help="Reading data type")
+    parser.add_argument("--time-column", action="store_true", help="Add a column with the time of each row")
+    parser.add_argument("--plant-id", type=int, default=None, help="Add a plant column, with this id for the data")
+    parser.add_argument(
+        "--partition-interval", choices=PARTITION_INTERVALS, default=None, help="Partition the table by time"
+    )
+    parser.add_argument("--partition-start", type=date.fromisoformat, default=None, help="First partition date")
+    parser.add_argument("--partitions", type=int, default=12, help="Amount of time partitions to create")
+    parser.add_argument("--index-columns", nargs="*", default=None, help="Reading columns to index")
+    args = parser.parse_args()
+
     url = "https://archive.ics.uci.edu/static/public/294/combined+cycle+power+plant.zip"
     with tempfile.TemporaryDirectory() as tmp_dir:
         # Download data
@@ -123,9 +386,24 @@ def main():
         with zipfile.ZipFile(temp_file, "r") as zip_ref:
             zip_ref.extractall(pplant_data_path)
 
-        # Push to data server
-        logger.info("Pushing data to PostgreSQL")
-        create_tables(pplant_data_path)
+        if args.benchmark:
+            logger.info("Benchmarking data loaders")
+            benchmark_loaders(pplant_data_path, chunk_size=args.chunk_size, rows=args.benchmark_rows)
+        else:
+            # Push to data server
+            logger.info("Pushing data to PostgreSQL")
+            create_tables(
+                pplant_data_path,
+                chunk_size=args.chunk_size,
+                reset=args.reset,
+                column_type=args.column_type,
+                time_column=args.time_column,
+                plant_id=args.plant_id,
+                partition_interval=args.partition_interval,
+                partition_start=args.partition_start,
+                partitions=args.partitions,
+                indexed_columns=args.index_columns,
+            )
         logger.info("Done")
 
 
@@ -1,14 +1,28 @@
+import io
 import logging
 import os
+import uuid
+from typing import Iterator, Optional
 
-import pandas as pd
 import psycopg2
+from utils.db_pool import PowerPlantDBPool
+from utils.json_response import rows_to_dict
 from utils.logger import get_logger
+from utils.metrics import stage_timer
+from utils.row_filter import select_insert_columns, write_rows_csv
+from utils.schema_cache import SCHEMA_CACHE, TableMetadata, TableMetadataCache
 
 
 class PowerPlantDBManager:
-    def __init__(self, logger: logging.Logger = get_logger("PowerPlantManager")):
+    def __init__(
+        self,
+        logger: logging.Logger = get_logger("PowerPlantManager"),
+        pool: Optional[PowerPlantDBPool] = None,
+        schema_cache: TableMetadataCache = SCHEMA_CACHE,
+    ):
         self.logger = logger
+        self.pool = pool
+        self.schema_cache = schema_cache
         self.host = os.environ.get("POSTGRES_HOST")
         self.database = os.environ.get("POSTGRES_DB")
         self.user = os.environ.get("POSTGRES_USER")
@@ -25,33 +39,67 @@ class PowerPlantDBManager:
         cur.close()
         self.commit_connection()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close_connection()
+
     def generate_connection(self):
         if self.conn is None:
-            self.logger.info("Creating connection to PostgreSQL")
-            self.conn = psycopg2.connect(
-                host=self.host, database=self.database, user=self.user, password=self.password, port=self.port
-            )
+            with stage_timer("db_connection_checkout"):
+                if self.pool is not None:
+                    self.conn = self.pool.getconn()
+                else:
+                    self.logger.info("Creating connection to PostgreSQL")
+                    self.conn = psycopg2.connect(
+                        host=self.host, database=self.database, user=self.user, password=self.password, port=self.port
+                    )
         return self.conn
 
+    @staticmethod
+    def _execute(cur, query: str, params=None):
+        with stage_timer("sql_execution"):
+            cur.execute(query, params)
+
+    @staticmethod
+    def _to_dict(columns: list[str], rows: list[tuple]) -> dict:
+        # Converts the rows to the dictionary FastAPI serializes as JSON
+        with stage_timer("json_serialization"):
+            return rows_to_dict(columns, rows)
+
     def retrieve_column_names(self, table_name: str, ignore_id: bool = True) -> list:
         return list(self.retrieve_column_types(table_name, ignore_id).keys())
 
     def retrieve_column_types(self, table_name: str, ignore_id: bool = True) -> dict:
-        if self.table_exists(table_name):
+        column_types = self.get_table_metadata(table_name).column_types
+        if ignore_id:
+            column_types = {column: data_type for column, data_type in column_types.items() if column != "id"}
+        return dict(column_types)
+
+    def get_table_metadata(self, table_name: str) -> TableMetadata:
+        """Returns the table existence and its ordered column types, querying the database only if they aren't cached.
+
+        Args:
+            table_name (str): Name of the table.
+
+        Returns:
+            TableMetadata: Metadata of the table.
+        """
+        metadata = self.schema_cache.get(table_name)
+        if metadata is None:
+            # A single query gives both the existence and the columns, as existing tables have at least one column
+            query = """SELECT column_name, data_type FROM information_schema.columns
+                        WHERE table_catalog=%s AND table_schema='public' AND table_name=%s
+                        ORDER BY ordinal_position;"""
             self.generate_connection()
-            query = (
-                f"""SELECT column_name, data_type FROM information_schema.columns WHERE table_name = '{table_name}';"""
-            )
             cur = self.conn.cursor()
-            cur.execute(query)
+            self._execute(cur, query, (self.database, table_name))
             response = cur.fetchall()
             cur.close()
-            # response = [resp[0] for resp in response]
-            if ignore_id:
-                response = [resp for resp in response if resp[0] != "id"]
-        else:
-            response = []
-        return dict(response)
+            metadata = TableMetadata(exists=len(response) > 0, column_types=dict(response))
+            self.schema_cache.set(table_name, metadata)
+        return metadata
 
     def commit_connection(self):
         if self.conn is not None:
@@ -59,81 +107,245 @@ class PowerPlantDBManager:
 
     def close_connection(self):
         if self.conn is not None:
-            self.logger.info("Closing connection to Postgresql")
-            self.conn.close()
+            if self.pool is not None:
+                self.pool.putconn(self.conn)
+            else:
+                self.logger.info("Closing connection to Postgresql")
+                self.conn.close()
+            self.conn = None
 
     def insert_row(self, table_name: str, args_dict: dict):
         args_dict_lowercase = {str(k).lower(): v for k, v in args_dict.items()}
         if self.table_exists(table_name):
-            columns = self.retrieve_column_names(table_name)
+            columns = select_insert_columns(self.retrieve_column_names(table_name), [args_dict_lowercase])
             self.generate_connection()
             query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['%s' for _ in columns])})"
             cur = self.conn.cursor()
             args_list_ordered = [args_dict_lowercase[arg] for arg in columns]
-            cur.execute(query, args_list_ordered)
+            self._execute(cur, query, args_list_ordered)
             cur.close()
             self.commit_connection()
 
+    def copy_rows(self, table_name: str, rows: list[dict]) -> int:
+        """Inserts multiple rows in a single transaction using COPY FROM STDIN.
+
+        Args:
+            table_name (str): Name of the table.
+            rows (list[dict]): Rows to insert, containing a value for each of the table's columns (besides the id and
+                the optional time and plant columns).
+
+        Returns:
+            int: Amount of rows inserted.
+        """
+        if not self.table_exists(table_name) or len(rows) == 0:
+            return 0
+        rows_lowercase = [{str(k).lower(): v for k, v in row.items()} for row in rows]
+        columns = select_insert_columns(self.retrieve_column_names(table_name), rows_lowercase)
+        buffer = io.StringIO()
+        write_rows_csv(buffer, columns, rows_lowercase)
+        buffer.seek(0)
+        self.copy_csv_buffer(table_name, columns, buffer)
+        return len(rows)
+
+    def copy_csv_buffer(self, table_name: str, columns: list[str], buffer: io.StringIO):
+        """Loads a CSV buffer (without header) into a table using COPY FROM STDIN, committing once it's done.
+
+        Args:
+            table_name (str): Name of the table.
+            columns (list[str]): Table columns, in the same order as they appear in the buffer.
+            buffer (io.StringIO): CSV data to load.
+        """
+        self.generate_connection()
+        cur = self.conn.cursor()
+        try:
+            cur.copy_expert(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        except psycopg2.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        self.commit_connection()
+
     def retrieve_data(self, table_name: str) -> dict:
-        if self.table_exists(table_name):
-            query = f"SELECT * from {table_name}"
-            df = pd.read_sql_query(query, self.generate_connection())
-            df = df.set_index("id")
-        else:
-            df = pd.DataFrame()
-        return df.to_dict(orient="index")
+        if not self.table_exists(table_name):
+            return {}
+        return self.__retrieve_data(f"SELECT * FROM {table_name}")
 
-    def __retrieve_data(self, sql_query) -> pd.DataFrame:
-        df = pd.read_sql_query(sql_query, self.generate_connection())
-        df = df.set_index("id")
-        return df
+    def __retrieve_data(self, sql_query, params: Optional[tuple] = None) -> dict:
+        # Rows are fetched as tuples and indexed by id (the first column), without building a DataFrame
+        self.generate_connection()
+        cur = self.conn.cursor()
+        self._execute(cur, sql_query, params)
+        rows = cur.fetchall()
+        columns = [column.name for column in cur.description]
+        cur.close()
+        return self._to_dict(columns, rows)
 
     def retrieve_rows(self, table_name: str, limit: int = 100, offset: int = 0) -> dict:
-        if self.table_exists(table_name):
-            query = f"SELECT * from {table_name} LIMIT {limit} OFFSET {offset}"
-            df = self.__retrieve_data(query)
-        else:
-            df = pd.DataFrame()
-        return df.to_dict(orient="index")
+        if not self.table_exists(table_name):
+            return {}
+        return self.__retrieve_data(f"SELECT * FROM {table_name} LIMIT %s OFFSET %s", (limit, offset))
 
     def retrieve_row(self, table_name: str, row_id: int) -> dict:
-        if self.table_exists(table_name):
-            query = f"SELECT * from {table_name} WHERE id={row_id}"
-            df = self.__retrieve_data(query)
-        else:
-            df = pd.DataFrame()
-        return df.to_dict(orient="index")
+        if not self.table_exists(table_name):
+            return {}
+        return self.__retrieve_data(f"SELECT * FROM {table_name} WHERE id=%s", (row_id,))
+
+    def retrieve_rows_after(
+        self, table_name: str, after_id: int = 0, limit: int = 100, end_id: Optional[int] = None
+    ) -> tuple[dict, Optional[int]]:
+        """Retrieves a page of rows ordered by id using keyset pagination, which uses the primary key index to jump
+        straight to the first row of the page instead of scanning and discarding the rows before it like OFFSET.
+
+        Args:
+            table_name (str): Name of the table.
+            after_id (int, optional): Only rows with an id greater than this one are returned. Defaults to 0.
+            limit (int, optional): Maximum amount of rows to return. Defaults to 100.
+            end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are
+                returned. Defaults to None.
+
+        Returns:
+            tuple[dict, Optional[int]]: Rows indexed by id, and the cursor to request the next page with (None if
+                there are no more rows).
+        """
+        if not self.table_exists(table_name):
+            return {}, None
+        query = f"SELECT * FROM {table_name} WHERE id > %s"
+        params = [after_id]
+        if end_id is not None:
+            query += " AND id <= %s"
+            params.append(end_id)
+        query += " ORDER BY id LIMIT %s"
+        params.append(limit)
+        rows = self.__retrieve_data(query, tuple(params))
+        next_cursor = next(reversed(rows)) if len(rows) == limit else None
+        return rows, next_cursor
+
+    def stream_rows(
+        self,
+        table_name: str,
+        start_id: Optional[int] = None,
+        end_id: Optional[int] = None,
+        chunk_size: int = 10000,
+        select_columns: Optional[list[str]] = None,
+    ) -> Iterator[tuple[list[str], list[tuple]]]:
+        """Streams the rows of a table ordered by id using a server-side cursor, so only one chunk of rows is held in
+        memory at a time regardless of the table size.
+
+        Args:
+            table_name (str): Name of the table.
+            start_id (Optional[int], optional): If given, only rows with an id greater or equal to this one are
+                returned. Defaults to None.
+            end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are
+                returned. Defaults to None.
+            chunk_size (int, optional): Amount of rows fetched from the database at a time. Defaults to 10000.
+            select_columns (Optional[list[str]], optional): Columns or expressions to select. If None, all the
+                columns are selected. Defaults to None.
+
+        Yields:
+            Iterator[tuple[list[str], list[tuple]]]: Column names and the rows of each chunk.
+        """
+        if not self.table_exists(table_name):
+            return
+        conditions, params = [], []
+        if start_id is not None:
+            conditions.append("id >= %s")
+            params.append(start_id)
+        if end_id is not None:
+            conditions.append("id <= %s")
+            params.append(end_id)
+        query = f"SELECT {', '.join(select_columns) if select_columns else '*'} FROM {table_name}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
 
-    def table_exists(self, table_name: str) -> bool:
-        table_existence_command = f"""
-        SELECT EXISTS(SELECT 1 FROM information_schema.tables
-                        WHERE table_catalog='{self.database}' AND
-                        table_schema='public' AND
-                        table_name='{table_name}');
-                        """
         self.generate_connection()
-        cur = self.conn.cursor()
-        cur.execute(table_existence_command)
-        response = cur.fetchall()
-        cur.close()
-        return response[0][0]
+        cur = self.conn.cursor(name=f"{table_name}_stream_{uuid.uuid4().hex}")
+        cur.itersize = chunk_size
+        try:
+            cur.execute(query, tuple(params))
+            columns = None
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if columns is None:
+                    columns = [column.name for column in cur.description]
+                yield columns, rows
+        finally:
+            cur.close()
+            self.conn.rollback()
+
+    def table_exists(self, table_name: str) -> bool:
+        return self.get_table_metadata(table_name).exists
 
     def retrieve_all(self, table_name: str) -> list:
         if self.table_exists(table_name):
             self.generate_connection()
             cur = self.conn.cursor()
-            cur.execute(f"SELECT * FROM {table_name}")
+            self._execute(cur, f"SELECT * FROM {table_name}")
             response = cur.fetchall()
             cur.close()
         else:
             response = []
         return response
 
+    def retrieve_id_range(self, table_name: str) -> dict:
+        """Returns the lowest and highest ids of a table, as well as its amount of rows.
+
+        Args:
+            table_name (str): Name of the table.
+
+        Returns:
+            dict: Dictionary containing the min_id, max_id (None if the table is empty) and rows.
+        """
+        if self.table_exists(table_name):
+            self.generate_connection()
+            cur = self.conn.cursor()
+            self._execute(cur, f"SELECT MIN(id), MAX(id), COUNT(*) FROM {table_name}")
+            min_id, max_id, rows = cur.fetchall()[0]
+            cur.close()
+        else:
+            min_id, max_id, rows = None, None, 0
+        return {"min_id": min_id, "max_id": max_id, "rows": rows}
+
+    def retrieve_fingerprint(self, table_name: str, end_id: Optional[int] = None) -> dict:
+        """Returns a fingerprint of the contents of a table, or of the rows up to an id, used to check whether a
+        local copy of them is still up to date.
+
+        The checksum sums a 64 bit hash of each row, so it doesn't depend on the order in which the rows are scanned
+        and it changes if any row is added, updated or deleted.
+
+        Args:
+            table_name (str): Name of the table.
+            end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are included.
+                Defaults to None.
+
+        Returns:
+            dict: Dictionary containing the min_id, max_id (None if there are no rows), rows and checksum.
+        """
+        if self.table_exists(table_name):
+            query = f"""SELECT MIN(id), MAX(id), COUNT(*),
+                COALESCE(SUM(('x' || SUBSTR(MD5(t::text), 1, 16))::bit(64)::bigint), 0)
+                FROM {table_name} AS t"""
+            params = None
+            if end_id is not None:
+                query += " WHERE id <= %s"
+                params = (end_id,)
+            self.generate_connection()
+            cur = self.conn.cursor()
+            self._execute(cur, query, params)
+            min_id, max_id, rows, checksum = cur.fetchall()[0]
+            cur.close()
+        else:
+            min_id, max_id, rows, checksum = None, None, 0, 0
+        return {"min_id": min_id, "max_id": max_id, "rows": rows, "checksum": str(checksum)}
+
     def count_rows(self, table_name: str) -> int:
         if self.table_exists(table_name):
             self.generate_connection()
             cur = self.conn.cursor()
-            cur.execute(f"SELECT COUNT(*) FROM {table_name}")
+            self._execute(cur, f"SELECT COUNT(*) FROM {table_name}")
             response = cur.fetchall()[0][0]
             cur.close()
         else:
@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import psycopg2
+from psycopg2 import pool
+from utils.logger import get_logger
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out from the pool within the configured timeout."""
+
+
+class PowerPlantDBPool:
+    """Thread-safe pool of PostgreSQL connections shared by the PowerPlantDBManager instances of a process.
+
+    Connections are health checked when checked out, and the time spent waiting for a connection is recorded,
+    so the pool size can be tuned looking at the checkout metrics.
+    """
+
+    def __init__(
+        self,
+        min_size: int = int(os.environ.get("POSTGRES_POOL_MIN_SIZE", 1)),
+        max_size: int = int(os.environ.get("POSTGRES_POOL_MAX_SIZE", 10)),
+        checkout_timeout: float = float(os.environ.get("POSTGRES_POOL_TIMEOUT", 5)),
+        health_check_interval: float = float(os.environ.get("POSTGRES_POOL_HEALTH_CHECK_INTERVAL", 30)),
+        logger: logging.Logger = get_logger("PowerPlantDBPool"),
+    ) -> None:
+        """Creates the connection pool, opening `min_size` connections right away.
+
+        Args:
+            min_size (int, optional): Connections kept open at all times. Defaults to the POSTGRES_POOL_MIN_SIZE
+                environment variable, or 1.
+            max_size (int, optional): Maximum amount of open connections. Defaults to the POSTGRES_POOL_MAX_SIZE
+                environment variable, or 10.
+            checkout_timeout (float, optional): Seconds to wait for a free connection before giving up. Defaults to
+                the POSTGRES_POOL_TIMEOUT environment variable, or 5.
+            health_check_interval (float, optional): Connections idle for longer than this amount of seconds are
+                pinged before being handed out. Defaults to the POSTGRES_POOL_HEALTH_CHECK_INTERVAL environment
+                variable, or 30.
+            logger (logging.Logger, optional): Logger to use to log information.
+                Defaults to get_logger("PowerPlantDBPool").
+        """
+        self.logger = logger
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self.logger.info(f"Creating PostgreSQL connection pool (min: {min_size}, max: {max_size})")
+        self._pool = pool.ThreadedConnectionPool(
+            min_size,
+            max_size,
+            host=os.environ.get("POSTGRES_HOST"),
+            database=os.environ.get("POSTGRES_DB"),
+            user=os.environ.get("POSTGRES_USER"),
+            password=os.environ.get("POSTGRES_PASSWORD"),
+            port="5432",
+        )
+        # ThreadedConnectionPool raises right away when exhausted, the semaphore makes callers wait instead
+        self._available = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._last_used: dict[int, float] = {}
+        self._stats = {
+            "checkouts": 0,
+            "checkout_wait_seconds": 0.0,
+            "max_checkout_wait_seconds": 0.0,
+            "timeouts": 0,
+            "unhealthy_connections": 0,
+            "in_use": 0,
+        }
+
+    def getconn(self):
+        """Checks out a healthy connection from the pool.
+
+        Raises:
+            PoolTimeoutError: If no connection became available within the checkout timeout.
+
+        Returns:
+            connection: psycopg2 connection.
+        """
+        checkout_start = time.perf_counter()
+        if not self._available.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeoutError(f"No PostgreSQL connection available after {self.checkout_timeout} seconds")
+        try:
+            conn = self._pool.getconn()
+            while not self._is_healthy(conn):
+                with self._lock:
+                    self._stats["unhealthy_connections"] += 1
+                self.logger.warning("Discarding unhealthy PostgreSQL connection")
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._available.release()
+            raise
+
+        checkout_wait = time.perf_counter() - checkout_start
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_wait_seconds"] += checkout_wait
+            self._stats["max_checkout_wait_seconds"] = max(self._stats["max_checkout_wait_seconds"], checkout_wait)
+            self._stats["in_use"] += 1
+        return conn
+
+    def putconn(self, conn):
+        """Returns a connection to the pool, rolling back any transaction left open.
+
+        Args:
+            conn (connection): psycopg2 connection checked out with getconn.
+        """
+        with self._lock:
+            self._last_used[id(conn)] = time.monotonic()
+            self._stats["in_use"] -= 1
+        try:
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._available.release()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def close(self):
+        self.logger.info("Closing PostgreSQL connection pool")
+        self._pool.closeall()
+
+    def stats(self) -> dict:
+        """Returns the pool metrics, including checkout counts and wait times.
+
+        Returns:
+            dict: Dictionary containing the pool metrics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mean_checkout_wait_seconds"] = (
+            stats["checkout_wait_seconds"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        )
+        stats["min_size"] = self.min_size
+        stats["max_size"] = self.max_size
+        return stats
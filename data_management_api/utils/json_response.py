@@ -0,0 +1,32 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from utils.metrics import stage_timer
+from utils.serialization import json_default
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson. Integer keys (e.g. row ids) are converted to strings, like the
+    standard library json module does.
+
+    Handlers returning it directly also skip FastAPI's jsonable_encoder, which walks every value of the content.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with stage_timer("response_rendering"):
+            return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def rows_to_dict(columns: list[str], rows: list[tuple]) -> dict:
+    """Indexes rows by their first value, mapping the rest of the columns to their values.
+
+    Args:
+        columns (list[str]): Column names, starting with the id.
+        rows (list[tuple]): Rows, with their values in the same order as the columns.
+
+    Returns:
+        dict: Dictionary mapping each id to a dictionary of column names and values.
+    """
+    value_columns = columns[1:]
+    return {row[0]: dict(zip(value_columns, row[1:])) for row in rows}
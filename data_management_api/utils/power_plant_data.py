@@ -1,6 +1,11 @@
-import pandas as pd
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class PowerPlantData(BaseModel):
     temperature: float
@@ -8,17 +13,28 @@ class PowerPlantData(BaseModel):
     atmospheric_pressure: float
     relative_humidity: float
     electrical_output: float
+    # Only stored in tables created with a time or plant column
+    recorded_at: Optional[datetime] = None
+    plant_id: Optional[int] = None
+
+    def to_frame(self) -> "pd.DataFrame":
+        # pandas is imported here so the API workers, which don't build frames, don't pay for importing it
+        import pandas as pd
 
-    def to_frame(self) -> pd.DataFrame:
         data_dict = self.to_dict()
         df = pd.DataFrame(data_dict, index=[0])
         return df
 
     def to_dict(self) -> dict:
-        return {
+        data_dict = {
             "temperature": self.temperature,
             "exhaust_vacuum": self.exhaust_vacuum,
             "atmospheric_pressure": self.atmospheric_pressure,
             "relative_humidity": self.relative_humidity,
             "electrical_output": self.electrical_output,
         }
+        if self.recorded_at is not None:
+            data_dict["recorded_at"] = self.recorded_at
+        if self.plant_id is not None:
+            data_dict["plant_id"] = self.plant_id
+        return data_dict
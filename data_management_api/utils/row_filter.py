@@ -0,0 +1,129 @@
+import csv
+import io
+from datetime import datetime, timezone
+from typing import Optional
+
+# Optional columns tables can be created with, see PowerPlantDBInitializer.create_table
+TIME_COLUMN = "recorded_at"
+PLANT_COLUMN = "plant_id"
+
+
+class RowFilter:
+    def __init__(
+        self,
+        start_id: Optional[int] = None,
+        end_id: Optional[int] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        plant_id: Optional[int] = None,
+        value_ranges: Optional[dict[str, tuple[Optional[float], Optional[float]]]] = None,
+    ) -> None:
+        """Conditions restricting the rows a query reads. Each of them can use an index: the primary key for the
+        ids, the BRIN index for the time, and the B-tree indexes for the plant and the indexed value columns.
+
+        Args:
+            start_id (Optional[int], optional): If given, only rows with an id greater or equal to this one are
+                included. Defaults to None.
+            end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are included.
+                Defaults to None.
+            start_time (Optional[datetime], optional): If given, only rows recorded at or after this time are
+                included. Defaults to None.
+            end_time (Optional[datetime], optional): If given, only rows recorded before this time are included.
+                Defaults to None.
+            plant_id (Optional[int], optional): If given, only rows of this plant are included. Defaults to None.
+            value_ranges (Optional[dict[str, tuple[Optional[float], Optional[float]]]], optional): Inclusive minimum
+                and maximum (None for no limit) of the values of each column. Defaults to None.
+        """
+        self.start_id = start_id
+        self.end_id = end_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.plant_id = plant_id
+        self.value_ranges = value_ranges or {}
+
+    @staticmethod
+    def parse_value_ranges(value_ranges: Optional[list[str]]) -> dict[str, tuple[Optional[float], Optional[float]]]:
+        """Parses value ranges given as column:min:max strings, where min or max can be left empty.
+        E.g. temperature:10:20 or relative_humidity::50
+
+        Args:
+            value_ranges (Optional[list[str]]): Value ranges to parse.
+
+        Raises:
+            ValueError: If a value range isn't formatted as column:min:max.
+
+        Returns:
+            dict[str, tuple[Optional[float], Optional[float]]]: Minimum and maximum of each column.
+        """
+        parsed_ranges = {}
+        for value_range in value_ranges or []:
+            parts = value_range.split(":")
+            if len(parts) != 3 or not parts[0]:
+                raise ValueError(f"Value range {value_range} needs to be formatted as column:min:max")
+            parsed_ranges[parts[0].lower()] = tuple(float(limit) if limit else None for limit in parts[1:])
+        return parsed_ranges
+
+    def build_condition(self, params: list, column_types: dict) -> str:
+        """Builds the WHERE clause applying the filter, appending its values to the query parameters.
+
+        Args:
+            params (list): Query parameters, to which the filter values are appended.
+            column_types (dict): Column names and their PostgreSQL data types, used to check the filtered columns
+                exist.
+
+        Raises:
+            ValueError: If a filtered column doesn't exist in the table.
+
+        Returns:
+            str: WHERE clause, empty if there are no conditions.
+        """
+        bounds = [("id", ">=", self.start_id), ("id", "<=", self.end_id)]
+        bounds += [(TIME_COLUMN, ">=", self.start_time), (TIME_COLUMN, "<", self.end_time)]
+        bounds.append((PLANT_COLUMN, "=", self.plant_id))
+        for column, (minimum, maximum) in self.value_ranges.items():
+            bounds += [(column, ">=", minimum), (column, "<=", maximum)]
+
+        conditions = []
+        for column, operator, value in bounds:
+            if value is None:
+                continue
+            if column != "id" and column not in column_types:
+                raise ValueError(f"Can't filter by {column}, the table doesn't have that column")
+            params.append(value)
+            conditions.append(f"{column} {operator} ${len(params)}")
+        return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def select_insert_columns(columns: list[str], rows: list[dict]) -> list[str]:
+    """Returns the table columns to write, leaving out the optional time and plant columns when none of the rows has
+    a value for them, so tables created with them keep accepting rows without them.
+
+    Args:
+        columns (list[str]): Table columns, without the id.
+        rows (list[dict]): Rows to write, with lowercase keys.
+
+    Returns:
+        list[str]: Columns to write.
+    """
+    return [
+        column
+        for column in columns
+        if column not in (TIME_COLUMN, PLANT_COLUMN) or any(row.get(column) is not None for row in rows)
+    ]
+
+
+def write_rows_csv(buffer: io.StringIO, columns: list[str], rows: list[dict]):
+    """Writes rows as CSV (without header) to be loaded with COPY. Rows without a value for the optional time column
+    get the insertion time, like the column default does for single inserts, and rows without a plant get none.
+
+    Args:
+        buffer (io.StringIO): Buffer to write the rows to.
+        columns (list[str]): Columns to write, as returned by select_insert_columns.
+        rows (list[dict]): Rows to write, with lowercase keys.
+    """
+    defaults = {TIME_COLUMN: datetime.now(timezone.utc), PLANT_COLUMN: None}
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [row.get(column, defaults[column]) if column in defaults else row[column] for column in columns]
+        )
@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+from typing import Optional
+
+
+class TableMetadata:
+    def __init__(self, exists: bool, column_types: dict) -> None:
+        """Metadata of a database table.
+
+        Args:
+            exists (bool): Whether the table exists.
+            column_types (dict): Column names and their data types, in the order they are defined in the table.
+        """
+        self.exists = exists
+        self.column_types = column_types
+        self.created_at = time.monotonic()
+
+
+class TableMetadataCache:
+    """Per process cache of table metadata (existence, ordered columns and their types).
+
+    Entries are invalidated explicitly when tables are created or deleted, and optionally expire after a TTL so
+    changes made by other processes (e.g. the database initialization script) are eventually picked up.
+    """
+
+    def __init__(self, ttl: Optional[float] = None) -> None:
+        """Creates the metadata cache.
+
+        Args:
+            ttl (Optional[float], optional): Seconds an entry is considered valid. If None, entries never expire.
+                Defaults to None.
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tables: dict[str, TableMetadata] = {}
+
+    def get(self, table_name: str) -> Optional[TableMetadata]:
+        with self._lock:
+            metadata = self._tables.get(table_name)
+        if metadata is not None and self.ttl is not None and time.monotonic() - metadata.created_at >= self.ttl:
+            self.invalidate(table_name)
+            return None
+        return metadata
+
+    def set(self, table_name: str, metadata: TableMetadata):
+        with self._lock:
+            self._tables[table_name] = metadata
+
+    def invalidate(self, table_name: Optional[str] = None):
+        """Removes cached metadata.
+
+        Args:
+            table_name (Optional[str], optional): Table for which to remove the metadata. If None, the metadata of
+                all the tables is removed. Defaults to None.
+        """
+        with self._lock:
+            if table_name is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(table_name, None)
+
+
+_ttl = os.environ.get("SCHEMA_CACHE_TTL", "60")
+SCHEMA_CACHE = TableMetadataCache(ttl=float(_ttl) if _ttl.lower() != "none" else None)
@@ -0,0 +1,27 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+
+
+def json_default(value: Any) -> Any:
+    # Only called for the types orjson doesn't serialize natively, e.g. NUMERIC values read without a cast. Datetimes
+    # (e.g. the optional time column) are serialized natively as RFC 3339 strings
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def rows_to_ndjson(columns: list[str], rows: list[tuple]) -> bytes:
+    """Serializes rows as NDJSON, one object per row.
+
+    Args:
+        columns (list[str]): Column names.
+        rows (list[tuple]): Rows, with their values in the same order as the columns.
+
+    Returns:
+        bytes: One JSON object per line, each of them ending in a newline.
+    """
+    return b"".join(
+        orjson.dumps(dict(zip(columns, row)), default=json_default, option=orjson.OPT_APPEND_NEWLINE) for row in rows
+    )
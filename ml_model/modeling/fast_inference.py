@@ -0,0 +1,180 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import xgboost
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+FORMAT_VERSION = 1
+METADATA_FILE = "metadata.json"
+PREPROCESSING_FILE = "preprocessing.npz"
+BOOSTER_FILE = "booster.ubj"
+SUPPORTED_FORMAT_VERSIONS = (FORMAT_VERSION,)
+
+
+def export_fast_inference(
+    pipeline: Pipeline,
+    output_dir: Path,
+    preprocessor_name: str = "processing_pipeline",
+    feature_selector_name: str = "feature_selector",
+    estimator_name: str = "estimator",
+) -> Path:
+    """Exports a fitted pipeline to a compact format that can be used for inference without sklearn or pandas.
+
+    The imputation and scaling steps are folded into per feature arrays (X * multiplier + offset after replacing
+    missing values), the feature selection into the indices of the kept features, and the booster is saved in
+    XGBoost's native UBJSON format. Only pipelines with numeric features are supported.
+
+    Args:
+        pipeline (Pipeline): Fitted pipeline, as built in train.py.
+        output_dir (Path): Directory in which to save the exported files.
+        preprocessor_name (str, optional): Name of the ColumnTransformer step. Defaults to "processing_pipeline".
+        feature_selector_name (str, optional): Name of the feature selection step. Defaults to "feature_selector".
+        estimator_name (str, optional): Name of the XGBoost estimator step. Defaults to "estimator".
+
+    Raises:
+        ValueError: If the pipeline contains steps that can't be exported, like categorical features or outlier
+            removal.
+
+    Returns:
+        Path: Directory containing the exported files.
+    """
+    data_preprocessor = pipeline.named_steps["data_preprocessor"]
+    if data_preprocessor.remove_outliers:
+        raise ValueError("Pipelines removing outliers can't be exported for fast inference")
+
+    transformers = {
+        name: (transformer, list(columns))
+        for name, transformer, columns in pipeline.named_steps[preprocessor_name].transformers_
+    }
+    if len(transformers.get("categorical", (None, []))[1]) > 0:
+        raise ValueError("Pipelines with categorical features can't be exported for fast inference")
+    numeric_pipeline, feature_names = transformers["numeric"]
+
+    impute_values = numeric_pipeline.named_steps["imputer"].statistics_.astype(np.float64)
+    scaler = numeric_pipeline.named_steps["scaler"]
+    if isinstance(scaler, StandardScaler):
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(feature_names))
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(feature_names))
+        multiplier, offset = 1 / scale, -mean / scale
+    elif isinstance(scaler, MinMaxScaler):
+        multiplier, offset = scaler.scale_, scaler.min_
+    else:
+        raise ValueError(f"Scaler {type(scaler).__name__} can't be exported for fast inference")
+
+    selected_features = pipeline.named_steps[feature_selector_name].get_support(indices=True)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        output_dir / PREPROCESSING_FILE,
+        impute_values=impute_values,
+        multiplier=np.asarray(multiplier, dtype=np.float64),
+        offset=np.asarray(offset, dtype=np.float64),
+        selected_features=selected_features.astype(np.int64),
+    )
+    pipeline.named_steps[estimator_name].get_booster().save_model(str(output_dir / BOOSTER_FILE))
+    with open(output_dir / METADATA_FILE, "w") as f:
+        json.dump({"format_version": FORMAT_VERSION, "feature_names": feature_names}, f, indent=2)
+    return output_dir
+
+
+class FastPredictor:
+    """Predictor for the pipelines exported with export_fast_inference. Used by the serving API, and to verify the
+    exports when they are created.
+
+    The preprocessing (imputation, scaling and feature selection) is applied with plain NumPy operations and the
+    booster is called directly, avoiding the sklearn pipeline and pandas overhead on every prediction.
+    """
+
+    def __init__(
+        self,
+        feature_names: list[str],
+        impute_values: np.ndarray,
+        multiplier: np.ndarray,
+        offset: np.ndarray,
+        selected_features: np.ndarray,
+        booster: xgboost.Booster,
+    ) -> None:
+        self.feature_names = feature_names
+        self.impute_values = impute_values
+        self.multiplier = multiplier
+        self.offset = offset
+        self.selected_features = selected_features
+        self.booster = booster
+
+    @classmethod
+    def load(cls, export_dir: Path, nthread: Optional[int] = None) -> "FastPredictor":
+        """Loads an exported pipeline.
+
+        Args:
+            export_dir (Path): Directory containing the exported files.
+            nthread (Optional[int], optional): Threads used by XGBoost. If None, XGBoost's default is used.
+                Defaults to None.
+
+        Raises:
+            ValueError: If the export format version isn't supported.
+
+        Returns:
+            FastPredictor: Loaded predictor.
+        """
+        export_dir = Path(export_dir)
+        with open(export_dir / METADATA_FILE) as f:
+            metadata = json.load(f)
+        if metadata["format_version"] not in SUPPORTED_FORMAT_VERSIONS:
+            raise ValueError(f"Fast inference format version {metadata['format_version']} not supported")
+        preprocessing = np.load(export_dir / PREPROCESSING_FILE)
+        booster = xgboost.Booster(model_file=str(export_dir / BOOSTER_FILE))
+        if nthread is not None:
+            booster.set_param({"nthread": nthread})
+        return cls(
+            feature_names=metadata["feature_names"],
+            impute_values=preprocessing["impute_values"],
+            multiplier=preprocessing["multiplier"],
+            offset=preprocessing["offset"],
+            selected_features=preprocessing["selected_features"],
+            booster=booster,
+        )
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predicts from raw readings.
+
+        Args:
+            X (np.ndarray): Readings, with one column per feature in the order of feature_names. Missing values
+                are represented as NaN.
+
+        Returns:
+            np.ndarray: Predictions.
+        """
+        # The preprocessing is done in double precision like sklearn does, so the features given to the booster are
+        # exactly the same as with the original pipeline
+        values = np.asarray(X, dtype=np.float64).reshape(-1, len(self.feature_names))
+        values = np.where(np.isnan(values), self.impute_values, values)
+        values = values * self.multiplier + self.offset
+        return self.booster.inplace_predict(values[:, self.selected_features].astype(np.float32))
+
+
+def verify_fast_inference(pipeline: Pipeline, export_dir: Path, X: pd.DataFrame, tolerance: float = 1e-4) -> float:
+    """Checks that an exported pipeline predicts the same as the original one.
+
+    Args:
+        pipeline (Pipeline): Original pipeline.
+        export_dir (Path): Directory containing the exported files.
+        X (pd.DataFrame): Input features used for the comparison.
+        tolerance (float, optional): Maximum absolute difference allowed between predictions. Defaults to 1e-4.
+
+    Raises:
+        ValueError: If the predictions differ by more than the tolerance.
+
+    Returns:
+        float: Maximum absolute difference between predictions.
+    """
+    predictor = FastPredictor.load(export_dir)
+    predictions = predictor.predict(X[predictor.feature_names].to_numpy(dtype=np.float64))
+    max_error = float(np.max(np.abs(pipeline.predict(X) - predictions), initial=0.0))
+    if max_error > tolerance:
+        raise ValueError(f"Fast inference predictions differ from the pipeline ones by up to {max_error}")
+    return max_error
@@ -0,0 +1,258 @@
+import logging
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Optional
+
+import numpy as np
+from xgboost import XGBRegressor
+
+# Training and validation data shared with the worker processes, set once per worker by _init_worker
+_WORKER_DATA = {}
+
+
+def sample_params(search_space: dict, rng: np.random.Generator) -> dict:
+    """Samples a configuration from a search space.
+
+    Args:
+        search_space (dict): Parameter names and their distributions. Each distribution is a dictionary with a type
+            (uniform, loguniform, int or choice) and either a low and high bound or a list of values.
+        rng (np.random.Generator): Random generator used to sample.
+
+    Raises:
+        ValueError: If a distribution type isn't recognized.
+
+    Returns:
+        dict: Sampled parameters.
+    """
+    params = {}
+    for name, distribution in search_space.items():
+        distribution_type = distribution["type"].lower()
+        if distribution_type == "uniform":
+            params[name] = float(rng.uniform(distribution["low"], distribution["high"]))
+        elif distribution_type == "loguniform":
+            params[name] = float(np.exp(rng.uniform(np.log(distribution["low"]), np.log(distribution["high"]))))
+        elif distribution_type == "int":
+            params[name] = int(rng.integers(distribution["low"], distribution["high"], endpoint=True))
+        elif distribution_type == "choice":
+            params[name] = distribution["values"][rng.integers(len(distribution["values"]))]
+        else:
+            raise ValueError(f"Distribution type {distribution['type']} of parameter {name} not recognized")
+    return params
+
+
+class ASHAScheduler:
+    """Asynchronous successive halving (ASHA).
+
+    Trials start with the minimum resource (boosting rounds). Whenever a worker is free, the best trials of a rung
+    (the top 1/reduction_factor of the ones completed in it) are promoted to the next rung, which multiplies their
+    resource by reduction_factor, and new trials are only started when there is nothing to promote. Promotions
+    don't wait for a rung to be complete, so workers are never idle waiting for stragglers.
+    """
+
+    def __init__(self, min_resource: int, max_resource: int, reduction_factor: int = 3) -> None:
+        self.reduction_factor = reduction_factor
+        n_rungs = int(math.floor(math.log(max_resource / min_resource, reduction_factor))) + 1
+        self.rung_resources = [min(min_resource * reduction_factor**rung, max_resource) for rung in range(n_rungs)]
+        self.rung_resources[-1] = max_resource
+        # Scores of the trials completed in each rung, and the trials promoted from each rung
+        self._rung_scores: list[dict[int, float]] = [{} for _ in self.rung_resources]
+        self._promoted: list[set[int]] = [set() for _ in self.rung_resources]
+
+    def report(self, trial_id: int, rung: int, score: float):
+        self._rung_scores[rung][trial_id] = score
+
+    def next_promotion(self) -> Optional[tuple[int, int]]:
+        """Returns the trial to promote and the rung it's promoted to, or None if no trial can be promoted."""
+        for rung in reversed(range(len(self.rung_resources) - 1)):
+            scores = self._rung_scores[rung]
+            n_promotable = len(scores) // self.reduction_factor
+            if n_promotable == 0:
+                continue
+            for trial_id in sorted(scores, key=scores.get)[:n_promotable]:
+                if trial_id not in self._promoted[rung]:
+                    self._promoted[rung].add(trial_id)
+                    return trial_id, rung + 1
+        return None
+
+    def best_trial(self) -> Optional[tuple[int, int, float]]:
+        """Returns the best trial of the highest rung with results, its rung and its score."""
+        for rung in reversed(range(len(self.rung_resources))):
+            scores = self._rung_scores[rung]
+            if scores:
+                trial_id = min(scores, key=scores.get)
+                return trial_id, rung, scores[trial_id]
+        return None
+
+
+def _init_worker(X_train, y_train, X_valid, y_valid, n_threads: int):
+    # Trials only run XGBoost, which is given its thread budget through n_jobs
+    _WORKER_DATA.update(X_train=X_train, y_train=y_train, X_valid=X_valid, y_valid=y_valid, n_threads=n_threads)
+
+
+def run_trial(params: dict, n_estimators: int, early_stopping_rounds: Optional[int], eval_metric: str) -> dict:
+    """Trains an XGBRegressor on the worker's training data, with early stopping on its validation data.
+
+    Args:
+        params (dict): XGBRegressor parameters.
+        n_estimators (int): Maximum number of boosting rounds (the trial's resource).
+        early_stopping_rounds (Optional[int]): Rounds without improvement of the validation metric after which the
+            training stops. If None, early stopping is disabled.
+        eval_metric (str): Validation metric, lower is better (e.g. rmse or mae).
+
+    Returns:
+        dict: Validation score, best iteration and training time of the trial.
+    """
+    estimator = XGBRegressor(
+        **params,
+        n_estimators=n_estimators,
+        early_stopping_rounds=early_stopping_rounds,
+        eval_metric=eval_metric,
+        n_jobs=_WORKER_DATA["n_threads"],
+    )
+    time_start = time.perf_counter()
+    estimator.fit(
+        _WORKER_DATA["X_train"],
+        _WORKER_DATA["y_train"],
+        eval_set=[(_WORKER_DATA["X_valid"], _WORKER_DATA["y_valid"])],
+        verbose=False,
+    )
+    train_time = time.perf_counter() - time_start
+    scores = estimator.evals_result()["validation_0"][eval_metric]
+    best_iteration = estimator.best_iteration if early_stopping_rounds is not None else len(scores) - 1
+    return {"score": float(scores[best_iteration]), "best_iteration": int(best_iteration), "train_time": train_time}
+
+
+class HyperparameterSearch:
+    def __init__(
+        self,
+        search_space: dict,
+        base_params: Optional[dict] = None,
+        n_trials: int = 32,
+        n_workers: Optional[int] = None,
+        threads_per_trial: int = 1,
+        min_resource: int = 100,
+        max_resource: int = 2000,
+        reduction_factor: int = 3,
+        early_stopping_rounds: Optional[int] = 50,
+        eval_metric: str = "rmse",
+        random_seed: int = 42,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Random search over XGBRegressor parameters, running trials in parallel processes and pruning the worst
+        ones with ASHA.
+
+        Args:
+            search_space (dict): Parameter names and their distributions, see sample_params.
+            base_params (Optional[dict], optional): Fixed XGBRegressor parameters, overridden by the sampled ones.
+                Defaults to None.
+            n_trials (int, optional): Configurations sampled. Defaults to 32.
+            n_workers (Optional[int], optional): Trials run in parallel. If None, as many as fit in the available
+                cores given the threads per trial. Defaults to None.
+            threads_per_trial (int, optional): Threads used by each trial. Defaults to 1.
+            min_resource (int, optional): Boosting rounds of the trials in the first rung. Defaults to 100.
+            max_resource (int, optional): Boosting rounds of the trials in the last rung. Defaults to 2000.
+            reduction_factor (int, optional): Fraction (1/reduction_factor) of the trials promoted to the next rung,
+                and factor by which their boosting rounds are multiplied. Defaults to 3.
+            early_stopping_rounds (Optional[int], optional): Rounds without improvement of the validation metric
+                after which a trial stops. If None, early stopping is disabled. Defaults to 50.
+            eval_metric (str, optional): Validation metric, lower is better. Defaults to rmse.
+            random_seed (int, optional): Seed used to sample the configurations. Defaults to 42.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
+        self.search_space = search_space
+        self.base_params = base_params or {}
+        self.n_trials = n_trials
+        self.threads_per_trial = threads_per_trial
+        self.n_workers = n_workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+        self.scheduler = ASHAScheduler(min_resource, max_resource, reduction_factor)
+        self.early_stopping_rounds = early_stopping_rounds
+        self.eval_metric = eval_metric
+        self.rng = np.random.default_rng(random_seed)
+        self.logger = logger
+        self.trials: dict[int, dict] = {}
+
+    def run(
+        self,
+        X_train: np.ndarray,
+        y_train: np.ndarray,
+        X_valid: np.ndarray,
+        y_valid: np.ndarray,
+        callback: Optional[Callable[[int, int, dict, dict], None]] = None,
+    ) -> dict:
+        """Runs the search.
+
+        Args:
+            X_train (np.ndarray): Preprocessed training features.
+            y_train (np.ndarray): Training target.
+            X_valid (np.ndarray): Preprocessed validation features, used for early stopping and to score the trials.
+            y_valid (np.ndarray): Validation target.
+            callback (Optional[Callable[[int, int, dict, dict], None]], optional): Called in the main process with
+                the trial id, rung, parameters and result of each completed trial evaluation, e.g. to log it.
+                Defaults to None.
+
+        Returns:
+            dict: Best trial, with its id, rung, parameters, score and best iteration.
+        """
+        time_start = time.perf_counter()
+        running: dict[Future, tuple[int, int]] = {}
+        with ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_init_worker,
+            initargs=(X_train, y_train, X_valid, y_valid, self.threads_per_trial),
+        ) as executor:
+            while True:
+                while len(running) < self.n_workers:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    trial_id, rung = job
+                    future = executor.submit(
+                        run_trial,
+                        {**self.base_params, **self.trials[trial_id]["params"]},
+                        self.scheduler.rung_resources[rung],
+                        self.early_stopping_rounds,
+                        self.eval_metric,
+                    )
+                    running[future] = job
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    trial_id, rung = running.pop(future)
+                    result = future.result()
+                    self.scheduler.report(trial_id, rung, result["score"])
+                    self.trials[trial_id]["results"][rung] = result
+                    self._log(
+                        f"Trial {trial_id} rung {rung} ({self.scheduler.rung_resources[rung]} rounds): "
+                        f"{self.eval_metric} {result['score']:.5f} at iteration {result['best_iteration']} "
+                        f"in {result['train_time']:.2f} seconds"
+                    )
+                    if callback is not None:
+                        callback(trial_id, rung, self.trials[trial_id]["params"], result)
+
+        trial_id, rung, score = self.scheduler.best_trial()
+        self._log(f"Search done in {time.perf_counter() - time_start:.2f} seconds, best trial {trial_id}")
+        return {
+            "trial_id": trial_id,
+            "rung": rung,
+            "params": {**self.base_params, **self.trials[trial_id]["params"]},
+            "score": score,
+            "best_iteration": self.trials[trial_id]["results"][rung]["best_iteration"],
+        }
+
+    def _next_job(self) -> Optional[tuple[int, int]]:
+        promotion = self.scheduler.next_promotion()
+        if promotion is not None:
+            return promotion
+        if len(self.trials) < self.n_trials:
+            trial_id = len(self.trials)
+            self.trials[trial_id] = {"params": sample_params(self.search_space, self.rng), "results": {}}
+            return trial_id, 0
+        return None
+
+    def _log(self, message: str):
+        if self.logger is not None:
+            self.logger.info(message)
@@ -0,0 +1,293 @@
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import xgboost
+from modeling.data_preprocessor import DataPreprocessor
+from modeling.pipeline import ProcessingPipeline
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_selection import VarianceThreshold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBRegressor
+
+
+def is_test_row(ids: pd.Index, test_size: float, random_seed: int) -> np.ndarray:
+    """Assigns rows to the test set by hashing their ids, so the split doesn't depend on how the data is chunked.
+
+    Args:
+        ids (pd.Index): Row ids.
+        test_size (float): Fraction of the rows assigned to the test set.
+        random_seed (int): Seed mixed into the hash.
+
+    Returns:
+        np.ndarray: Boolean mask, True for the rows belonging to the test set.
+    """
+    hashes = pd.util.hash_array(np.asarray(ids, dtype=np.int64) + random_seed)
+    return hashes / np.float64(2**64) < test_size
+
+
+class ChunkedDataset:
+    """Training data stored on disk as Parquet chunks, read one chunk at a time."""
+
+    SUBSETS = ("train", "validation", "test")
+
+    def __init__(
+        self,
+        chunk_paths: list[Path],
+        target_feature: str,
+        test_size: float,
+        random_seed: int,
+        validation_size: float = 0.0,
+        excluded_columns: tuple[str, ...] = (),
+    ) -> None:
+        """Creates the dataset.
+
+        Args:
+            chunk_paths (list[Path]): Paths to the Parquet chunks, indexed by id.
+            target_feature (str): Name of the target column.
+            test_size (float): Fraction of the rows assigned to the test set.
+            random_seed (int): Seed used to split the rows.
+            validation_size (float, optional): Fraction of the non test rows assigned to the validation set, e.g. for
+                early stopping. Defaults to 0.0.
+            excluded_columns (tuple[str, ...], optional): Columns dropped from the features if the chunks have them,
+                e.g. the time each row was recorded. Defaults to ().
+        """
+        self.chunk_paths = chunk_paths
+        self.target_feature = target_feature
+        self.test_size = test_size
+        self.random_seed = random_seed
+        self.validation_size = validation_size
+        self.excluded_columns = excluded_columns
+
+    def iter_chunks(self, subset: str = "train"):
+        """Iterates over the rows of each chunk belonging to a subset.
+
+        Args:
+            subset (str, optional): Either train, validation or test. Defaults to train.
+
+        Yields:
+            tuple[pd.DataFrame, pd.Series]: Features and target of each chunk.
+        """
+        if subset not in self.SUBSETS:
+            raise ValueError(f"Subset {subset} not recognized, use one of {', '.join(self.SUBSETS)}")
+        for chunk_path in self.chunk_paths:
+            chunk = pd.read_parquet(chunk_path).drop(columns=list(self.excluded_columns), errors="ignore")
+            test_rows = is_test_row(chunk.index, self.test_size, self.random_seed)
+            validation_rows = ~test_rows & is_test_row(chunk.index, self.validation_size, self.random_seed + 1)
+            if subset == "test":
+                chunk = chunk.loc[test_rows]
+            elif subset == "validation":
+                chunk = chunk.loc[validation_rows]
+            else:
+                chunk = chunk.loc[~test_rows & ~validation_rows]
+            if len(chunk) > 0:
+                yield chunk.drop(columns=[self.target_feature]), chunk[self.target_feature]
+
+    def load_subset(self, subset: str = "test", max_rows: Optional[int] = None) -> tuple[pd.DataFrame, pd.Series]:
+        """Loads the rows of a subset in memory.
+
+        Args:
+            subset (str, optional): Either train, validation or test. Defaults to test.
+            max_rows (Optional[int], optional): Maximum amount of rows to load. If None, all of them are loaded.
+                Defaults to None.
+
+        Raises:
+            ValueError: If the subset doesn't contain any rows, e.g. because the table is too small for its size.
+
+        Returns:
+            tuple[pd.DataFrame, pd.Series]: Features and target.
+        """
+        X_chunks, y_chunks, rows = [], [], 0
+        for X, y in self.iter_chunks(subset):
+            X_chunks.append(X)
+            y_chunks.append(y)
+            rows += len(X)
+            if max_rows is not None and rows >= max_rows:
+                break
+        if rows == 0:
+            raise ValueError(
+                f"The {subset} subset of the {len(self.chunk_paths)} chunks doesn't contain any rows, the table is too "
+                f"small for a test size of {self.test_size} and a validation size of {self.validation_size}"
+            )
+        X_subset, y_subset = pd.concat(X_chunks), pd.concat(y_chunks)
+        if max_rows is not None:
+            X_subset, y_subset = X_subset.iloc[:max_rows], y_subset.iloc[:max_rows]
+        return X_subset, y_subset
+
+
+class ChunkIterator(xgboost.DataIter):
+    """Feeds the preprocessed chunks of a ChunkedDataset to XGBoost, which caches them on disk (external memory)."""
+
+    def __init__(self, dataset: ChunkedDataset, transform: Callable, cache_prefix: str) -> None:
+        self.dataset = dataset
+        self.transform = transform
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data: Callable) -> int:
+        if self._chunks is None:
+            self._chunks = self.dataset.iter_chunks("train")
+        try:
+            X, y = next(self._chunks)
+        except StopIteration:
+            return 0
+        X_transformed, y = self.transform(X, y)
+        input_data(data=X_transformed, label=y.to_numpy())
+        return 1
+
+    def reset(self):
+        self._chunks = None
+
+
+def fit_preprocessing_incrementally(
+    dataset: ChunkedDataset,
+    data_preprocessor: DataPreprocessor,
+    preprocessor: ColumnTransformer,
+    feature_selector: VarianceThreshold,
+):
+    """Fits the preprocessing steps over all the chunks of a dataset without loading it fully in memory.
+
+    The steps are first fitted on the first chunk to set up their structure (columns, transformers, etc.). Their
+    statistics are then recomputed over all the chunks: the numeric imputation means, the scaler statistics
+    (through partial_fit), the categories of the categorical features and the variances used for feature selection.
+    The outlier detector of the DataPreprocessor, if enabled, is only fitted on the first chunk.
+
+    Args:
+        dataset (ChunkedDataset): Chunked training data.
+        data_preprocessor (DataPreprocessor): Data cleaning step.
+        preprocessor (ColumnTransformer): Imputation, scaling and encoding step, as built by ProcessingPipeline.
+        feature_selector (VarianceThreshold): Feature selection step.
+    """
+    X_first, _ = next(dataset.iter_chunks("train"))
+    X_first = data_preprocessor.fit_transform(X_first)
+    preprocessor.fit(X_first)
+
+    def cleaned_chunks():
+        for X, _ in dataset.iter_chunks("train"):
+            yield data_preprocessor.transform(X)
+
+    transformers = {name: (transformer, columns) for name, transformer, columns in preprocessor.transformers_}
+    numeric_pipeline, numeric_columns = transformers.get("numeric", (None, []))
+    categorical_pipeline, categorical_columns = transformers.get("categorical", (None, []))
+    numeric_columns = list(numeric_columns) if isinstance(numeric_pipeline, Pipeline) else []
+    categorical_columns = list(categorical_columns) if isinstance(categorical_pipeline, Pipeline) else []
+
+    # First pass: imputation means and categories
+    sums, counts = np.zeros(len(numeric_columns)), np.zeros(len(numeric_columns))
+    categories = {column: set() for column in categorical_columns}
+    has_missing = {column: False for column in categorical_columns}
+    for X in cleaned_chunks():
+        numeric_values = X[numeric_columns].to_numpy(dtype=np.float64)
+        sums += np.nansum(numeric_values, axis=0)
+        counts += (~np.isnan(numeric_values)).sum(axis=0)
+        for column in categorical_columns:
+            categories[column].update(X[column].dropna().unique())
+            has_missing[column] = has_missing[column] or bool(X[column].isna().any())
+
+    if numeric_columns:
+        imputer = numeric_pipeline.named_steps["imputer"]
+        imputer.statistics_ = np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
+
+        # Second pass: scaler statistics over the imputed data
+        scaler = clone(numeric_pipeline.named_steps["scaler"])
+        for X in cleaned_chunks():
+            scaler.partial_fit(imputer.transform(X[numeric_columns]))
+        numeric_pipeline.steps[-1] = (numeric_pipeline.steps[-1][0], scaler)
+
+    if categorical_columns:
+        # Refit the encoder on a frame containing every category seen in any of the chunks
+        category_lists = {
+            column: sorted(categories[column], key=str) + ([np.nan] if has_missing[column] else [])
+            for column in categorical_columns
+        }
+        max_categories = max(len(values) for values in category_lists.values())
+        categories_frame = pd.DataFrame(
+            {
+                column: values + [values[0]] * (max_categories - len(values))
+                for column, values in category_lists.items()
+            },
+            dtype=object,
+        )
+        categorical_pipeline.fit(categories_frame)
+
+    # Third pass: variances of the preprocessed features, used to select them
+    feature_selector.fit(preprocessor.transform(X_first))
+    variance_estimator = StandardScaler()
+    for X in cleaned_chunks():
+        variance_estimator.partial_fit(preprocessor.transform(X))
+    feature_selector.variances_ = variance_estimator.var_
+
+
+def train_out_of_core(
+    dataset: ChunkedDataset,
+    data_preprocessor: DataPreprocessor,
+    preprocessor: ColumnTransformer,
+    feature_selector: VarianceThreshold,
+    estimator_config: dict,
+    cache_dir: Path,
+    max_validation_rows: Optional[int] = None,
+) -> Pipeline:
+    """Trains the full pipeline over a chunked dataset, keeping at most one chunk in memory at a time. The
+    preprocessing statistics are fitted incrementally and XGBoost is trained using its external memory interface.
+
+    Args:
+        dataset (ChunkedDataset): Chunked training data.
+        data_preprocessor (DataPreprocessor): Data cleaning step.
+        preprocessor (ColumnTransformer): Imputation, scaling and encoding step, as built by ProcessingPipeline.
+        feature_selector (VarianceThreshold): Feature selection step.
+        estimator_config (dict): XGBRegressor parameters.
+        cache_dir (Path): Directory in which XGBoost caches the preprocessed chunks.
+        max_validation_rows (Optional[int], optional): Maximum rows of the validation set used for early stopping,
+            which is loaded in memory. Early stopping is only used if the estimator config sets early_stopping_rounds
+            and the dataset has a validation set. If None, the whole validation set is loaded. Defaults to None.
+
+    Returns:
+        Pipeline: Fitted pipeline, with the same steps as the one trained in memory.
+    """
+    fit_preprocessing_incrementally(dataset, data_preprocessor, preprocessor, feature_selector)
+
+    def transform(X: pd.DataFrame, y: pd.Series):
+        X_clean = data_preprocessor.transform(X)
+        # Outlier removal may drop rows, keep the target aligned
+        return feature_selector.transform(preprocessor.transform(X_clean)), y.loc[X_clean.index]
+
+    estimator = XGBRegressor(**estimator_config)
+    params = estimator.get_xgb_params()
+    if params.get("tree_method") is None:
+        # External memory requires a histogram based tree method
+        params["tree_method"] = "hist"
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    dtrain = xgboost.DMatrix(ChunkIterator(dataset, transform, cache_prefix=str(Path(cache_dir) / "xgb_cache")))
+
+    evals, early_stopping_rounds = [], None
+    if estimator.early_stopping_rounds is not None and dataset.validation_size > 0:
+        X_valid, y_valid = transform(*dataset.load_subset("validation", max_validation_rows))
+        evals = [(xgboost.DMatrix(X_valid, label=y_valid.to_numpy()), "validation")]
+        early_stopping_rounds = estimator.early_stopping_rounds
+    booster = xgboost.train(
+        params,
+        dtrain,
+        num_boost_round=estimator.n_estimators or 100,
+        evals=evals,
+        early_stopping_rounds=early_stopping_rounds,
+        verbose_eval=False,
+    )
+
+    # Load the trained booster into the sklearn estimator so the pipeline can be used and logged as usual
+    booster_path = Path(cache_dir) / "booster.json"
+    booster.save_model(str(booster_path))
+    estimator.load_model(str(booster_path))
+    if early_stopping_rounds is not None:
+        ProcessingPipeline.truncate_to_best_iteration(estimator)
+
+    return Pipeline(
+        [
+            ("data_preprocessor", data_preprocessor),
+            ("processing_pipeline", preprocessor),
+            ("feature_selector", feature_selector),
+            ("estimator", estimator),
+        ]
+    )
@@ -1,9 +1,14 @@
+import copy
+from typing import Optional
+
 import pandas as pd
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
 from sklearn.compose import make_column_selector as selector
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import MinMaxScaler, OneHotEncoder, StandardScaler
+from xgboost import XGBRegressor
 
 
 class ProcessingPipeline:
@@ -61,3 +66,137 @@ class ProcessingPipeline:
         for var in ["numerical__", "numeric__", "num__", "categorical__", "cat__"]:
             feature_map["feature"] = feature_map.feature.str.replace(var, "")
         return feature_map
+
+    @staticmethod
+    def fit_with_early_stopping(
+        pipeline: Pipeline,
+        X_train: pd.DataFrame,
+        y_train: pd.Series,
+        X_valid: pd.DataFrame,
+        y_valid: pd.Series,
+        estimator_name: str = "estimator",
+    ) -> Pipeline:
+        """Fits a pipeline ending in an XGBoost estimator, routing a validation set through the pipeline's fit
+        parameters to the estimator so it can stop adding trees once the validation metric stops improving. The
+        validation set is transformed by a copy of the preprocessing steps fitted on the same training data, so it
+        goes through exactly the same transformations as the training data.
+
+        The estimator needs to be created with early_stopping_rounds set. Once fitted, it's truncated to its best
+        iteration.
+
+        Args:
+            pipeline (Pipeline): Pipeline to fit.
+            X_train (pd.DataFrame): Training features.
+            y_train (pd.Series): Training target.
+            X_valid (pd.DataFrame): Validation features.
+            y_valid (pd.Series): Validation target.
+            estimator_name (str, optional): Name of the estimator step, which needs to be the last one.
+                Defaults to "estimator".
+
+        Returns:
+            Pipeline: Fitted pipeline.
+        """
+        preprocessing = clone(pipeline[:-1]).fit(X_train, y_train)
+        X_valid_transformed, y_valid = ProcessingPipeline.transform_with_target(preprocessing, X_valid, y_valid)
+        pipeline.fit(
+            X_train,
+            y_train,
+            **{
+                f"{estimator_name}__eval_set": [(X_valid_transformed, y_valid)],
+                f"{estimator_name}__verbose": False,
+            },
+        )
+        ProcessingPipeline.truncate_to_best_iteration(pipeline.named_steps[estimator_name])
+        return pipeline
+
+    @staticmethod
+    def transform_with_target(preprocessing: Pipeline, X: pd.DataFrame, y: pd.Series) -> tuple:
+        """Transforms data with fitted preprocessing steps, keeping the target aligned with the rows they keep.
+
+        Args:
+            preprocessing (Pipeline): Fitted preprocessing steps.
+            X (pd.DataFrame): Features.
+            y (pd.Series): Target.
+
+        Returns:
+            tuple: Transformed features and target.
+        """
+        for _, step in preprocessing.steps:
+            X = step.transform(X)
+            # Outlier removal may drop rows, keep the target aligned
+            if isinstance(X, pd.DataFrame):
+                y = y.loc[X.index]
+        return X, y
+
+    @staticmethod
+    def continue_boosting(
+        pipeline: Pipeline,
+        X_train: pd.DataFrame,
+        y_train: pd.Series,
+        n_estimators: int,
+        X_valid: Optional[pd.DataFrame] = None,
+        y_valid: Optional[pd.Series] = None,
+        early_stopping_rounds: Optional[int] = None,
+        estimator_name: str = "estimator",
+    ) -> Pipeline:
+        """Adds trees to a fitted pipeline ending in an XGBoost estimator, fitting them on new data only. The
+        preprocessing steps are reused as they were fitted, so the existing trees keep receiving the same features,
+        and the new trees are boosted on top of the existing ones (XGBoost's xgb_model continuation). The given
+        pipeline isn't modified.
+
+        Args:
+            pipeline (Pipeline): Fitted pipeline to continue.
+            X_train (pd.DataFrame): Features of the new training rows.
+            y_train (pd.Series): Target of the new training rows.
+            n_estimators (int): Maximum amount of trees to add.
+            X_valid (Optional[pd.DataFrame], optional): Validation features, used for early stopping.
+                Defaults to None.
+            y_valid (Optional[pd.Series], optional): Validation target, used for early stopping. Defaults to None.
+            early_stopping_rounds (Optional[int], optional): Rounds without improvement of the validation metric
+                after which no more trees are added. Only used if a validation set is given. Defaults to None.
+            estimator_name (str, optional): Name of the estimator step, which needs to be the last one.
+                Defaults to "estimator".
+
+        Returns:
+            Pipeline: Copy of the pipeline with the added trees.
+        """
+        pipeline = copy.deepcopy(pipeline)
+        estimator = pipeline.named_steps[estimator_name]
+        X_train_transformed, y_train = ProcessingPipeline.transform_with_target(pipeline[:-1], X_train, y_train)
+        fit_params = {"verbose": False}
+        if X_valid is not None and early_stopping_rounds is not None:
+            X_valid_transformed, y_valid = ProcessingPipeline.transform_with_target(pipeline[:-1], X_valid, y_valid)
+            fit_params["eval_set"] = [(X_valid_transformed, y_valid)]
+        else:
+            early_stopping_rounds = None
+            # A booster truncated after early stopping keeps its best iteration, which XGBoost would carry over to
+            # the continued booster, making predictions ignore the added trees
+            estimator.get_booster().set_attr(best_iteration=None, best_score=None, best_ntree_limit=None)
+        estimator.set_params(n_estimators=n_estimators, early_stopping_rounds=early_stopping_rounds)
+        estimator.fit(X_train_transformed, y_train, xgb_model=estimator.get_booster(), **fit_params)
+        if early_stopping_rounds is not None:
+            ProcessingPipeline.truncate_to_best_iteration(estimator)
+        return pipeline
+
+    @staticmethod
+    def truncate_to_best_iteration(estimator: XGBRegressor) -> XGBRegressor:
+        """Drops the trees added after the best iteration found by early stopping, which don't improve the model
+        but still need to be stored and make every prediction slower.
+
+        Args:
+            estimator (XGBRegressor): Estimator fitted with early stopping.
+
+        Returns:
+            XGBRegressor: The same estimator, truncated.
+        """
+        booster = estimator.get_booster()
+        best_iteration = booster.attr("best_iteration")
+        if best_iteration is None:
+            return estimator
+        best_iteration = int(best_iteration)
+        truncated_booster = booster[: best_iteration + 1]
+        truncated_booster.set_attr(best_iteration=str(best_iteration), best_score=booster.attr("best_score"))
+        estimator.load_model(bytearray(truncated_booster.save_raw(raw_format="json")))
+        # Stopping was already decided, don't require a validation set if the estimator is fitted again
+        estimator.set_params(n_estimators=best_iteration + 1, early_stopping_rounds=None)
+        return estimator
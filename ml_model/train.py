@@ -1,22 +1,33 @@
 import datetime
+import shutil
+import sys
 import tempfile
 import time
 from pathlib import Path
 
 import mlflow
-import pandas as pd
 from joblib import dump
+from mlflow import MlflowClient
 from mlflow.models.signature import infer_signature
 from modeling.data_preprocessor import DataPreprocessor
+from modeling.fast_inference import export_fast_inference, verify_fast_inference
+from modeling.out_of_core import ChunkedDataset, is_test_row, train_out_of_core
 from modeling.pipeline import ProcessingPipeline
 from sklearn.feature_selection import VarianceThreshold
+from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from utils.data_api_manager import DataAPIManager
+from utils.data_snapshot import DataSnapshot
 from utils.data_visualizer import DataVisualizer
 from utils.load_config import load_config_file
 from utils.logger import get_logger
-from utils.mlflow_utils import log_plotly_figure
+from utils.mlflow_utils import (
+    FINGERPRINT_TAG,
+    MAX_ID_TAG,
+    load_warm_start_model,
+    log_plotly_figure,
+)
 from utils.utils import POSTGRESQL_DATA_TYPES
 from xgboost import XGBRegressor
 
@@ -27,6 +38,8 @@ logger = get_logger(Path(__file__).stem)
 config = load_config_file(Path("config") / "xgb.yml", logger)
 path_config = config["paths"]
 modeling_config = config["modeling"]
+training_config = config["training"]
+warm_start_config = training_config["warm_start"]
 plot_config = config["plot_config"]
 
 EXPERIMENT_NAME = config["mlflow"]["experiment_name"]
@@ -35,6 +48,12 @@ mlflow.set_experiment(EXPERIMENT_NAME)
 DATA_API = "http://data_api:8000"
 
 
+def convert_data_types(data, data_api_manager: DataAPIManager):
+    data_types = data_api_manager.get_feature_types()  # For setting numerical and categorical vars
+    data_types = {k: POSTGRESQL_DATA_TYPES.get(v, str) for k, v in data_types.items()}
+    return data.astype(data_types).drop(columns=training_config["excluded_columns"], errors="ignore")
+
+
 # Enable autologging
 mlflow.sklearn.autolog(
     log_input_examples=config["mlflow"]["log_input_examples"],
@@ -43,59 +62,173 @@ mlflow.sklearn.autolog(
 )
 
 
-with mlflow.start_run():
-    # Create the API manager
-    data_api_manager = DataAPIManager(DATA_API)
+# Create the API manager
+data_api_manager = DataAPIManager(DATA_API, logger=logger, **config["data_api"])
 
-    # Download the dataset. Here we would need to be careful if we're dealing with big data,
-    # as it would crash if we try to download it all
+# Continue the training of the previous registered model on the rows added since, instead of training from scratch
+warm_start = None
+if warm_start_config["enabled"]:
+    warm_start = load_warm_start_model(
+        MlflowClient(),
+        data_api_manager,
+        model_name=warm_start_config["model_name"],
+        model_version=warm_start_config["model_version"],
+        logger=logger,
+    )
+if warm_start is not None:
+    new_data = data_api_manager.fetch_all(start_id=warm_start["max_id"] + 1)
+    if len(new_data) < warm_start_config["min_new_rows"]:
+        logger.info(f"Only {len(new_data)} rows were added since version {warm_start['version']}, not training")
+        sys.exit(0)
 
-    total_rows = data_api_manager.get_total_rows()
-    limit = 100
 
-    data_list = [data_api_manager.get_range(skip, limit) for skip in range(0, total_rows, limit)]
-    data = {key: value for dictionary in data_list for key, value in dictionary.items()}
-    data = pd.DataFrame.from_dict(data, orient="index")
+with mlflow.start_run():
+    # Local copy of the data, so unchanged or slightly grown data doesn't need to be downloaded again
+    snapshot = None
+    if config["snapshot"]["enabled"] and warm_start is None:
+        snapshot = DataSnapshot(path_config["input_path"] / "snapshot", logger=logger)
 
     target_feature = "electrical_output"
+    early_stopping_config = modeling_config["early_stopping"]
+    estimator_config = dict(modeling_config["estimator"])
+    if early_stopping_config["enabled"]:
+        estimator_config.update(
+            early_stopping_rounds=early_stopping_config["rounds"], eval_metric=early_stopping_config["eval_metric"]
+        )
+    data_preprocessor = DataPreprocessor()
+    processing_pipeline = ProcessingPipeline(modeling_config)
 
-    # Convert data types
-    data_types = data_api_manager.get_feature_types()  # For setting numerical and categorical vars
-    data_types = {k: POSTGRESQL_DATA_TYPES.get(v, str) for k, v in data_types.items()}
-    data = data.astype(data_types)
+    if warm_start is not None:
+        # Only the new rows are used: the preprocessing fitted on the previous rows is reused and trees are added on
+        # top of the previous ones, so the cost of each run is proportional to the rows added since the previous one
+        data = convert_data_types(new_data, data_api_manager)
+        max_id = int(data.index.max())
 
-    train, test = train_test_split(
-        data,
-        test_size=modeling_config["test_size"],
-        random_state=modeling_config["random_seed"],
-    )
+        # Split by hashing the ids, like the chunked mode, so the rows of each set don't depend on the rows added
+        test_rows = is_test_row(data.index, modeling_config["test_size"], modeling_config["random_seed"])
+        train, test = data.loc[~test_rows], data.loc[test_rows]
+        X_test = test.drop(columns=[target_feature])
+        y_test = test[target_feature]
 
-    X_train = train.drop(columns=[target_feature])
-    y_train = train[target_feature]
+        validation_size = early_stopping_config["validation_size"] if early_stopping_config["enabled"] else 0.0
+        validation_rows = is_test_row(train.index, validation_size, modeling_config["random_seed"] + 1)
+        train, validation = train.loc[~validation_rows], train.loc[validation_rows]
 
-    X_test = test.drop(columns=[target_feature])
-    y_test = test[target_feature]
+        # Training
+        train_time_start = time.time()
+        pipeline = ProcessingPipeline.continue_boosting(
+            warm_start["pipeline"],
+            train.drop(columns=[target_feature]),
+            train[target_feature],
+            n_estimators=warm_start_config["n_estimators"],
+            X_valid=validation.drop(columns=[target_feature]) if early_stopping_config["enabled"] else None,
+            y_valid=validation[target_feature] if early_stopping_config["enabled"] else None,
+            early_stopping_rounds=early_stopping_config["rounds"] if early_stopping_config["enabled"] else None,
+        )
+        train_time_end = time.time()
+    elif training_config["mode"] == "chunked":
+        # Download the dataset into Parquet chunks and train out-of-core, so the data never has to fit in memory
+        chunked_config = training_config["chunked"]
+        if snapshot is not None:
+            max_id = snapshot.sync(data_api_manager, page_size=chunked_config["chunk_size"])["max_id"]
+            chunk_paths = snapshot.chunk_paths
+        else:
+            chunk_dir = path_config["input_path"] / "chunks"
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+            max_id = data_api_manager.get_id_range()["max_id"]
+            chunk_paths = data_api_manager.download_to_parquet(
+                chunk_dir, end_id=max_id, page_size=chunked_config["chunk_size"]
+            )
+        dataset = ChunkedDataset(
+            chunk_paths,
+            target_feature=target_feature,
+            test_size=modeling_config["test_size"],
+            random_seed=modeling_config["random_seed"],
+            validation_size=early_stopping_config["validation_size"] if early_stopping_config["enabled"] else 0.0,
+            excluded_columns=tuple(training_config["excluded_columns"]),
+        )
+        X_test, y_test = dataset.load_subset("test", chunked_config["max_eval_rows"])
 
-    data_preprocessor = DataPreprocessor()
+        # Training
+        train_time_start = time.time()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            pipeline = train_out_of_core(
+                dataset,
+                data_preprocessor=data_preprocessor,
+                preprocessor=processing_pipeline.preprocessor,
+                feature_selector=VarianceThreshold(),
+                estimator_config=estimator_config,
+                cache_dir=Path(cache_dir),
+                max_validation_rows=chunked_config["max_eval_rows"],
+            )
+        train_time_end = time.time()
+    else:
+        # Download the dataset. The whole table needs to fit in memory, use the chunked mode otherwise
+        if snapshot is not None:
+            snapshot.sync(data_api_manager)
+            data = snapshot.load()
+        else:
+            data = data_api_manager.fetch_all()
+        max_id = int(data.index.max())
 
-    processing_pipeline = ProcessingPipeline(modeling_config)
+        # Convert data types
+        data = convert_data_types(data, data_api_manager)
 
-    estimator = XGBRegressor(**modeling_config["estimator"])
-    pipeline = Pipeline(
-        [
-            ("data_preprocessor", data_preprocessor),
-            ("processing_pipeline", processing_pipeline.preprocessor),
-            ("feature_selector", VarianceThreshold()),
-            ("estimator", estimator),
-        ]
-    )
+        train, test = train_test_split(
+            data,
+            test_size=modeling_config["test_size"],
+            random_state=modeling_config["random_seed"],
+        )
+
+        X_train = train.drop(columns=[target_feature])
+        y_train = train[target_feature]
+
+        X_test = test.drop(columns=[target_feature])
+        y_test = test[target_feature]
+
+        estimator = XGBRegressor(**estimator_config)
+        pipeline = Pipeline(
+            [
+                ("data_preprocessor", data_preprocessor),
+                ("processing_pipeline", processing_pipeline.preprocessor),
+                ("feature_selector", VarianceThreshold()),
+                ("estimator", estimator),
+            ]
+        )
 
-    # Training
-    train_time_start = time.time()
-    pipeline.fit(X_train, y_train)
-    train_time_end = time.time()
+        # Training
+        train_time_start = time.time()
+        if early_stopping_config["enabled"]:
+            X_fit, X_valid, y_fit, y_valid = train_test_split(
+                X_train,
+                y_train,
+                test_size=early_stopping_config["validation_size"],
+                random_state=modeling_config["random_seed"],
+            )
+            ProcessingPipeline.fit_with_early_stopping(pipeline, X_fit, y_fit, X_valid, y_valid)
+        else:
+            pipeline.fit(X_train, y_train)
+        train_time_end = time.time()
     logger.info(f"Model training time: {train_time_end-train_time_start} seconds")
 
+    if early_stopping_config["enabled"]:
+        best_iteration = pipeline.named_steps["estimator"].best_iteration
+        logger.info(f"Early stopping kept {best_iteration + 1} trees")
+        mlflow.log_metric("best_iteration", best_iteration)
+
+    # Identify the data the model was trained on, so later runs can continue from it
+    fingerprint = snapshot.fingerprint if snapshot is not None else data_api_manager.get_fingerprint(end_id=max_id)
+    mlflow.set_tags(
+        {
+            FINGERPRINT_TAG: DataSnapshot.fingerprint_hash(fingerprint),
+            MAX_ID_TAG: fingerprint["max_id"],
+            "data_snapshot_rows": fingerprint["rows"],
+        }
+    )
+    mlflow.log_dict(fingerprint, "Data/snapshot_fingerprint.json")
+    if warm_start is not None:
+        mlflow.set_tags({"warm_start_version": warm_start["version"], "warm_start_new_rows": len(new_data)})
+
     # Testing
     y_pred = pipeline.predict(X_test)
 
@@ -148,10 +281,34 @@ with mlflow.start_run():
     model_save_path.parent.mkdir(parents=True, exist_ok=True)
     dump(pipeline, str(model_save_path))
 
+    # Fast inference model, logged next to the sklearn model and checked to predict the same
+    if config["mlflow"]["log_fast_inference_model"]:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            export_dir = export_fast_inference(pipeline, Path(temp_dir) / "fast_inference")
+            max_error = verify_fast_inference(pipeline, export_dir, X_test.iloc[:1000])
+            logger.info(f"Fast inference model exported, max prediction difference: {max_error}")
+            mlflow.log_metric("fast_inference_max_abs_error", max_error)
+            mlflow.log_artifacts(str(export_dir), "fast_inference")
+
+    # Evaluation gate: a continued model is only registered if it predicts the new rows at least as well as the
+    # version it was continued from (within the tolerance)
+    register_model = config["mlflow"]["auto_log_model"]
+    if warm_start is not None:
+        test_rmse = mean_squared_error(y_test, y_pred, squared=False)
+        previous_test_rmse = mean_squared_error(y_test, warm_start["pipeline"].predict(X_test), squared=False)
+        mlflow.log_metrics({"warm_start_test_rmse": test_rmse, "warm_start_previous_test_rmse": previous_test_rmse})
+        gate_passed = test_rmse <= previous_test_rmse * (1 + warm_start_config["gate_tolerance"])
+        mlflow.set_tag("warm_start_gate", "passed" if gate_passed else "failed")
+        if not gate_passed:
+            logger.info(
+                f"Test RMSE {test_rmse:.4f} is worse than the {previous_test_rmse:.4f} of version "
+                f"{warm_start['version']}, not registering the model"
+            )
+            register_model = False
+
     # Register model
-    # Here we could add logic to register model or not depending on previous iteration's results for example
     # This step can also be instead performed manually on the mlflow dashboard, looking at the metrics, parameters, etc
-    if config["mlflow"]["auto_log_model"]:
+    if register_model:
         logger.info("Registering model")
         signature = infer_signature(X_test, y_pred)
         mlflow.sklearn.log_model(
@@ -0,0 +1,136 @@
+import datetime
+from pathlib import Path
+
+import mlflow
+import yaml
+from mlflow.tracking import MlflowClient
+from modeling.data_preprocessor import DataPreprocessor
+from modeling.hyperparameter_search import HyperparameterSearch
+from modeling.pipeline import ProcessingPipeline
+from sklearn.feature_selection import VarianceThreshold
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from utils.data_api_manager import DataAPIManager
+from utils.data_snapshot import DataSnapshot
+from utils.load_config import load_config_file
+from utils.logger import get_logger
+from utils.utils import POSTGRESQL_DATA_TYPES
+
+logger = get_logger(Path(__file__).stem)
+
+
+# load config
+config = load_config_file(Path("config") / "xgb.yml", logger)
+path_config = config["paths"]
+modeling_config = config["modeling"]
+tuning_config = config["tuning"]
+
+EXPERIMENT_NAME = config["mlflow"]["experiment_name"]
+DATA_API = "http://data_api:8000"
+
+
+if __name__ == "__main__":
+    mlflow.set_tracking_uri("http://mlflow_server:5000")
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    client = MlflowClient()
+
+    with mlflow.start_run(run_name=f"tuning_{datetime.datetime.now().date()}"):
+        data_api_manager = DataAPIManager(DATA_API, logger=logger, **config["data_api"])
+        if config["snapshot"]["enabled"]:
+            snapshot = DataSnapshot(path_config["input_path"] / "snapshot", logger=logger)
+            snapshot.sync(data_api_manager)
+            data = snapshot.load()
+            mlflow.set_tag("data_snapshot_fingerprint", snapshot.fingerprint_id)
+        else:
+            data = data_api_manager.fetch_all()
+
+        target_feature = "electrical_output"
+
+        # Convert data types
+        data_types = data_api_manager.get_feature_types()
+        data_types = {k: POSTGRESQL_DATA_TYPES.get(v, str) for k, v in data_types.items()}
+        data = data.astype(data_types).drop(columns=config["training"]["excluded_columns"], errors="ignore")
+
+        # Use the same split as train.py, so the test set stays unseen while tuning
+        train, _ = train_test_split(
+            data,
+            test_size=modeling_config["test_size"],
+            random_state=modeling_config["random_seed"],
+        )
+        train, validation = train_test_split(
+            train,
+            test_size=tuning_config["validation_size"],
+            random_state=modeling_config["random_seed"],
+        )
+
+        # Preprocess once, the trials only train the estimator
+        processing_pipeline = ProcessingPipeline(modeling_config)
+        preprocessing = Pipeline(
+            [
+                ("data_preprocessor", DataPreprocessor()),
+                ("processing_pipeline", processing_pipeline.preprocessor),
+                ("feature_selector", VarianceThreshold()),
+            ]
+        )
+        X_train = preprocessing.fit_transform(train.drop(columns=[target_feature]))
+        X_valid = preprocessing.transform(validation.drop(columns=[target_feature]))
+        y_train = train[target_feature].to_numpy()
+        y_valid = validation[target_feature].to_numpy()
+
+        # The amount of trees and threads are set by the search
+        base_params = {k: v for k, v in modeling_config["estimator"].items() if k not in ["n_estimators", "n_jobs"]}
+        search = HyperparameterSearch(
+            search_space=tuning_config["search_space"],
+            base_params=base_params,
+            n_trials=tuning_config["n_trials"],
+            n_workers=tuning_config["n_workers"],
+            threads_per_trial=tuning_config["threads_per_trial"],
+            min_resource=tuning_config["asha"]["min_resource"],
+            max_resource=tuning_config["asha"]["max_resource"],
+            reduction_factor=tuning_config["asha"]["reduction_factor"],
+            early_stopping_rounds=tuning_config["early_stopping_rounds"],
+            eval_metric=tuning_config["eval_metric"],
+            random_seed=modeling_config["random_seed"],
+            logger=logger,
+        )
+        mlflow.log_params(
+            {
+                "n_trials": search.n_trials,
+                "n_workers": search.n_workers,
+                "threads_per_trial": search.threads_per_trial,
+                "rung_resources": search.scheduler.rung_resources,
+            }
+        )
+
+        # Each trial is logged as a nested run, with its score at each rung it reached
+        trial_run_ids = {}
+        metric_name = f"validation_{tuning_config['eval_metric']}"
+
+        def log_trial(trial_id: int, rung: int, params: dict, result: dict):
+            if trial_id not in trial_run_ids:
+                with mlflow.start_run(run_name=f"trial_{trial_id:03d}", nested=True) as trial_run:
+                    mlflow.log_params(params)
+                trial_run_ids[trial_id] = trial_run.info.run_id
+            run_id = trial_run_ids[trial_id]
+            step = search.scheduler.rung_resources[rung]
+            client.log_metric(run_id, metric_name, result["score"], step=step)
+            client.log_metric(run_id, "best_iteration", result["best_iteration"], step=step)
+            client.log_metric(run_id, "train_time", result["train_time"], step=step)
+            client.set_tag(run_id, "rung", rung)
+            client.set_terminated(run_id)
+
+        best_trial = search.run(X_train, y_train, X_valid, y_valid, callback=log_trial)
+        client.set_tag(trial_run_ids[best_trial["trial_id"]], "best_trial", True)
+        logger.info(f"Best trial: {best_trial}")
+
+        # The best parameters, with the amount of trees found by early stopping, can be copied to the estimator
+        # section of the config to train the final model
+        best_params = {**best_trial["params"], "n_estimators": best_trial["best_iteration"] + 1}
+        mlflow.log_metric(f"best_{metric_name}", best_trial["score"])
+        mlflow.log_params({f"best_{k}": v for k, v in best_params.items()})
+        best_params_path = path_config["output_path"] / "tuning" / f"best_params_{datetime.datetime.now().date()}.yml"
+        best_params_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(best_params_path, "w") as f:
+            yaml.safe_dump({"estimator": best_params}, f)
+        mlflow.log_artifact(str(best_params_path), "Results")
+    logger.info("Done tuning model")
@@ -1,21 +1,78 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 class DataAPIManager:
-    def __init__(self, data_api) -> None:
+    def __init__(
+        self,
+        data_api,
+        page_size: int = 50000,
+        concurrency: int = 4,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 60,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Creates the data API manager, using a pooled session that retries failed requests with backoff.
+
+        Args:
+            data_api (str): Base url of the data management API.
+            page_size (int, optional): Ids covered by each page when downloading the whole table. Defaults to 50000.
+            concurrency (int, optional): Pages downloaded in parallel. Defaults to 4.
+            retries (int, optional): Times a failed request is retried. Defaults to 3.
+            backoff_factor (float, optional): Backoff factor between retries, in seconds. Defaults to 0.5.
+            timeout (float, optional): Seconds to wait for the API to respond. Defaults to 60.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
         self.base_url = f"{data_api}/power_plant_data/"
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.logger = logger
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def build_url(self, extra: str) -> str:
         return self.base_url + extra
 
     def get_response(self, url) -> dict:
-        response = requests.get(url)
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
         return response.json()
 
     def get_total_rows(self) -> int:
         url = self.build_url("total_rows")
         return self.get_response(url)["rows"]
 
+    def get_id_range(self) -> dict:
+        url = self.build_url("id_range")
+        return self.get_response(url)
+
+    def get_fingerprint(self, end_id: Optional[int] = None) -> dict:
+        url = self.build_url("fingerprint" + (f"?end_id={end_id}" if end_id is not None else ""))
+        return self.get_response(url)
+
     def get_range(self, skip: int, limit: int) -> dict:
         url = self.build_url(f"retrieve_range?limit={limit}&skip={skip}")
         return self.get_response(url)
@@ -27,3 +84,154 @@ class DataAPIManager:
     def get_column_names(self, return_id: bool = False) -> dict:
         url = self.build_url(f"column_names?return_id={return_id}")
         return self.get_response(url)
+
+    def get_dataframe(
+        self, start_id: Optional[int] = None, end_id: Optional[int] = None, columnar_format: str = "arrow"
+    ) -> pd.DataFrame:
+        """Downloads the table, or an id range of it, in a columnar format and loads it directly into a dataframe.
+
+        Args:
+            start_id (Optional[int], optional): If given, only rows with an id greater or equal to this one are
+                downloaded. Defaults to None.
+            end_id (Optional[int], optional): If given, only rows with an id lower or equal to this one are
+                downloaded. Defaults to None.
+            columnar_format (str, optional): Either arrow or parquet. Defaults to arrow.
+
+        Returns:
+            pd.DataFrame: Downloaded data, indexed by id.
+        """
+        query = f"export_columnar?columnar_format={columnar_format}"
+        if start_id is not None:
+            query += f"&start_id={start_id}"
+        if end_id is not None:
+            query += f"&end_id={end_id}"
+        response = self.session.get(self.build_url(query), timeout=self.timeout)
+        response.raise_for_status()
+        if columnar_format == "arrow":
+            table = pa.ipc.open_stream(response.content).read_all()
+        else:
+            table = pq.read_table(pa.BufferReader(response.content))
+        return table.to_pandas().set_index("id")
+
+    def fetch_all(
+        self,
+        start_id: Optional[int] = None,
+        end_id: Optional[int] = None,
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Downloads the table, or an id range of it, splitting it into id range pages downloaded concurrently.
+        Pages are copied into preallocated arrays as soon as all the pages before them are done, so downloaded pages
+        don't pile up in memory.
+
+        Args:
+            start_id (Optional[int], optional): First id to download. If None, starts from the table's lowest id.
+                Defaults to None.
+            end_id (Optional[int], optional): Last id to download. If None, ends at the table's highest id.
+                Defaults to None.
+            page_size (Optional[int], optional): Ids covered by each page. If None, the manager's page size is used.
+                Defaults to None.
+            concurrency (Optional[int], optional): Pages downloaded in parallel. If None, the manager's concurrency
+                is used. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Downloaded data, indexed by id.
+        """
+        page_size = page_size or self.page_size
+        concurrency = concurrency or self.concurrency
+        id_range = self.get_id_range()
+        start_id = (id_range["min_id"] or 0) if start_id is None else start_id
+        end_id = (id_range["max_id"] or -1) if end_id is None else end_id
+        pages = [
+            (page_start, min(page_start + page_size - 1, end_id))
+            for page_start in range(start_id, end_id + 1, page_size)
+        ]
+        if len(pages) == 0:
+            return self.get_dataframe(start_id=start_id, end_id=end_id)
+
+        time_start = time.perf_counter()
+        columns, index, offset = None, None, 0
+        completed_pages, next_page = {}, 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(self._fetch_page, *page): i for i, page in enumerate(pages)}
+            for future in as_completed(futures):
+                completed_pages[futures[future]] = future.result()
+                while next_page in completed_pages:
+                    page = completed_pages.pop(next_page)
+                    next_page += 1
+                    if columns is None:
+                        # Ids are unique, so the requested range can't hold more rows than ids it covers
+                        capacity = max(min(id_range["rows"], end_id - start_id + 1), len(page))
+                        columns = {
+                            column: np.empty(capacity, dtype=page[column].to_numpy().dtype) for column in page.columns
+                        }
+                        index = np.empty(capacity, dtype=page.index.dtype)
+                    if offset + len(page) > len(index):
+                        # Rows were added since the id range was requested
+                        capacity = max(2 * len(index), offset + len(page))
+                        columns = {column: np.resize(values, capacity) for column, values in columns.items()}
+                        index = np.resize(index, capacity)
+                    for column, values in columns.items():
+                        values[offset : offset + len(page)] = page[column].to_numpy()
+                    index[offset : offset + len(page)] = page.index.to_numpy()
+                    offset += len(page)
+
+        if self.logger is not None:
+            elapsed_time = time.perf_counter() - time_start
+            self.logger.info(f"Downloaded {offset} rows in {len(pages)} pages in {elapsed_time:.2f} seconds")
+        data = pd.DataFrame({column: values[:offset] for column, values in columns.items()}, index=index[:offset])
+        data.index.name = "id"
+        return data
+
+    def _fetch_page(self, start_id: int, end_id: int) -> pd.DataFrame:
+        time_start = time.perf_counter()
+        page = self.get_dataframe(start_id=start_id, end_id=end_id)
+        if self.logger is not None:
+            elapsed_time = time.perf_counter() - time_start
+            self.logger.info(f"Downloaded ids {start_id}-{end_id} ({len(page)} rows) in {elapsed_time:.2f} seconds")
+        return page
+
+    def download_to_parquet(
+        self,
+        output_dir: Path,
+        start_id: Optional[int] = None,
+        end_id: Optional[int] = None,
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> list[Path]:
+        """Downloads the table, or an id range of it, into one Parquet file per page, so it can be processed in
+        chunks without ever holding more than `concurrency` pages in memory.
+
+        Args:
+            output_dir (Path): Directory in which to save the Parquet files.
+            start_id (Optional[int], optional): First id to download. If None, starts from the table's lowest id.
+                Defaults to None.
+            end_id (Optional[int], optional): Last id to download. If None, ends at the table's highest id.
+                Defaults to None.
+            page_size (Optional[int], optional): Ids covered by each page. If None, the manager's page size is used.
+                Defaults to None.
+            concurrency (Optional[int], optional): Pages downloaded in parallel. If None, the manager's concurrency
+                is used. Defaults to None.
+
+        Returns:
+            list[Path]: Paths to the non-empty Parquet files, in id order.
+        """
+        page_size = page_size or self.page_size
+        concurrency = concurrency or self.concurrency
+        id_range = self.get_id_range()
+        start_id = (id_range["min_id"] or 0) if start_id is None else start_id
+        end_id = (id_range["max_id"] or -1) if end_id is None else end_id
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        def download_page(page_start: int) -> Optional[Path]:
+            page = self._fetch_page(page_start, min(page_start + page_size - 1, end_id))
+            if len(page) == 0:
+                return None
+            page_path = output_dir / f"chunk_{page_start:012d}.parquet"
+            page.to_parquet(page_path)
+            return page_path
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            page_paths = list(executor.map(download_page, range(start_id, end_id + 1, page_size)))
+        return [page_path for page_path in page_paths if page_path is not None]
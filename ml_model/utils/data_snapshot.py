@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from utils.data_api_manager import DataAPIManager
+
+
+class DataSnapshot:
+    """Local copy of the training data, stored as Parquet chunks along with a manifest containing the fingerprint
+    (row count, id range and checksum) of the rows it holds.
+
+    When synchronizing, the fingerprint of the snapshot is compared with the one of the same id range in the data
+    API. If they match, only the rows added after the snapshot was taken are downloaded and appended as new chunks.
+    Otherwise (rows were updated or deleted, or there is no snapshot yet) the snapshot is downloaded again.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, snapshot_dir: Path, logger: Optional[logging.Logger] = None) -> None:
+        """Creates the snapshot.
+
+        Args:
+            snapshot_dir (Path): Directory in which the chunks and the manifest are stored.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
+        self.snapshot_dir = Path(snapshot_dir)
+        self.logger = logger
+        self.manifest = self._read_manifest()
+
+    @property
+    def fingerprint(self) -> Optional[dict]:
+        return self.manifest["fingerprint"] if self.manifest is not None else None
+
+    @property
+    def fingerprint_id(self) -> Optional[str]:
+        """Short identifier of the snapshot's contents, e.g. to tag the runs trained on it."""
+        if self.fingerprint is None:
+            return None
+        return self.fingerprint_hash(self.fingerprint)
+
+    @staticmethod
+    def fingerprint_hash(fingerprint: dict) -> str:
+        """Short identifier of a fingerprint, as returned by the data API for any id range."""
+        return hashlib.md5(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+
+    @property
+    def chunk_paths(self) -> list[Path]:
+        if self.manifest is None:
+            return []
+        return [self.snapshot_dir / chunk for chunk in self.manifest["chunks"]]
+
+    def sync(self, data_api_manager: DataAPIManager, page_size: Optional[int] = None) -> dict:
+        """Brings the snapshot up to date with the data API, downloading as few rows as possible.
+
+        Args:
+            data_api_manager (DataAPIManager): Manager used to access the data API.
+            page_size (Optional[int], optional): Ids covered by each downloaded chunk. If None, the manager's page
+                size is used. Defaults to None.
+
+        Returns:
+            dict: Fingerprint of the synchronized snapshot.
+        """
+        remote_fingerprint = data_api_manager.get_fingerprint()
+        if self.fingerprint == remote_fingerprint:
+            self._log(f"Snapshot is up to date ({remote_fingerprint['rows']} rows)")
+            return self.fingerprint
+
+        end_id = remote_fingerprint["max_id"]
+        if self.fingerprint is not None and self.fingerprint["max_id"] is not None:
+            snapshot_max_id = self.fingerprint["max_id"]
+            if data_api_manager.get_fingerprint(end_id=snapshot_max_id) == self.fingerprint:
+                self._log(f"Appending the rows with an id higher than {snapshot_max_id} to the snapshot")
+                new_chunks = data_api_manager.download_to_parquet(
+                    self.snapshot_dir, start_id=snapshot_max_id + 1, end_id=end_id, page_size=page_size
+                )
+                chunks = self.manifest["chunks"] + [chunk.name for chunk in new_chunks]
+                return self._write_manifest(data_api_manager.get_fingerprint(end_id=end_id), chunks)
+
+        self._log("Snapshot is missing or out of date, downloading it")
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+        chunks = []
+        if end_id is not None:
+            new_chunks = data_api_manager.download_to_parquet(self.snapshot_dir, end_id=end_id, page_size=page_size)
+            chunks = [chunk.name for chunk in new_chunks]
+        return self._write_manifest(data_api_manager.get_fingerprint(end_id=end_id), chunks)
+
+    def load(self) -> pd.DataFrame:
+        """Loads the whole snapshot in memory.
+
+        Raises:
+            ValueError: If the snapshot doesn't contain any rows.
+
+        Returns:
+            pd.DataFrame: Snapshot data, indexed by id.
+        """
+        if len(self.chunk_paths) == 0:
+            raise ValueError(f"Snapshot in {self.snapshot_dir} doesn't contain any rows")
+        return pd.concat([pd.read_parquet(chunk_path) for chunk_path in self.chunk_paths]).sort_index()
+
+    def _read_manifest(self) -> Optional[dict]:
+        manifest_path = self.snapshot_dir / self.MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if not all((self.snapshot_dir / chunk).exists() for chunk in manifest["chunks"]):
+            return None
+        return manifest
+
+    def _write_manifest(self, fingerprint: dict, chunks: list[str]) -> dict:
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = {"fingerprint": fingerprint, "chunks": sorted(chunks)}
+        # Write to a temporary file first, so an interrupted run never leaves a manifest pointing to missing data
+        temp_path = self.snapshot_dir / f"{self.MANIFEST_FILE}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        temp_path.replace(self.snapshot_dir / self.MANIFEST_FILE)
+        self._log(f"Snapshot synchronized ({fingerprint['rows']} rows, fingerprint {self.fingerprint_id})")
+        return fingerprint
+
+    def _log(self, message: str):
+        if self.logger is not None:
+            self.logger.info(message)
@@ -1,5 +1,16 @@
+import logging
 import tempfile
 from pathlib import Path
+from typing import Optional
+
+import mlflow
+from mlflow import MlflowClient
+from utils.data_api_manager import DataAPIManager
+from utils.data_snapshot import DataSnapshot
+
+# Run tags identifying the rows a model was trained on: all the rows up to the max id, with the given fingerprint
+MAX_ID_TAG = "data_max_id"
+FINGERPRINT_TAG = "data_snapshot_fingerprint"
 
 
 def log_plotly_figure(mlflow_instance, figure, file_name, width, height):
@@ -7,3 +18,72 @@ def log_plotly_figure(mlflow_instance, figure, file_name, width, height):
         save_path = Path(temp_dir) / file_name
         figure.write_image(save_path, format="png", width=width, height=height)
         mlflow_instance.log_artifact(save_path, "Figures")
+
+
+def resolve_model_version(client: MlflowClient, model_name: str, model_version: str) -> Optional[str]:
+    """Resolves a model version alias to the concrete version it points to in the MLflow model registry.
+
+    Args:
+        client (MlflowClient): Client used to access the registry.
+        model_name (str): Registered model name. E.g. XGB
+        model_version (str): Version alias. Either latest, a stage (e.g. Production) or a registered model alias.
+
+    Returns:
+        Optional[str]: Concrete model version, None if the model has no versions matching the alias.
+    """
+    if model_version.lower() == "latest":
+        versions = client.get_latest_versions(model_name)
+    elif model_version.lower() in ("none", "staging", "production", "archived"):
+        versions = client.get_latest_versions(model_name, stages=[model_version])
+    else:
+        return client.get_model_version_by_alias(model_name, model_version).version
+    if len(versions) == 0:
+        return None
+    return str(max(int(version.version) for version in versions))
+
+
+def load_warm_start_model(
+    client: MlflowClient,
+    data_api_manager: DataAPIManager,
+    model_name: str,
+    model_version: str,
+    logger: Optional[logging.Logger] = None,
+) -> Optional[dict]:
+    """Loads a registered model to continue its training on the rows added after the ones it was trained on.
+
+    The model can only be continued if its run recorded the highest id it was trained on, and the rows up to that id
+    still have the fingerprint recorded with it. Otherwise (e.g. rows were updated or deleted since), its trees were
+    fitted on data that no longer exists and the model needs to be trained from scratch.
+
+    Args:
+        client (MlflowClient): Client used to access the registry.
+        data_api_manager (DataAPIManager): Manager used to access the data API.
+        model_name (str): Registered model name. E.g. XGB
+        model_version (str): Version alias. Either latest, a stage (e.g. Production) or a registered model alias.
+        logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+            Defaults to None.
+
+    Returns:
+        Optional[dict]: Dictionary containing the version, the loaded pipeline and the max_id it was trained on.
+            None if the model can't be continued.
+    """
+
+    def log(message: str):
+        if logger is not None:
+            logger.info(message)
+
+    version = resolve_model_version(client, model_name, model_version)
+    if version is None:
+        log(f"No version of {model_name} with alias {model_version} is registered")
+        return None
+    tags = client.get_run(client.get_model_version(model_name, version).run_id).data.tags
+    if MAX_ID_TAG not in tags or FINGERPRINT_TAG not in tags:
+        log(f"Version {version} of {model_name} didn't record the rows it was trained on")
+        return None
+    max_id = int(tags[MAX_ID_TAG])
+    if DataSnapshot.fingerprint_hash(data_api_manager.get_fingerprint(end_id=max_id)) != tags[FINGERPRINT_TAG]:
+        log(f"The rows version {version} of {model_name} was trained on changed")
+        return None
+    pipeline = mlflow.sklearn.load_model(f"models:/{model_name}/{version}")
+    log(f"Continuing the training of version {version} of {model_name}, trained on the rows up to id {max_id}")
+    return {"version": version, "pipeline": pipeline, "max_id": max_id}
@@ -1,29 +1,303 @@
+import asyncio
 import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
 from enum import Enum
 from pathlib import Path
+from typing import Optional, Union
 
 import mlflow
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from mlflow import MlflowClient
+from prometheus_client import Gauge
+from utils.inference_executor import InferenceExecutor, InferenceQueueFullError
+from utils.load_config import load_config_file
 from utils.logger import get_logger
-from utils.power_plant_data import PowerPlantData
+from utils.metrics import metrics_middleware, metrics_response, stage_timer
+from utils.micro_batcher import MicroBatcher
+from utils.model_cache import ModelCache
+from utils.power_plant_data import (
+    PowerPlantData,
+    PowerPlantDataBatch,
+    PowerPlantDataColumns,
+)
+from utils.prediction_cache import PredictionCache
+from utils.registry_watcher import RegistryWatcher
 
 sys.path.insert(0, "ml_model")
-
+# The fast inference format is defined next to the code exporting it, so the exports are verified with this predictor
+from modeling.fast_inference import FastPredictor  # noqa: E402
 
 mlflow.set_tracking_uri("http://mlflow_server:5000")
 
-app = FastAPI()
-
 client = MlflowClient()
 
 logger = get_logger(Path(__file__).stem)
 
+config = load_config_file(Path("config") / "serving.yml", logger)
+if len(config["warm_up"]["batch_sizes"]) == 0:
+    # The models are loaded by the warm up predictions, without them they would never be reported as ready
+    raise ValueError("warm_up.batch_sizes needs at least one batch size")
+
+# Artifact path in which train.py logs the fast inference export of the pipeline
+FAST_INFERENCE_ARTIFACT_PATH = "fast_inference"
+
 
 class ModelName(str, Enum):
     xgb = "XGB"
 
 
+@stage_timer("model_resolve")
+def resolve_model_version(model_name: str, model_version: str) -> str:
+    """Resolves a model version alias to the concrete version it points to in the MLflow model registry.
+
+    Args:
+        model_name (str): Registered model name. E.g. XGB
+        model_version (str): Version alias. Either latest, a stage (e.g. Production) or a registered model alias.
+
+    Returns:
+        str: Concrete model version.
+    """
+    if model_version.lower() == "latest":
+        versions = client.get_latest_versions(model_name)
+    elif model_version.lower() in ("none", "staging", "production", "archived"):
+        versions = client.get_latest_versions(model_name, stages=[model_version])
+    else:
+        return client.get_model_version_by_alias(model_name, model_version).version
+    if len(versions) == 0:
+        raise ValueError(f"No versions found for model {model_name} with alias {model_version}")
+    return str(max(int(version.version) for version in versions))
+
+
+inference_executor = InferenceExecutor(
+    max_workers=config["inference"]["max_workers"],
+    max_queue_size=config["inference"]["max_queue_size"],
+    nthread=config["inference"]["nthread"],
+    logger=logger,
+)
+
+
+def load_fast_predictor(model_name: str, model_version: str) -> Optional[FastPredictor]:
+    """Loads the fast inference export logged in the run that produced a model version.
+
+    Args:
+        model_name (str): Registered model name. E.g. XGB
+        model_version (str): Concrete model version.
+
+    Returns:
+        Optional[FastPredictor]: Loaded predictor, or None if the run didn't log a fast inference export.
+    """
+    run_id = client.get_model_version(model_name, model_version).run_id
+    if len(client.list_artifacts(run_id, FAST_INFERENCE_ARTIFACT_PATH)) == 0:
+        return None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        export_dir = mlflow.artifacts.download_artifacts(
+            run_id=run_id, artifact_path=FAST_INFERENCE_ARTIFACT_PATH, dst_path=temp_dir
+        )
+        return FastPredictor.load(Path(export_dir), nthread=inference_executor.nthread)
+
+
+@stage_timer("model_load")
+def load_model(model_name: str, model_version: str):
+    if config["fast_inference"]["enabled"]:
+        model = load_fast_predictor(model_name, model_version)
+        if model is not None:
+            logger.info(f"Loaded fast inference model: {model_name}, version: {model_version}")
+            return model
+        logger.info(f"No fast inference model found for {model_name} version {model_version}, using the pipeline")
+    # Loaded with the sklearn flavor instead of pyfunc to be able to limit the threads used by the estimator
+    model = mlflow.sklearn.load_model(model_uri=f"models:/{model_name}/{model_version}")
+    if hasattr(model, "named_steps") and "estimator" in model.named_steps:
+        model.named_steps["estimator"].set_params(n_jobs=inference_executor.nthread)
+    return model
+
+
+model_cache = ModelCache(
+    loader=load_model,
+    resolver=resolve_model_version,
+    max_models=config["model_cache"]["max_models"],
+    alias_ttl=config["model_cache"]["alias_ttl_seconds"],
+    logger=logger,
+)
+
+
+def predict_with_model(model, power_plant_data: Union[PowerPlantData, PowerPlantDataBatch, PowerPlantDataColumns]):
+    with stage_timer("input_conversion"):
+        if isinstance(model, FastPredictor):
+            model_input = power_plant_data.to_array(model.feature_names)
+        else:
+            model_input = power_plant_data.to_frame()
+    with stage_timer("predict"):
+        return model.predict(model_input)
+
+
+prediction_cache = None
+if config["prediction_cache"]["enabled"]:
+    prediction_cache = PredictionCache(
+        max_entries=config["prediction_cache"]["max_entries"],
+        decimals=config["prediction_cache"]["decimals"],
+        logger=logger,
+    )
+
+
+def predict_readings(
+    model_name: str,
+    model_version: str,
+    power_plant_data: Union[PowerPlantData, PowerPlantDataBatch, PowerPlantDataColumns],
+) -> tuple:
+    """Blocking prediction, meant to be run in the inference executor.
+
+    Args:
+        model_name (str): Registered model name. E.g. XGB
+        model_version (str): Model version or alias. E.g. latest
+        power_plant_data (Union[PowerPlantData, PowerPlantDataBatch, PowerPlantDataColumns]): Readings to predict.
+
+    Returns:
+        tuple: Predictions and the concrete model version used.
+    """
+    with stage_timer("model_cache_get"):
+        model, resolved_version = model_cache.get(model_name, model_version)
+    if prediction_cache is None:
+        return predict_with_model(model, power_plant_data), resolved_version
+
+    with stage_timer("prediction_cache_lookup"):
+        readings = power_plant_data.to_rows()
+        predictions = prediction_cache.get_many(model_name, resolved_version, readings)
+    missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if missing:
+        missing_readings = [readings[i] for i in missing]
+        if len(missing) < len(readings):
+            power_plant_data = PowerPlantDataColumns.from_rows(missing_readings)
+        missing_predictions = [float(prediction) for prediction in predict_with_model(model, power_plant_data)]
+        prediction_cache.put_many(model_name, resolved_version, missing_readings, missing_predictions)
+        for i, prediction in zip(missing, missing_predictions):
+            predictions[i] = prediction
+    return predictions, resolved_version
+
+
+async def predict_coalesced_readings(model_key: tuple[str, str], readings: list[PowerPlantData]) -> list:
+    predictions, resolved_version = await inference_executor.run(
+        predict_readings, *model_key, PowerPlantDataBatch(readings=readings)
+    )
+    return [(prediction, resolved_version) for prediction in predictions]
+
+
+micro_batcher = MicroBatcher(
+    process_batch=predict_coalesced_readings,
+    max_batch_size=config["micro_batching"]["max_batch_size"],
+    max_wait_ms=config["micro_batching"]["max_wait_ms"],
+    logger=logger,
+)
+
+
+# Synthetic reading used to warm up the models, with typical values of each variable
+WARM_UP_READING = PowerPlantData(
+    temperature=20.0, exhaust_vacuum=55.0, atmospheric_pressure=1013.0, relative_humidity=70.0
+)
+
+
+async def warm_up_models(warm_up_state: dict):
+    """Loads the configured models and runs synthetic predictions on them, so the first requests don't pay for
+    downloading the models and allocating what the predictions need. Models failing to load are retried until
+    they succeed, and the API is reported as ready once all of them are warmed up.
+
+    Args:
+        warm_up_state (dict): Warm up state, updated as each model is warmed up.
+    """
+    warm_up_config = config["warm_up"]
+    for model in warm_up_config["models"]:
+        model_name, model_version = model["name"], str(model["version"])
+        while True:
+            try:
+                time_start = time.perf_counter()
+                for batch_size in warm_up_config["batch_sizes"]:
+                    readings = PowerPlantDataBatch(readings=[WARM_UP_READING] * batch_size)
+                    _, resolved_version = await inference_executor.run(
+                        predict_readings, model_name, model_version, readings
+                    )
+                break
+            except Exception as error:
+                logger.warning(f"Failed to warm up model: {model_name}, version: {model_version}: {error}")
+                warm_up_state["models"][f"{model_name}/{model_version}"] = {"status": "failed", "error": str(error)}
+                await asyncio.sleep(warm_up_config["retry_interval_seconds"])
+        elapsed_time = time.perf_counter() - time_start
+        logger.info(f"Warmed up model: {model_name}, version: {model_version} in {elapsed_time:.2f} seconds")
+        warm_up_state["models"][f"{model_name}/{model_version}"] = {
+            "status": "ready",
+            "resolved_model_version": resolved_version,
+            "warm_up_seconds": elapsed_time,
+        }
+    warm_up_state["ready"] = True
+    logger.info("All models warmed up, ready to serve")
+
+
+def warm_up_model(model_name: str, model_version: str):
+    for batch_size in config["warm_up"]["batch_sizes"]:
+        predict_readings(model_name, model_version, PowerPlantDataBatch(readings=[WARM_UP_READING] * batch_size))
+
+
+def invalidate_predictions(model_name: str, model_version: str, previous_version: Optional[str], version: str):
+    # The alias now points to a new version, the predictions of the previous one won't be used anymore
+    if prediction_cache is not None and previous_version is not None:
+        prediction_cache.invalidate(model_name, previous_version)
+
+
+registry_watcher = RegistryWatcher(
+    model_cache=model_cache,
+    resolver=resolve_model_version,
+    models=[(model["name"], model["version"]) for model in config["registry_watcher"]["models"]],
+    poll_interval=config["registry_watcher"]["poll_interval_seconds"],
+    warm_up=warm_up_model,
+    on_swap=invalidate_predictions,
+    logger=logger,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background, so the liveness endpoint responds while the models are being loaded
+    app.state.warm_up = {"ready": False, "models": {}}
+    warm_up_task = asyncio.create_task(warm_up_models(app.state.warm_up))
+    if config["registry_watcher"]["enabled"]:
+        registry_watcher.start()
+    yield
+    warm_up_task.cancel()
+    try:
+        await warm_up_task
+    except asyncio.CancelledError:
+        pass
+    await registry_watcher.stop()
+    await micro_batcher.stop()
+    inference_executor.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
+app.middleware("http")(metrics_middleware)
+
+# Metrics of the serving components, computed when scraped
+Gauge("model_cache_hit_ratio", "Ratio of model lookups served from memory").set_function(
+    lambda: model_cache.stats()["hit_ratio"]
+)
+Gauge("inference_in_flight", "Predictions running or queued in the inference executor").set_function(
+    lambda: inference_executor.stats()["running"] + inference_executor.stats()["queued"]
+)
+Gauge("micro_batching_queue_depth", "Single predictions waiting to be batched").set_function(
+    lambda: micro_batcher.stats()["queue_depth"]
+)
+if prediction_cache is not None:
+    Gauge("prediction_cache_hit_ratio", "Ratio of readings predicted from the prediction cache").set_function(
+        lambda: prediction_cache.stats()["hit_ratio"]
+    )
+
+
+@app.exception_handler(InferenceQueueFullError)
+async def inference_queue_full_handler(request: Request, error: InferenceQueueFullError) -> JSONResponse:
+    logger.warning(f"Rejecting request to {request.url.path}: {error}")
+    return JSONResponse(status_code=503, content={"detail": str(error)}, headers={"Retry-After": "1"})
+
+
 @app.get("/")
 def read_root():
     return {"Basic FastAPI API"}
@@ -48,18 +322,145 @@ async def predict_electrical_output(
 
     if ml_model is ModelName.xgb:
         logger.info(f"Retrieving model: {ml_model}, version: {model_version}")
-        # queries are not yet implemented, will add extra control and parameters for the model
-        model = mlflow.pyfunc.load_model(model_uri=f"models:/{ml_model.value}/{model_version}")
-        prediction = model.predict(power_plant_data.to_frame())[0]
+        if config["micro_batching"]["enabled"]:
+            prediction, resolved_version = await micro_batcher.submit((ml_model.value, model_version), power_plant_data)
+        else:
+            predictions, resolved_version = await inference_executor.run(
+                predict_readings, ml_model.value, model_version, power_plant_data
+            )
+            prediction = predictions[0]
         return {
             "predicted_electrical_output": str(prediction),
             "ml_model": ml_model.value,
             "model_version": model_version,
+            "resolved_model_version": resolved_version,
         }
 
 
+@app.post("/{ml_model}/{model_version}/predict_electrical_output/batch")
+async def predict_electrical_output_batch(
+    power_plant_data: Union[PowerPlantDataBatch, PowerPlantDataColumns],
+    ml_model: ModelName,
+    model_version: str,
+) -> dict:
+    """Predicts the electrical output for a batch of power plant readings using a single model call.
+
+    Args:
+        power_plant_data (Union[PowerPlantDataBatch, PowerPlantDataColumns]): Power plant readings, either as a list
+            of rows or as one array per variable, with optional ids to identify each reading.
+        ml_model (ModelName): ML model to predict on. E.g. XGB
+        model_version (str): Model version to use. E.g. latest.
+
+    Returns:
+        dict: Dictionary containing the predictions aligned to the input ids, as well as some ML model information.
+    """
+    batch_size = len(power_plant_data)
+    max_batch_size = config["batch_prediction"]["max_batch_size"]
+    if batch_size > max_batch_size:
+        raise HTTPException(
+            status_code=413, detail=f"Batch of {batch_size} readings exceeds the maximum of {max_batch_size}"
+        )
+
+    if ml_model is ModelName.xgb:
+        logger.info(f"Retrieving model: {ml_model}, version: {model_version} for {batch_size} readings")
+        if batch_size > 0:
+            predictions, resolved_version = await inference_executor.run(
+                predict_readings, ml_model.value, model_version, power_plant_data
+            )
+        else:
+            predictions = []
+            resolved_version = await inference_executor.run(model_cache.resolve_version, ml_model.value, model_version)
+        return {
+            "ids": power_plant_data.get_ids(),
+            "predicted_electrical_output": [float(prediction) for prediction in predictions],
+            "ml_model": ml_model.value,
+            "model_version": model_version,
+            "resolved_model_version": resolved_version,
+        }
+
+
+@app.get("/models")
+def get_models() -> dict:
+    """Returns the serving status of the models: the version each watched alias points to, the swaps performed by
+    the registry watcher and the models loaded in memory.
+
+    Returns:
+        dict: Dictionary containing the models status.
+    """
+    return {
+        "registry_watcher": {"enabled": config["registry_watcher"]["enabled"], **registry_watcher.status()},
+        "loaded_models": model_cache.stats()["cached_models"],
+    }
+
+
+@app.get("/model_cache/stats")
+def get_model_cache_stats() -> dict:
+    """Returns the model cache metrics, such as hits, misses, loads and evictions.
+
+    Returns:
+        dict: Dictionary containing the model cache metrics.
+    """
+    return model_cache.stats()
+
+
+@app.get("/prediction_cache/stats")
+def get_prediction_cache_stats() -> dict:
+    """Returns the prediction cache metrics, such as hits, misses, hit ratio and evictions.
+
+    Returns:
+        dict: Dictionary containing the prediction cache metrics.
+    """
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+
+@app.get("/micro_batching/stats")
+def get_micro_batching_stats() -> dict:
+    """Returns the micro batching metrics, including queue depth and batch size histograms.
+
+    Returns:
+        dict: Dictionary containing the micro batching metrics.
+    """
+    return micro_batcher.stats()
+
+
+@app.get("/inference/stats")
+def get_inference_stats() -> dict:
+    """Returns the inference executor metrics, including running and queued predictions as well as rejections.
+
+    Returns:
+        dict: Dictionary containing the inference executor metrics.
+    """
+    return inference_executor.stats()
+
+
+@app.get("/metrics")
+def get_metrics() -> Response:
+    """Returns the metrics in the Prometheus text format: request latencies per route, latencies of the internal
+    stages (model resolution and loading, input conversion, prediction, etc.) and the serving components' state.
+
+    Returns:
+        Response: Metrics in the Prometheus text format.
+    """
+    return metrics_response()
+
+
 @app.get("/health")
-def check_health() -> dict:
+def check_health(request: Request) -> JSONResponse:
+    """Performs a readiness check on the server, to see if it can serve predictions. It's only ready once the
+    configured models are loaded and warmed up.
+
+    Returns:
+        JSONResponse: Status and warm up state of each model, with a 503 status code if the server isn't ready.
+    """
+    warm_up_state = request.app.state.warm_up
+    content = {"status": "ok" if warm_up_state["ready"] else "warming_up", "models": warm_up_state["models"]}
+    return JSONResponse(status_code=200 if warm_up_state["ready"] else 503, content=content)
+
+
+@app.get("/health/live")
+def check_liveness() -> dict:
     """Performs a health check on the server, to see if it's alive.
 
     Returns:
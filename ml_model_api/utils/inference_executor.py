@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class InferenceQueueFullError(Exception):
+    """Raised when the inference queue is full and new work can't be accepted."""
+
+
+class InferenceExecutor:
+    """Bounded thread pool used to run blocking model loading and prediction outside of the asyncio event loop.
+
+    At most `max_workers` calls run at the same time and up to `max_queue_size` more can wait for a free worker.
+    Calls submitted once the queue is full are rejected with an InferenceQueueFullError, so callers can return
+    an error right away instead of piling up requests.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue_size: int = 32,
+        nthread: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Creates the inference executor.
+
+        Args:
+            max_workers (int, optional): Amount of threads running predictions concurrently. Defaults to 2.
+            max_queue_size (int, optional): Amount of calls that can wait for a free worker. Defaults to 32.
+            nthread (Optional[int], optional): Threads each XGBoost prediction can use. If None, the available
+                cores are split between the workers. Defaults to None.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
+        if max_workers < 1:
+            raise ValueError(f"max_workers needs to be at least 1, got {max_workers}")
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.nthread = nthread if nthread is not None else max(1, (os.cpu_count() or 1) // max_workers)
+        self.logger = logger
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {"completed": 0, "failed": 0, "rejected": 0}
+        if self.logger is not None:
+            self.logger.info(
+                f"Inference executor using {max_workers} workers with {self.nthread} threads each, "
+                f"queue size: {max_queue_size}"
+            )
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Runs a blocking function in the inference thread pool.
+
+        Args:
+            func (Callable): Function to run.
+
+        Raises:
+            InferenceQueueFullError: If all the workers are busy and the queue is full.
+
+        Returns:
+            Any: Value returned by the function.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue_size:
+                self._stats["rejected"] += 1
+                raise InferenceQueueFullError(
+                    f"Inference queue is full ({self.max_workers} running, {self.max_queue_size} queued)"
+                )
+            self._in_flight += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self._stats["completed"] += 1
+        return result
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        """Returns the executor metrics, including running and queued calls as well as rejections.
+
+        Returns:
+            dict: Dictionary containing the executor metrics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = self._in_flight
+        stats["running"] = min(in_flight, self.max_workers)
+        stats["queued"] = max(0, in_flight - self.max_workers)
+        stats["max_workers"] = self.max_workers
+        stats["max_queue_size"] = self.max_queue_size
+        stats["nthread"] = self.nthread
+        return stats
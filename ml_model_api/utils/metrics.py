@@ -0,0 +1,59 @@
+import time
+
+from fastapi import Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+
+# Buckets (in seconds) covering from sub millisecond stages to slow requests
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests, until the response headers are sent",
+    ["method", "route", "status_code"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being handled", ["method"])
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Time spent in each internal stage of the request handling",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def stage_timer(stage: str):
+    """Returns a context manager (also usable as a decorator) recording the time spent in a stage.
+
+    Args:
+        stage (str): Name of the stage. E.g. predict
+
+    Returns:
+        Context manager timing the stage.
+    """
+    return STAGE_LATENCY.labels(stage=stage).time()
+
+
+async def metrics_middleware(request: Request, call_next) -> Response:
+    """Records the latency of each request, labelled by the route template (e.g. /power_plant_data/{id}) instead of
+    the actual path, so the amount of label values stays bounded.
+    """
+    REQUESTS_IN_PROGRESS.labels(method=request.method).inc()
+    time_start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status_code=str(status_code),
+        ).observe(time.perf_counter() - time_start)
+        REQUESTS_IN_PROGRESS.labels(method=request.method).dec()
+
+
+def metrics_response() -> Response:
+    # Set as a header rather than a media type, which Starlette would append a second charset to
+    return Response(content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
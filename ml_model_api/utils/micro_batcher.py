@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class Histogram:
+    """Minimal cumulative histogram, with the same bucket semantics as Prometheus (each bucket counts values <= le)."""
+
+    def __init__(self, buckets: list[float]) -> None:
+        self.buckets = sorted(buckets)
+        self.bucket_counts = [0 for _ in self.buckets]
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.bucket_counts[i] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": {str(bucket): count for bucket, count in zip(self.buckets, self.bucket_counts)},
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class MicroBatcher:
+    """Coalesces concurrent single item requests into batches.
+
+    Items submitted within `max_wait_ms` of the first item of a batch (or until `max_batch_size` items are
+    collected) are grouped by key and processed with a single call to `process_batch`, whose results are
+    then handed back to each of the awaiting callers.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[Hashable, list], Awaitable[list]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 3.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Creates the micro batcher.
+
+        Args:
+            process_batch (Callable[[Hashable, list], Awaitable[list]]): Coroutine function receiving a key and the
+                list of items submitted with that key, returning one result per item in the same order.
+            max_batch_size (int, optional): Maximum amount of items processed in a single batch. Defaults to 64.
+            max_wait_ms (float, optional): Maximum milliseconds to wait for more items after the first item of a
+                batch arrives. Defaults to 3.0.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size needs to be at least 1, got {max_batch_size}")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.logger = logger
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_tasks: set[asyncio.Task] = set()
+
+        size_buckets = [2**i for i in range(max_batch_size.bit_length())] + [max_batch_size]
+        self.batch_size_histogram = Histogram(sorted(set(size_buckets)))
+        self.queue_depth_histogram = Histogram([0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024])
+        self.max_queue_depth = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """Submits an item to be processed in the next batch for its key.
+
+        Args:
+            key (Hashable): Key used to group the items, e.g. the model and version to predict with.
+            item (Any): Item to process.
+
+        Returns:
+            Any: Result for the item returned by `process_batch`.
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, item, future))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self.queue_depth_histogram.observe(self._queue.qsize())
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+
+            batches_by_key = {}
+            for key, item, future in batch:
+                batches_by_key.setdefault(key, []).append((item, future))
+            for key, key_batch in batches_by_key.items():
+                # Batches are processed concurrently so a slow batch doesn't hold back collecting the next one
+                task = asyncio.create_task(self._process(key, key_batch))
+                self._batch_tasks.add(task)
+                task.add_done_callback(self._batch_tasks.discard)
+
+    async def _process(self, key: Hashable, batch: list):
+        self.batch_size_histogram.observe(len(batch))
+        futures = [future for _, future in batch]
+        try:
+            results = await self.process_batch(key, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} results from batch processing, got {len(results)}")
+        except Exception as error:
+            if self.logger is not None:
+                self.logger.error(f"Failed processing batch of {len(batch)} items for {key}: {error}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def stop(self):
+        """Stops collecting new batches and waits for the batches being processed to finish."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Returns the batching metrics, including queue depth and batch size histograms.
+
+        Returns:
+            dict: Dictionary containing the batching metrics.
+        """
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "batches_in_progress": len(self._batch_tasks),
+            "queue_depth_histogram": self.queue_depth_histogram.to_dict(),
+            "batch_size_histogram": self.batch_size_histogram.to_dict(),
+        }
@@ -0,0 +1,224 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+CacheKey = tuple[str, str]
+
+
+class _PendingLoad:
+    """Holds the result of a model load that other threads may be waiting on."""
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.model = None
+        self.error: Optional[BaseException] = None
+
+
+class ModelCache:
+    """Thread-safe in-process cache of loaded ML models.
+
+    Models are keyed by (model name, resolved version), so aliases like `latest` share the cached
+    entry of the concrete version they point to. Aliases are re-resolved against the registry once
+    their TTL expires, least recently used models are evicted once the cache is full, and concurrent
+    requests for a model that is not loaded yet only trigger a single load (single-flight).
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str, str], Any],
+        resolver: Callable[[str, str], str],
+        max_models: int = 4,
+        alias_ttl: Optional[float] = 60.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Creates the model cache.
+
+        Args:
+            loader (Callable[[str, str], Any]): Function receiving a model name and a concrete version,
+                returning the loaded model.
+            resolver (Callable[[str, str], str]): Function receiving a model name and a version alias,
+                returning the concrete version the alias points to.
+            max_models (int, optional): Maximum amount of models kept in memory. Defaults to 4.
+            alias_ttl (Optional[float], optional): Seconds an alias resolution is considered valid. If None,
+                aliases are resolved only once. Defaults to 60.0.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
+        if max_models < 1:
+            raise ValueError(f"max_models needs to be at least 1, got {max_models}")
+        self.loader = loader
+        self.resolver = resolver
+        self.max_models = max_models
+        self.alias_ttl = alias_ttl
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._models: OrderedDict[CacheKey, Any] = OrderedDict()
+        self._aliases: dict[CacheKey, tuple[str, float]] = {}
+        # Aliases whose resolution is managed externally (e.g. by a registry watcher) and never expires
+        self._pinned_aliases: set[CacheKey] = set()
+        self._pending: dict[CacheKey, _PendingLoad] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced_loads": 0,
+            "loads": 0,
+            "load_failures": 0,
+            "load_time_seconds": 0.0,
+            "evictions": 0,
+            "alias_resolutions": 0,
+        }
+
+    @staticmethod
+    def is_alias(model_version: str) -> bool:
+        # Versions that are not plain integers (e.g. latest, Production, Staging) need to be resolved
+        # against the model registry before being used as cache keys
+        return not str(model_version).isdigit()
+
+    def resolve_version(self, model_name: str, model_version: str) -> str:
+        """Returns the concrete version for a model version or alias, using the cached resolution if still valid.
+
+        Args:
+            model_name (str): Registered model name. E.g. XGB
+            model_version (str): Model version or alias. E.g. latest
+
+        Returns:
+            str: Concrete model version.
+        """
+        if not self.is_alias(model_version):
+            return str(model_version)
+        key = (model_name, model_version)
+        now = time.monotonic()
+        with self._lock:
+            resolution = self._aliases.get(key)
+            pinned = key in self._pinned_aliases
+        if resolution is not None and (pinned or self.alias_ttl is None or now - resolution[1] < self.alias_ttl):
+            return resolution[0]
+
+        resolved_version = str(self.resolver(model_name, model_version))
+        with self._lock:
+            self._aliases[key] = (resolved_version, now)
+            self._stats["alias_resolutions"] += 1
+        if self.logger is not None and (resolution is None or resolution[0] != resolved_version):
+            self.logger.info(f"Model {model_name}/{model_version} resolved to version {resolved_version}")
+        return resolved_version
+
+    def pin_alias(self, model_name: str, model_version: str, resolved_version: str) -> Optional[str]:
+        """Points an alias to a concrete version until it's pinned again or invalidated, instead of resolving it
+        against the registry once its TTL expires. Requests already holding the previous model finish using it.
+
+        Args:
+            model_name (str): Registered model name. E.g. XGB
+            model_version (str): Version alias. E.g. latest
+            resolved_version (str): Concrete version the alias points to.
+
+        Returns:
+            Optional[str]: Version the alias pointed to before, if any.
+        """
+        key = (model_name, model_version)
+        with self._lock:
+            previous_resolution = self._aliases.get(key)
+            self._aliases[key] = (str(resolved_version), time.monotonic())
+            self._pinned_aliases.add(key)
+        return previous_resolution[0] if previous_resolution is not None else None
+
+    def get(self, model_name: str, model_version: str) -> tuple[Any, str]:
+        """Returns a model from the cache, loading it if it isn't in memory yet.
+
+        Args:
+            model_name (str): Registered model name. E.g. XGB
+            model_version (str): Model version or alias. E.g. latest
+
+        Returns:
+            tuple[Any, str]: Loaded model and the concrete version it corresponds to.
+        """
+        resolved_version = self.resolve_version(model_name, model_version)
+        key = (model_name, resolved_version)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._models[key], resolved_version
+            pending = self._pending.get(key)
+            is_owner = pending is None
+            if is_owner:
+                pending = _PendingLoad()
+                self._pending[key] = pending
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced_loads"] += 1
+
+        if not is_owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.model, resolved_version
+
+        try:
+            pending.model = self._load(key)
+        except BaseException as error:
+            pending.error = error
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.event.set()
+        return pending.model, resolved_version
+
+    def _load(self, key: CacheKey):
+        if self.logger is not None:
+            self.logger.info(f"Loading model: {key[0]}, version: {key[1]}")
+        load_time_start = time.perf_counter()
+        try:
+            model = self.loader(*key)
+        except Exception:
+            with self._lock:
+                self._stats["load_failures"] += 1
+            raise
+        load_time = time.perf_counter() - load_time_start
+
+        with self._lock:
+            self._stats["loads"] += 1
+            self._stats["load_time_seconds"] += load_time
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                evicted_key, _ = self._models.popitem(last=False)
+                self._stats["evictions"] += 1
+                if self.logger is not None:
+                    self.logger.info(f"Evicted model: {evicted_key[0]}, version: {evicted_key[1]}")
+        if self.logger is not None:
+            self.logger.info(f"Model {key[0]}/{key[1]} loaded in {load_time:.2f} seconds")
+        return model
+
+    def invalidate(self, model_name: Optional[str] = None):
+        """Removes cached models and alias resolutions.
+
+        Args:
+            model_name (Optional[str], optional): Model for which to remove the cached entries. If None, the whole
+                cache is cleared. Defaults to None.
+        """
+        with self._lock:
+            for key in [key for key in self._models if model_name is None or key[0] == model_name]:
+                del self._models[key]
+            for key in [key for key in self._aliases if model_name is None or key[0] == model_name]:
+                del self._aliases[key]
+                self._pinned_aliases.discard(key)
+
+    def stats(self) -> dict:
+        """Returns the cache metrics, including hits, misses, loads and evictions.
+
+        Returns:
+            dict: Dictionary containing the cache metrics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_models"] = [f"{name}/{version}" for name, version in self._models]
+            stats["aliases"] = {f"{name}/{alias}": version for (name, alias), (version, _) in self._aliases.items()}
+            stats["pinned_aliases"] = [f"{name}/{alias}" for name, alias in self._pinned_aliases]
+        requests = stats["hits"] + stats["misses"] + stats["coalesced_loads"]
+        stats["hit_ratio"] = stats["hits"] / requests if requests else 0.0
+        return stats
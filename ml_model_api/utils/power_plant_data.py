@@ -1,5 +1,10 @@
+from typing import Optional, Union
+
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
+
+FEATURE_NAMES = ["temperature", "exhaust_vacuum", "atmospheric_pressure", "relative_humidity"]
 
 
 class PowerPlantData(BaseModel):
@@ -14,6 +19,12 @@ class PowerPlantData(BaseModel):
         df = pd.DataFrame(data_dict, index=[0])
         return df
 
+    def to_array(self, feature_names: list[str] = FEATURE_NAMES) -> np.ndarray:
+        return np.array([[getattr(self, feature) for feature in feature_names]], dtype=np.float64)
+
+    def to_rows(self) -> list[tuple[float, ...]]:
+        return [tuple(getattr(self, feature) for feature in FEATURE_NAMES)]
+
     def to_dict(self) -> dict:
         return {
             "temperature": self.temperature,
@@ -22,3 +33,74 @@ class PowerPlantData(BaseModel):
             "relative_humidity": self.relative_humidity,
             # "electrical_output": self.electrical_output,
         }
+
+
+class PowerPlantDataBatch(BaseModel):
+    """Batch of power plant readings sent as a list of rows."""
+
+    readings: list[PowerPlantData]
+    ids: Optional[list[Union[int, str]]] = None
+
+    @model_validator(mode="after")
+    def check_ids(self):
+        if self.ids is not None and len(self.ids) != len(self.readings):
+            raise ValueError(f"Got {len(self.ids)} ids for {len(self.readings)} readings")
+        return self
+
+    def __len__(self) -> int:
+        return len(self.readings)
+
+    def get_ids(self) -> list:
+        return self.ids if self.ids is not None else list(range(len(self)))
+
+    def to_frame(self) -> pd.DataFrame:
+        data_dict = {feature: [getattr(reading, feature) for reading in self.readings] for feature in FEATURE_NAMES}
+        return pd.DataFrame(data_dict, columns=FEATURE_NAMES)
+
+    def to_array(self, feature_names: list[str] = FEATURE_NAMES) -> np.ndarray:
+        return np.array(
+            [[getattr(reading, feature) for feature in feature_names] for reading in self.readings],
+            dtype=np.float64,
+        ).reshape(len(self.readings), len(feature_names))
+
+    def to_rows(self) -> list[tuple[float, ...]]:
+        return [tuple(getattr(reading, feature) for feature in FEATURE_NAMES) for reading in self.readings]
+
+
+class PowerPlantDataColumns(BaseModel):
+    """Batch of power plant readings sent as one array per variable."""
+
+    temperature: list[float]
+    exhaust_vacuum: list[float]
+    atmospheric_pressure: list[float]
+    relative_humidity: list[float]
+    ids: Optional[list[Union[int, str]]] = None
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        lengths = {feature: len(getattr(self, feature)) for feature in FEATURE_NAMES}
+        if self.ids is not None:
+            lengths["ids"] = len(self.ids)
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"All arrays need to have the same length, got {lengths}")
+        return self
+
+    def __len__(self) -> int:
+        return len(self.temperature)
+
+    def get_ids(self) -> list:
+        return self.ids if self.ids is not None else list(range(len(self)))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({feature: getattr(self, feature) for feature in FEATURE_NAMES}, columns=FEATURE_NAMES)
+
+    def to_array(self, feature_names: list[str] = FEATURE_NAMES) -> np.ndarray:
+        return np.column_stack([np.asarray(getattr(self, feature), dtype=np.float64) for feature in feature_names])
+
+    def to_rows(self) -> list[tuple[float, ...]]:
+        return list(zip(*[getattr(self, feature) for feature in FEATURE_NAMES]))
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple[float, ...]]) -> "PowerPlantDataColumns":
+        """Creates a batch from readings with their values in the order of FEATURE_NAMES."""
+        return cls(**{feature: [row[i] for row in rows] for i, feature in enumerate(FEATURE_NAMES)})
@@ -0,0 +1,114 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of predictions, keyed by model name, concrete model version and the input readings
+    rounded to a fixed amount of decimals.
+
+    Readings that only differ past the rounding precision share the same entry, so the precision sets how close
+    two readings need to be to reuse a prediction.
+    """
+
+    def __init__(self, max_entries: int = 100000, decimals: int = 2, logger: Optional[logging.Logger] = None) -> None:
+        """Creates the prediction cache.
+
+        Args:
+            max_entries (int, optional): Maximum amount of predictions kept, least recently used ones get evicted
+                first. Defaults to 100000.
+            decimals (int, optional): Decimals the readings are rounded to before being used as keys.
+                Defaults to 2.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries needs to be at least 1, got {max_entries}")
+        self.max_entries = max_entries
+        self.decimals = decimals
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._predictions: OrderedDict[tuple, Any] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def make_key(self, model_name: str, model_version: str, reading: tuple[float, ...]) -> tuple:
+        return (model_name, str(model_version), tuple(round(value, self.decimals) for value in reading))
+
+    def get_many(self, model_name: str, model_version: str, readings: list[tuple[float, ...]]) -> list:
+        """Looks up the predictions of several readings.
+
+        Args:
+            model_name (str): Registered model name. E.g. XGB
+            model_version (str): Concrete model version.
+            readings (list[tuple[float, ...]]): Readings, with their values in the order the model expects them.
+
+        Returns:
+            list: Cached prediction of each reading, None for the ones not in the cache.
+        """
+        keys = [self.make_key(model_name, model_version, reading) for reading in readings]
+        predictions = []
+        with self._lock:
+            for key in keys:
+                prediction = self._predictions.get(key)
+                if prediction is not None:
+                    self._predictions.move_to_end(key)
+                predictions.append(prediction)
+            hits = sum(prediction is not None for prediction in predictions)
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(predictions) - hits
+        return predictions
+
+    def put_many(self, model_name: str, model_version: str, readings: list[tuple[float, ...]], predictions: list):
+        """Stores the predictions of several readings.
+
+        Args:
+            model_name (str): Registered model name. E.g. XGB
+            model_version (str): Concrete model version.
+            readings (list[tuple[float, ...]]): Readings, with their values in the order the model expects them.
+            predictions (list): Prediction of each reading.
+        """
+        keys = [self.make_key(model_name, model_version, reading) for reading in readings]
+        with self._lock:
+            for key, prediction in zip(keys, predictions):
+                self._predictions[key] = prediction
+                self._predictions.move_to_end(key)
+            while len(self._predictions) > self.max_entries:
+                self._predictions.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, model_name: Optional[str] = None, model_version: Optional[str] = None):
+        """Removes cached predictions, e.g. when the model serving an alias is swapped.
+
+        Args:
+            model_name (Optional[str], optional): Model for which to remove the predictions. If None, the whole
+                cache is cleared. Defaults to None.
+            model_version (Optional[str], optional): Version of the model for which to remove the predictions. If
+                None, the predictions of all the model's versions are removed. Defaults to None.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key in self._predictions
+                if (model_name is None or key[0] == model_name)
+                and (model_version is None or key[1] == str(model_version))
+            ]
+            for key in keys:
+                del self._predictions[key]
+            self._stats["invalidations"] += len(keys)
+        if self.logger is not None and keys:
+            self.logger.info(f"Invalidated {len(keys)} cached predictions of model {model_name} {model_version}")
+
+    def stats(self) -> dict:
+        """Returns the cache metrics, including hits, misses and evictions.
+
+        Returns:
+            dict: Dictionary containing the cache metrics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._predictions)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
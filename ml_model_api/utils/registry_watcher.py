@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from utils.model_cache import ModelCache
+
+
+class RegistryWatcher:
+    """Background task keeping model aliases (e.g. XGB/latest) pointed to the version they resolve to in the
+    model registry.
+
+    The registry is polled at a fixed interval. When an alias points to a new version, the new model is loaded
+    (and optionally warmed up) in a background thread while the previous one keeps serving, and the alias is then
+    swapped to it in the model cache in a single step. Requests already using the previous model finish with it.
+    """
+
+    def __init__(
+        self,
+        model_cache: "ModelCache",
+        resolver: Callable[[str, str], str],
+        models: list[tuple[str, str]],
+        poll_interval: float = 30.0,
+        warm_up: Optional[Callable[[str, str], None]] = None,
+        on_swap: Optional[Callable[[str, str, Optional[str], str], None]] = None,
+        max_events: int = 50,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Creates the registry watcher.
+
+        Args:
+            model_cache (ModelCache): Cache in which the models are loaded and the aliases pinned.
+            resolver (Callable[[str, str], str]): Function receiving a model name and a version alias, returning
+                the concrete version the alias points to in the registry.
+            models (list[tuple[str, str]]): Model names and aliases to watch. E.g. [("XGB", "latest")]
+            poll_interval (float, optional): Seconds between registry polls. Defaults to 30.0.
+            warm_up (Optional[Callable[[str, str], None]], optional): Function receiving a model name and a concrete
+                version, run on new versions before swapping them in. Defaults to None.
+            on_swap (Optional[Callable[[str, str, Optional[str], str], None]], optional): Function receiving the
+                model name, the alias, the previous version and the new version, called after each swap.
+                Defaults to None.
+            max_events (int, optional): Amount of swap events kept for the status. Defaults to 50.
+            logger (Optional[logging.Logger], optional): Logger to use to log information. If None, it won't log.
+                Defaults to None.
+        """
+        self.model_cache = model_cache
+        self.resolver = resolver
+        self.models = [(model_name, str(model_version)) for model_name, model_version in models]
+        self.poll_interval = poll_interval
+        self.warm_up = warm_up
+        self.on_swap = on_swap
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._events = deque(maxlen=max_events)
+        self._status = {
+            f"{model_name}/{model_version}": {"version": None, "last_check": None, "last_error": None}
+            for model_name, model_version in self.models
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            for model_name, model_version in self.models:
+                # Loading a model is blocking, run it outside the event loop
+                await asyncio.to_thread(self.check, model_name, model_version)
+            await asyncio.sleep(self.poll_interval)
+
+    def check(self, model_name: str, model_version: str) -> bool:
+        """Checks the version an alias points to in the registry, and swaps it in if it changed.
+
+        Args:
+            model_name (str): Registered model name. E.g. XGB
+            model_version (str): Version alias. E.g. latest
+
+        Returns:
+            bool: Whether the alias was swapped to a new version.
+        """
+        status = self._status[f"{model_name}/{model_version}"]
+        try:
+            resolved_version = str(self.resolver(model_name, model_version))
+            if resolved_version == status["version"]:
+                with self._lock:
+                    status.update(last_check=self._now(), last_error=None)
+                return False
+
+            time_start = time.perf_counter()
+            self.model_cache.get(model_name, resolved_version)
+            if self.warm_up is not None:
+                self.warm_up(model_name, resolved_version)
+            load_time = time.perf_counter() - time_start
+            previous_version = self.model_cache.pin_alias(model_name, model_version, resolved_version)
+        except Exception as error:
+            with self._lock:
+                status.update(last_check=self._now(), last_error=str(error))
+            if self.logger is not None:
+                self.logger.warning(f"Failed to check model: {model_name}, version: {model_version}: {error}")
+            return False
+
+        event = {
+            "time": self._now(),
+            "model": model_name,
+            "alias": model_version,
+            "previous_version": previous_version,
+            "version": resolved_version,
+            "load_seconds": load_time,
+        }
+        with self._lock:
+            status.update(version=resolved_version, last_check=event["time"], last_error=None)
+            self._events.append(event)
+        if self.on_swap is not None:
+            self.on_swap(model_name, model_version, previous_version, resolved_version)
+        if self.logger is not None:
+            self.logger.info(
+                f"Swapped model: {model_name}, version: {model_version} from version {previous_version} to "
+                f"{resolved_version} (loaded in {load_time:.2f} seconds)"
+            )
+        return True
+
+    def status(self) -> dict:
+        """Returns the version each watched alias points to and the swaps performed so far.
+
+        Returns:
+            dict: Dictionary containing the watched aliases and the swap events, most recent first.
+        """
+        with self._lock:
+            return {
+                "poll_interval_seconds": self.poll_interval,
+                "running": self._task is not None and not self._task.done(),
+                "models": {alias: dict(status) for alias, status in self._status.items()},
+                "swaps": list(reversed(self._events)),
+            }
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,40 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).parent.parent
+# Top level packages each application imports its own modules from, e.g. from utils.logger import get_logger
+APP_PACKAGES = ("utils", "modeling")
+
+
+def _is_app_module(name: str) -> bool:
+    return name.split(".")[0] in APP_PACKAGES
+
+
+@pytest.fixture(scope="session")
+def import_app_module():
+    """Returns a function importing a module of one of the applications the way the application does, with the
+    application's directory on the path. The applications all have a top level utils package, so the modules
+    imported this way are removed from sys.modules afterwards, keeping the applications from seeing each other's.
+    They are kept aside and reused by the next imports of the same application, so each module is only imported
+    once per session (e.g. the Prometheus metrics can only be registered once).
+    """
+    app_modules = {}
+
+    def import_module(app: str, module: str):
+        app_dir = str(REPO_ROOT / app)
+        saved_modules = {name: sys.modules.pop(name) for name in list(sys.modules) if _is_app_module(name)}
+        sys.modules.update(app_modules.get(app, {}))
+        # Restored as a whole afterwards, as some modules (e.g. scripts) add their own directories to it
+        saved_path = list(sys.path)
+        sys.path.insert(0, app_dir)
+        try:
+            return importlib.import_module(module)
+        finally:
+            sys.path[:] = saved_path
+            app_modules[app] = {name: sys.modules.pop(name) for name in list(sys.modules) if _is_app_module(name)}
+            sys.modules.update(saved_modules)
+
+    return import_module
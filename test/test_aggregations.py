@@ -0,0 +1,69 @@
+import pytest
+
+from data_management_api.utils.aggregations import (
+    bucket_size_for_points,
+    build_downsample_query,
+    build_histogram_query,
+    histogram_edges,
+    parse_downsampled,
+    parse_summary,
+    select_numeric_columns,
+)
+from data_management_api.utils.row_filter import RowFilter, select_insert_columns
+
+COLUMN_TYPES = {
+    "temperature": "numeric",
+    "exhaust_vacuum": "double precision",
+    "recorded_at": "timestamp with time zone",
+    "plant_id": "integer",
+}
+
+
+class TestAggregations:
+    def test_select_numeric_columns(self):
+        excluded_columns = ("plant_id",)
+        assert select_numeric_columns(COLUMN_TYPES, excluded_columns=excluded_columns) == [
+            "temperature",
+            "exhaust_vacuum",
+        ]
+        assert select_numeric_columns(COLUMN_TYPES, ["exhaust_vacuum"]) == ["exhaust_vacuum"]
+        with pytest.raises(ValueError):
+            select_numeric_columns(COLUMN_TYPES, ["recorded_at"])
+
+    def test_query_parameters(self):
+        params = []
+        condition = RowFilter(start_id=10, end_id=20).build_condition(params, COLUMN_TYPES)
+        query = build_histogram_query("powerplant", ["temperature"], [(1.0, 5.0)], condition, params, bins=4)
+        assert condition == "WHERE id >= $1 AND id <= $2"
+        assert params == [10, 20, 4, 1.0, 5.0]
+        assert "$4::double precision, $5::double precision" in query
+
+        params = []
+        row_filter = RowFilter(plant_id=3, value_ranges=RowFilter.parse_value_ranges(["temperature::20"]))
+        condition = row_filter.build_condition(params, COLUMN_TYPES)
+        query = build_downsample_query(
+            "powerplant", ["temperature"], condition, params, time_column="recorded_at", time_bucket="hour"
+        )
+        assert condition == "WHERE plant_id = $1 AND temperature <= $2"
+        assert params == [3, 20.0, "hour"]
+        assert "GROUP BY DATE_TRUNC($3, recorded_at)" in query
+
+    def test_filter_validation(self):
+        with pytest.raises(ValueError):
+            RowFilter.parse_value_ranges(["temperature:10"])
+        with pytest.raises(ValueError):
+            RowFilter(start_time="2024-01-01").build_condition([], {"temperature": "numeric"})
+        columns = ["temperature", "recorded_at", "plant_id"]
+        assert select_insert_columns(columns, [{"temperature": 1.0}]) == ["temperature"]
+        assert select_insert_columns(columns, [{"temperature": 1.0}, {"plant_id": 2}]) == ["temperature", "plant_id"]
+
+    def test_parse_results(self):
+        summary = parse_summary((3, 3, 2.0, 1.0, 1.0, 3.0, [1.5, 2.5]), ["temperature"], [0.25, 0.75])
+        assert summary["columns"]["temperature"]["quantiles"] == {"0.25": 1.5, "0.75": 2.5}
+        assert histogram_edges(0.0, 1.0, 4) == [0.0, 0.25, 0.5, 0.75, 1.0]
+        assert bucket_size_for_points(1, 1000, 300) == 4
+
+        downsampled = parse_downsampled([(1, 4, 4, 2.0, 1.0, 3.0), (5, 6, 2, 5.5, 5.0, 6.0)], ["temperature"], 4)
+        assert downsampled["start_id"] == [1, 5]
+        assert downsampled["columns"]["temperature"]["mean"] == [2.0, 5.5]
+        assert parse_downsampled([], ["temperature"], 4)["columns"]["temperature"]["max"] == []
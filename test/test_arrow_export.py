@@ -0,0 +1,65 @@
+import datetime
+import io
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from data_management_api.utils.arrow_export import (  # noqa: E402
+    build_schema,
+    build_select_columns,
+    generate_columnar_stream,
+)
+
+COLUMN_TYPES = {
+    "id": "integer",
+    "measured_at": "timestamp without time zone",
+    "temperature": "numeric",
+    "plant_name": "character varying",
+    "status": "user-defined",
+}
+ROWS = [
+    (1, datetime.datetime(2024, 1, 1, 12), 14.96, "plant_a", "ok"),
+    (2, datetime.datetime(2024, 1, 1, 13), 25.18, "plant_b", None),
+    (3, datetime.datetime(2024, 1, 1, 14), 5.11, "plant_a", "ok"),
+]
+
+
+class TestArrowExport:
+    def test_select_columns(self):
+        assert build_select_columns(COLUMN_TYPES) == [
+            "id::integer AS id",
+            "measured_at::timestamp without time zone AS measured_at",
+            "temperature::double precision AS temperature",
+            "plant_name::text AS plant_name",
+            "status::text AS status",
+        ]
+
+    def test_schema(self):
+        schema = build_schema(COLUMN_TYPES)
+        assert schema.names == list(COLUMN_TYPES)
+        assert schema.types == [pa.int32(), pa.timestamp("us"), pa.float64(), pa.string(), pa.string()]
+
+    @pytest.mark.parametrize("columnar_format", ["arrow", "parquet"])
+    def test_round_trip(self, columnar_format):
+        schema = build_schema(COLUMN_TYPES)
+        chunks = list(generate_columnar_stream([ROWS[:2], [], ROWS[2:]], schema, columnar_format))
+        data = io.BytesIO(b"".join(chunks))
+        if columnar_format == "arrow":
+            table = pa.ipc.open_stream(data).read_all()
+        else:
+            table = pq.read_table(data)
+        assert table.schema.equals(schema)
+        assert table.to_pylist() == [dict(zip(COLUMN_TYPES, row)) for row in ROWS]
+
+    def test_arrow_stream_is_yielded_per_chunk(self):
+        schema = build_schema(COLUMN_TYPES)
+        stream = generate_columnar_stream([ROWS[:1], ROWS[1:]], schema)
+        # The schema and the first batch are available before the next chunk of rows is consumed
+        reader = pa.ipc.open_stream(io.BytesIO(next(stream)))
+        assert reader.read_next_batch().num_rows == 1
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            list(generate_columnar_stream([ROWS], build_schema(COLUMN_TYPES), "csv"))
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("fastapi")
+pytest.importorskip("prometheus_client")
+
+COLUMNS = [("id", "integer"), ("temperature", "double precision")]
+IDS = [1, 2, 3, 5, 8]
+
+
+class FakeConnection:
+    """Answers the queries of AsyncPowerPlantDBManager.retrieve_rows_after from in-memory rows."""
+
+    async def fetch(self, query, *params):
+        if "information_schema" in query:
+            return [{"column_name": name, "data_type": data_type} for name, data_type in COLUMNS]
+        after_id, *end_id, limit = params
+        rows = [
+            (row_id, float(row_id) * 10) for row_id in IDS if row_id > after_id and (not end_id or row_id <= end_id[0])
+        ]
+        return rows[:limit]
+
+
+class FakePool:
+    async def getconn(self):
+        return FakeConnection()
+
+    async def putconn(self, conn):
+        pass
+
+
+@pytest.fixture(scope="module")
+def async_db_manager(import_app_module):
+    return import_app_module("data_management_api", "utils.async_db_manager")
+
+
+def retrieve_pages(async_db_manager, limit, end_id=None) -> list[tuple[list, int]]:
+    async def run():
+        pages, cursor = [], 0
+        manager = async_db_manager.AsyncPowerPlantDBManager(
+            pool=FakePool(), schema_cache=async_db_manager.TableMetadataCache()
+        )
+        async with manager:
+            while cursor is not None:
+                rows, cursor = await manager.retrieve_rows_after(
+                    "powerplant", after_id=cursor, limit=limit, end_id=end_id
+                )
+                pages.append((list(rows), cursor))
+        return pages
+
+    return asyncio.run(run())
+
+
+class TestKeysetPagination:
+    def test_pages(self, async_db_manager):
+        assert retrieve_pages(async_db_manager, limit=2) == [([1, 2], 2), ([3, 5], 5), ([8], None)]
+
+    def test_last_page_full(self, async_db_manager):
+        # A full last page can't tell there are no more rows, the next one comes back empty
+        assert retrieve_pages(async_db_manager, limit=5) == [([1, 2, 3, 5, 8], 8), ([], None)]
+
+    def test_end_id(self, async_db_manager):
+        assert retrieve_pages(async_db_manager, limit=2, end_id=4) == [([1, 2], 2), ([3], None)]
+
+    def test_rows(self, async_db_manager):
+        async def run():
+            manager = async_db_manager.AsyncPowerPlantDBManager(
+                pool=FakePool(), schema_cache=async_db_manager.TableMetadataCache()
+            )
+            async with manager:
+                return await manager.retrieve_rows_after("powerplant", after_id=5, limit=10)
+
+        assert asyncio.run(run()) == ({8: {"temperature": 80.0}}, None)
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("psycopg2")
+
+
+class FakePool:
+    """In-memory replacement of an asyncpg pool, handing out a fixed amount of connections."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.idle = asyncio.Queue()
+        for conn in range(size):
+            self.idle.put_nowait(conn)
+
+    async def acquire(self, timeout=None):
+        return await asyncio.wait_for(self.idle.get(), timeout)
+
+    async def release(self, conn):
+        self.idle.put_nowait(conn)
+
+    def get_size(self) -> int:
+        return self.size
+
+
+@pytest.fixture(scope="module")
+def async_db_pool(import_app_module):
+    return import_app_module("data_management_api", "utils.async_db_pool")
+
+
+def make_pool(async_db_pool, size: int = 1):
+    pool = async_db_pool.AsyncPowerPlantDBPool(min_size=0, max_size=size, checkout_timeout=0.05)
+    pool._pool = FakePool(size)
+    return pool
+
+
+class TestAsyncPowerPlantDBPool:
+    def test_waits_for_a_free_connection(self, async_db_pool):
+        async def run():
+            pool = make_pool(async_db_pool)
+            conn = await pool.getconn()
+            waiting = asyncio.create_task(pool.getconn())
+            await asyncio.sleep(0.01)
+            assert not waiting.done()
+            await pool.putconn(conn)
+            assert await waiting == conn
+            return pool.stats()
+
+        stats = asyncio.run(run())
+        assert stats["checkouts"] == 2
+        assert stats["in_use"] == 1
+        assert stats["timeouts"] == 0
+        assert stats["max_checkout_wait_seconds"] >= 0.01
+        assert stats["open_connections"] == 1
+
+    def test_checkout_timeout(self, async_db_pool):
+        async def run():
+            pool = make_pool(async_db_pool)
+            await pool.getconn()
+            with pytest.raises(async_db_pool.PoolTimeoutError):
+                await pool.getconn()
+            return pool.stats()
+
+        stats = asyncio.run(run())
+        assert stats["checkouts"] == 1
+        assert stats["timeouts"] == 1
+
+    def test_stats_of_a_closed_pool(self, async_db_pool):
+        stats = async_db_pool.AsyncPowerPlantDBPool(min_size=0, max_size=2).stats()
+        assert stats["open_connections"] == 0
+        assert stats["mean_checkout_wait_seconds"] == 0.0
@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mlflow")
+prometheus_client = pytest.importorskip("prometheus_client")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+READINGS = [
+    {"temperature": 14.96, "exhaust_vacuum": 41.76, "atmospheric_pressure": 1024.07, "relative_humidity": 73.17},
+    {"temperature": 25.18, "exhaust_vacuum": 62.96, "atmospheric_pressure": 1020.04, "relative_humidity": 59.08},
+    {"temperature": 5.11, "exhaust_vacuum": 39.4, "atmospheric_pressure": 1012.16, "relative_humidity": 92.14},
+]
+
+
+class FakeModel:
+    def predict(self, X):
+        return X["temperature"].to_numpy() * 2
+
+
+@pytest.fixture(scope="module")
+def main(import_app_module):
+    # The API is started from its directory, with the training code mounted in it. Both APIs register the same
+    # Prometheus metrics, which can only be registered once, so the serving API's are registered in an emptied
+    # registry, and the previous ones are put back afterwards
+    repo_root = Path(__file__).parent.parent
+    registered = list(prometheus_client.REGISTRY._collector_to_names)
+    for collector in registered:
+        prometheus_client.REGISTRY.unregister(collector)
+    working_dir = os.getcwd()
+    os.chdir(repo_root / "ml_model_api")
+    sys.path.insert(0, str(repo_root / "ml_model"))
+    try:
+        return import_app_module("ml_model_api", "main")
+    finally:
+        sys.path.remove(str(repo_root / "ml_model"))
+        os.chdir(working_dir)
+        sys.modules.pop("main", None)
+        for collector in list(prometheus_client.REGISTRY._collector_to_names):
+            prometheus_client.REGISTRY.unregister(collector)
+        for collector in registered:
+            prometheus_client.REGISTRY.register(collector)
+
+
+@pytest.fixture
+def client(main, monkeypatch):
+    monkeypatch.setattr(main.model_cache, "get", lambda model_name, model_version: (FakeModel(), "3"))
+    monkeypatch.setattr(main.model_cache, "resolve_version", lambda model_name, model_version: "3")
+    # The lifespan (warm up, registry watcher) isn't run, the client isn't used as a context manager
+    return TestClient(main.app)
+
+
+class TestBatchPrediction:
+    def test_rows(self, client):
+        response = client.post(
+            "/XGB/latest/predict_electrical_output/batch", json={"readings": READINGS, "ids": [7, 3, 9]}
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "ids": [7, 3, 9],
+            "predicted_electrical_output": [reading["temperature"] * 2 for reading in READINGS],
+            "ml_model": "XGB",
+            "model_version": "latest",
+            "resolved_model_version": "3",
+        }
+
+    def test_columns(self, client):
+        columns = {feature: [reading[feature] for reading in READINGS] for feature in READINGS[0]}
+        response = client.post("/XGB/latest/predict_electrical_output/batch", json=columns)
+        assert response.status_code == 200
+        assert response.json()["ids"] == [0, 1, 2]
+        assert response.json()["predicted_electrical_output"] == [reading["temperature"] * 2 for reading in READINGS]
+
+    def test_empty_batch(self, client):
+        response = client.post("/XGB/2/predict_electrical_output/batch", json={"readings": []})
+        assert response.status_code == 200
+        assert response.json()["predicted_electrical_output"] == []
+        assert response.json()["resolved_model_version"] == "3"
+
+    def test_batch_too_large(self, main, client, monkeypatch):
+        monkeypatch.setitem(main.config["batch_prediction"], "max_batch_size", 2)
+        response = client.post("/XGB/latest/predict_electrical_output/batch", json={"readings": READINGS})
+        assert response.status_code == 413
+
+    @pytest.mark.parametrize(
+        "payload", [{"readings": READINGS, "ids": [1]}, {"readings": [{"temperature": 1.0}]}, {"temperature": [1.0]}]
+    )
+    def test_invalid_batches(self, client, payload):
+        assert client.post("/XGB/latest/predict_electrical_output/batch", json=payload).status_code == 422
+
+    def test_unknown_model(self, client):
+        response = client.post("/LGBM/latest/predict_electrical_output/batch", json={"readings": READINGS})
+        assert response.status_code == 422
+
+    def test_full_inference_queue(self, main, client, monkeypatch):
+        started, release = threading.Event(), threading.Event()
+
+        def get_model(model_name, model_version):
+            started.set()
+            release.wait(5)
+            return FakeModel(), "3"
+
+        monkeypatch.setattr(main.model_cache, "get", get_model)
+        monkeypatch.setattr(main, "inference_executor", main.InferenceExecutor(max_workers=1, max_queue_size=0))
+        url = "/XGB/latest/predict_electrical_output/batch"
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            first = pool.submit(client.post, url, json={"readings": READINGS})
+            assert started.wait(5)
+            # The only worker is busy and nothing can be queued, the request is rejected instead of waiting
+            response = client.post(url, json={"readings": READINGS})
+            release.set()
+            assert first.result().status_code == 200
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from data_management_api.utils.bulk_ingestion import (  # noqa: E402
+    parse_bulk_payload,
+    validate_rows,
+)
+from data_management_api.utils.power_plant_data import PowerPlantData  # noqa: E402
+
+ROW = {
+    "temperature": 14.96,
+    "exhaust_vacuum": 41.76,
+    "atmospheric_pressure": 1024.07,
+    "relative_humidity": 73.17,
+    "electrical_output": 463.26,
+}
+
+
+class TestBulkIngestion:
+    def test_parse_formats(self):
+        csv_body = ("\n".join([",".join(ROW), ",".join(str(value) for value in ROW.values())]) + "\n").encode()
+        parsed = [
+            parse_bulk_payload(b'[{"temperature": 14.96}]', "application/json; charset=utf-8"),
+            parse_bulk_payload(b'{"temperature": 14.96}\n\n', "application/x-ndjson"),
+            parse_bulk_payload(b"temperature\n14.96\n", "text/csv"),
+        ]
+        assert parsed[0] == parsed[1] == [{"temperature": 14.96}]
+        assert parsed[2] == [{"temperature": "14.96"}]
+        assert parse_bulk_payload(csv_body, "text/csv") == [{column: str(value) for column, value in ROW.items()}]
+
+    @pytest.mark.parametrize(
+        "body, content_type",
+        [
+            (b'{"temperature": 14.96}', "application/json"),
+            (b"[{", "application/json"),
+            (b"temperature\n14.96", "application/xml"),
+            (b"temperature\n" + b"1" * 200000 + b"\n", "text/csv"),
+        ],
+    )
+    def test_invalid_payloads(self, body, content_type):
+        with pytest.raises(ValueError):
+            parse_bulk_payload(body, content_type)
+
+    def test_validate_rows(self):
+        rows = [
+            {key.upper(): value for key, value in ROW.items()},
+            {**ROW, "temperature": "hot"},
+            [1, 2, 3],
+            {**ROW, "plant_id": 3},
+        ]
+        accepted, rejected = validate_rows(rows, PowerPlantData)
+        assert accepted == [ROW, {**ROW, "plant_id": 3}]
+        assert [rejection["index"] for rejection in rejected] == [1, 2]
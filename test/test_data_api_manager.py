@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("requests")
+
+from ml_model.utils.data_api_manager import DataAPIManager  # noqa: E402
+
+IDS = [1, 2, 3, 5, 8, 9, 10, 14]
+
+
+def make_table(ids: list) -> pd.DataFrame:
+    table = pd.DataFrame({"temperature": [float(i) for i in ids], "plant": [f"plant_{i % 2}" for i in ids]}, index=ids)
+    table.index.name = "id"
+    return table
+
+
+class FakeDataAPIManager(DataAPIManager):
+    """Serves an in-memory table, with the first pages being the slowest so they complete out of order."""
+
+    def __init__(self, table: pd.DataFrame, rows: int = None, **kwargs) -> None:
+        super().__init__("http://data_api", **kwargs)
+        self.table = table
+        self.rows = len(table) if rows is None else rows
+        self.requested = []
+
+    def get_id_range(self) -> dict:
+        if len(self.table) == 0:
+            return {"min_id": None, "max_id": None, "rows": 0}
+        return {"min_id": int(self.table.index.min()), "max_id": int(self.table.index.max()), "rows": self.rows}
+
+    def get_dataframe(self, start_id=None, end_id=None, columnar_format="arrow") -> pd.DataFrame:
+        self.requested.append((start_id, end_id))
+        if start_id is not None and end_id is not None and start_id <= end_id:
+            time.sleep(0.01 * max(0, 10 - start_id) / 10)
+        index = self.table.index
+        mask = np.ones(len(index), dtype=bool)
+        if start_id is not None:
+            mask &= index >= start_id
+        if end_id is not None:
+            mask &= index <= end_id
+        return self.table[mask]
+
+
+class TestFetchAll:
+    @pytest.mark.parametrize("page_size,concurrency", [(2, 4), (3, 1), (100, 2)])
+    def test_pages_are_assembled_in_id_order(self, page_size, concurrency):
+        table = make_table(IDS)
+        manager = FakeDataAPIManager(table)
+        data = manager.fetch_all(page_size=page_size, concurrency=concurrency)
+        pd.testing.assert_frame_equal(data, table)
+
+    def test_id_range(self):
+        table = make_table(IDS)
+        manager = FakeDataAPIManager(table)
+        data = manager.fetch_all(start_id=3, end_id=9, page_size=2)
+        pd.testing.assert_frame_equal(data, table.loc[3:9])
+        assert sorted(manager.requested) == [(3, 4), (5, 6), (7, 8), (9, 9)]
+
+    def test_buffer_grows_when_rows_were_added(self):
+        table = make_table(IDS)
+        # The id range was computed before most of the rows were inserted
+        manager = FakeDataAPIManager(table, rows=2)
+        pd.testing.assert_frame_equal(manager.fetch_all(page_size=3), table)
+
+    def test_empty_range(self):
+        table = make_table(IDS)
+        manager = FakeDataAPIManager(table)
+        data = manager.fetch_all(start_id=20, end_id=19)
+        assert len(data) == 0
+        assert list(data.columns) == list(table.columns)
+
+    def test_empty_table(self):
+        manager = FakeDataAPIManager(make_table([]))
+        assert len(manager.fetch_all()) == 0
+
+
+class TestDownloadToParquet:
+    def test_empty_pages_are_skipped(self, tmp_path):
+        table = make_table(IDS)
+        manager = FakeDataAPIManager(table)
+        paths = manager.download_to_parquet(tmp_path, page_size=2)
+        # Ids 11-12 hold no rows
+        assert [path.name for path in paths] == [f"chunk_{start:012d}.parquet" for start in (1, 3, 5, 7, 9, 13)]
+        pd.testing.assert_frame_equal(pd.concat(pd.read_parquet(path) for path in paths), table)
@@ -0,0 +1,107 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("requests")
+
+
+@pytest.fixture(scope="module")
+def data_snapshot(import_app_module):
+    return import_app_module("ml_model", "utils.data_snapshot")
+
+
+def make_table(ids: list) -> pd.DataFrame:
+    return pd.DataFrame({"temperature": [float(i) for i in ids]}, index=pd.Index(ids, name="id"))
+
+
+class FakeDataAPIManager:
+    """Serves an in-memory table, recording the id ranges downloaded."""
+
+    def __init__(self, table: pd.DataFrame) -> None:
+        self.table = table
+        self.downloads = []
+
+    def get_fingerprint(self, end_id=None) -> dict:
+        rows = self.table if end_id is None else self.table.loc[:end_id]
+        if len(rows) == 0:
+            return {"rows": 0, "min_id": None, "max_id": None, "checksum": None}
+        checksum = int(pd.util.hash_pandas_object(rows).sum() % 2**32)
+        return {
+            "rows": len(rows),
+            "min_id": int(rows.index.min()),
+            "max_id": int(rows.index.max()),
+            "checksum": checksum,
+        }
+
+    def download_to_parquet(self, output_dir, start_id=None, end_id=None, page_size=None) -> list:
+        start_id = int(self.table.index.min()) if start_id is None else start_id
+        self.downloads.append((start_id, end_id))
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for page_start in range(start_id, end_id + 1, page_size or 3):
+            page = self.table.loc[page_start : min(page_start + (page_size or 3) - 1, end_id)]
+            if len(page) > 0:
+                paths.append(output_dir / f"chunk_{page_start:012d}.parquet")
+                page.to_parquet(paths[-1])
+        return paths
+
+
+class TestDataSnapshot:
+    def test_first_sync_downloads_everything(self, data_snapshot, tmp_path):
+        manager = FakeDataAPIManager(make_table([1, 2, 3, 5, 8]))
+        snapshot = data_snapshot.DataSnapshot(tmp_path / "snapshot")
+        assert snapshot.fingerprint is None and snapshot.fingerprint_id is None
+        fingerprint = snapshot.sync(manager)
+        assert fingerprint == manager.get_fingerprint()
+        assert manager.downloads == [(1, 8)]
+        pd.testing.assert_frame_equal(snapshot.load(), manager.table)
+        # The manifest is read back by new instances
+        reloaded = data_snapshot.DataSnapshot(tmp_path / "snapshot")
+        assert reloaded.fingerprint_id == snapshot.fingerprint_id
+        assert reloaded.chunk_paths == snapshot.chunk_paths
+
+    def test_up_to_date(self, data_snapshot, tmp_path):
+        manager = FakeDataAPIManager(make_table([1, 2, 3]))
+        snapshot = data_snapshot.DataSnapshot(tmp_path)
+        snapshot.sync(manager)
+        snapshot.sync(manager)
+        assert manager.downloads == [(1, 3)]
+
+    def test_new_rows_are_appended(self, data_snapshot, tmp_path):
+        manager = FakeDataAPIManager(make_table([1, 2, 3, 5]))
+        snapshot = data_snapshot.DataSnapshot(tmp_path)
+        snapshot.sync(manager)
+        manager.table = make_table([1, 2, 3, 5, 8, 9, 13])
+        assert snapshot.sync(manager) == manager.get_fingerprint()
+        assert manager.downloads == [(1, 5), (6, 13)]
+        pd.testing.assert_frame_equal(snapshot.load(), manager.table)
+
+    def test_changed_rows_are_downloaded_again(self, data_snapshot, tmp_path):
+        manager = FakeDataAPIManager(make_table([1, 2, 3, 5]))
+        snapshot = data_snapshot.DataSnapshot(tmp_path)
+        snapshot.sync(manager)
+        manager.table = make_table([1, 3, 5, 8])
+        snapshot.sync(manager)
+        assert manager.downloads == [(1, 5), (1, 8)]
+        pd.testing.assert_frame_equal(snapshot.load(), manager.table)
+
+    def test_missing_chunks_invalidate_the_manifest(self, data_snapshot, tmp_path):
+        manager = FakeDataAPIManager(make_table([1, 2, 3, 5]))
+        snapshot = data_snapshot.DataSnapshot(tmp_path)
+        snapshot.sync(manager)
+        snapshot.chunk_paths[0].unlink()
+        assert data_snapshot.DataSnapshot(tmp_path).fingerprint is None
+
+    def test_empty_table(self, data_snapshot, tmp_path):
+        snapshot = data_snapshot.DataSnapshot(tmp_path)
+        assert snapshot.sync(FakeDataAPIManager(make_table([])))["rows"] == 0
+        with pytest.raises(ValueError):
+            snapshot.load()
+
+    def test_fingerprint_hash(self, data_snapshot):
+        fingerprint = {"rows": 2, "min_id": 1, "max_id": 2, "checksum": 10}
+        fingerprint_hash = data_snapshot.DataSnapshot.fingerprint_hash
+        assert fingerprint_hash(fingerprint) == fingerprint_hash(dict(reversed(list(fingerprint.items()))))
+        assert fingerprint_hash(fingerprint) != fingerprint_hash({**fingerprint, "checksum": 11})
+        assert len(fingerprint_hash(fingerprint)) == 16
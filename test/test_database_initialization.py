@@ -0,0 +1,67 @@
+import csv
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("psycopg2")
+pytest.importorskip("requests")
+pytest.importorskip("prometheus_client")
+
+TABLE_COLUMNS = ["temperature", "exhaust_vacuum", "atmospheric_pressure", "relative_humidity", "electrical_output"]
+
+
+@pytest.fixture(scope="module")
+def database_initalization(import_app_module):
+    # The initialization script is run from the utils directory, and imports the logger as a top level module
+    utils_dir = str(Path(__file__).parent.parent / "data_management_api" / "utils")
+    sys.path.insert(0, utils_dir)
+    try:
+        return import_app_module("data_management_api", "utils.database_initalization")
+    finally:
+        sys.path.remove(utils_dir)
+        sys.modules.pop("logger", None)
+
+
+@pytest.fixture
+def db_initializer(database_initalization):
+    class FakeDBInitializer(database_initalization.PowerPlantDBInitializer):
+        """Initializer recording the CSV data it would COPY, without connecting to a database."""
+
+        def __init__(self, table_columns: list) -> None:
+            self.table_columns = table_columns
+            self.copies = []
+
+        def retrieve_column_names(self, table_name: str, ignore_id: bool = True) -> list:
+            return self.table_columns
+
+        def copy_csv_buffer(self, table_name: str, columns: list, buffer: io.StringIO):
+            self.copies.append((columns, list(csv.reader(buffer))))
+
+    return FakeDBInitializer
+
+
+def make_data(rows: int) -> pd.DataFrame:
+    # Columns are matched to the table's case insensitively, whatever order they come in
+    columns = ["electrical_output", "Temperature", "relative_humidity", "exhaust_vacuum", "atmospheric_pressure"]
+    return pd.DataFrame({column: [float(i) for i in range(rows)] for column in columns})
+
+
+class TestBulkLoading:
+    def test_copy_dataframe(self, db_initializer):
+        # The time column is left to its default, as the data doesn't have it
+        initializer = db_initializer(TABLE_COLUMNS + ["recorded_at"])
+        assert initializer.copy_dataframe("powerplant", make_data(3)) == 3
+        columns, rows = initializer.copies[0]
+        assert columns == TABLE_COLUMNS
+        assert rows == [[str(float(i))] * len(TABLE_COLUMNS) for i in range(3)]
+
+    def test_rows_are_loaded_in_chunks(self, database_initalization, db_initializer):
+        initializer = db_initializer(TABLE_COLUMNS)
+        database_initalization.load_rows_bulk(initializer, "powerplant", make_data(12).iloc[2:], chunk_size=4)
+        # Each chunk is its own COPY, in order, so an interrupted load can be resumed from the row count
+        assert [len(rows) for _, rows in initializer.copies] == [4, 4, 2]
+        loaded = [float(row[0]) for _, rows in initializer.copies for row in rows]
+        assert loaded == [float(i) for i in range(2, 12)]
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+
+class FakeCursor:
+    def execute(self, query, params=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor()
+
+    def rollback(self):
+        pass
+
+
+class FakeConnectionPool:
+    """In-memory replacement of psycopg2's ThreadedConnectionPool, handing out fake connections."""
+
+    def __init__(self) -> None:
+        self.created = 0
+        self.discarded = 0
+        self.idle = []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.created += 1
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        if close:
+            self.discarded += 1
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        self.idle = []
+
+
+@pytest.fixture(scope="module")
+def db_pool(import_app_module):
+    return import_app_module("data_management_api", "utils.db_pool")
+
+
+@pytest.fixture
+def pool(db_pool):
+    # Without minimum connections, creating the pool doesn't connect to the database
+    pool = db_pool.PowerPlantDBPool(min_size=0, max_size=1, checkout_timeout=0.05, health_check_interval=60)
+    pool._pool = FakeConnectionPool()
+    return pool
+
+
+class TestPowerPlantDBPool:
+    def test_checkout_waits_for_a_free_connection(self, pool):
+        conn = pool.getconn()
+        timer = threading.Timer(0.01, pool.putconn, args=(conn,))
+        timer.start()
+        pool.checkout_timeout = 5
+        assert pool.getconn() is conn
+        timer.join()
+        stats = pool.stats()
+        assert (stats["checkouts"], stats["in_use"], stats["timeouts"]) == (2, 1, 0)
+        assert stats["max_checkout_wait_seconds"] > 0
+
+    def test_checkout_timeout(self, db_pool, pool):
+        pool.getconn()
+        with pytest.raises(db_pool.PoolTimeoutError):
+            pool.getconn()
+        assert pool.stats()["timeouts"] == 1
+
+    def test_closed_connections_are_discarded(self, pool):
+        conn = pool.getconn()
+        conn.closed = 1
+        pool.putconn(conn)
+        assert pool._pool.discarded == 1
+        assert pool.getconn() is not conn
+        assert pool.stats()["in_use"] == 1
@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+xgboost = pytest.importorskip("xgboost")
+
+from sklearn.feature_selection import VarianceThreshold  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+
+from ml_model.modeling.data_preprocessor import DataPreprocessor  # noqa: E402
+from ml_model.modeling.pipeline import ProcessingPipeline  # noqa: E402
+
+FEATURES = ["temperature", "exhaust_vacuum", "atmospheric_pressure", "relative_humidity"]
+
+
+def make_data(rows: int, seed: int) -> tuple:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, len(FEATURES))), columns=FEATURES)
+    y = X["temperature"] * 3 - X["relative_humidity"] + rng.normal(scale=0.5, size=len(X))
+    return X, y
+
+
+def build_pipeline(**estimator_params) -> Pipeline:
+    return Pipeline(
+        [
+            ("data_preprocessor", DataPreprocessor()),
+            ("processing_pipeline", ProcessingPipeline({"normalization_method": "STANDARDIZE"}).preprocessor),
+            ("feature_selector", VarianceThreshold()),
+            ("estimator", xgboost.XGBRegressor(max_depth=3, **estimator_params)),
+        ]
+    )
+
+
+class TestFitWithEarlyStopping:
+    def test_truncated_to_best_iteration(self):
+        X, y = make_data(600, seed=0)
+        pipeline = build_pipeline(n_estimators=1000, learning_rate=0.3, early_stopping_rounds=10)
+        ProcessingPipeline.fit_with_early_stopping(pipeline, X.iloc[:400], y.iloc[:400], X.iloc[400:], y.iloc[400:])
+        estimator = pipeline.named_steps["estimator"]
+        best_iteration = estimator.best_iteration
+        assert estimator.get_booster().num_boosted_rounds() == best_iteration + 1 < 1000
+        assert estimator.get_params()["n_estimators"] == best_iteration + 1
+        assert estimator.get_params()["early_stopping_rounds"] is None
+
+        # The same trees as the untruncated model up to its best iteration
+        full = build_pipeline(n_estimators=best_iteration + 11, learning_rate=0.3)
+        full.fit(X.iloc[:400], y.iloc[:400])
+        X_transformed = full[:-1].transform(X.iloc[400:])
+        expected = (
+            full.named_steps["estimator"]
+            .get_booster()
+            .predict(xgboost.DMatrix(X_transformed), iteration_range=(0, best_iteration + 1))
+        )
+        np.testing.assert_allclose(pipeline.predict(X.iloc[400:]), expected, rtol=1e-6)
+
+        # Refitting doesn't require a validation set anymore
+        pipeline.fit(X, y)
+        assert pipeline.named_steps["estimator"].get_booster().num_boosted_rounds() == best_iteration + 1
+
+    def test_truncate_without_early_stopping(self):
+        X, y = make_data(200, seed=0)
+        pipeline = build_pipeline(n_estimators=15).fit(X, y)
+        estimator = pipeline.named_steps["estimator"]
+        assert ProcessingPipeline.truncate_to_best_iteration(estimator) is estimator
+        assert estimator.get_booster().num_boosted_rounds() == 15
+
+    def test_transform_with_target_keeps_rows_aligned(self):
+        X, y = make_data(300, seed=0)
+        X.iloc[:10] *= 50
+        preprocessing = Pipeline([("data_preprocessor", DataPreprocessor(remove_outliers=True))]).fit(X)
+        X_transformed, y_transformed = ProcessingPipeline.transform_with_target(preprocessing, X, y)
+        assert len(X_transformed) < len(X)
+        pd.testing.assert_series_equal(y_transformed, y.loc[X_transformed.index])
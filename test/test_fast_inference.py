@@ -0,0 +1,58 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+xgboost = pytest.importorskip("xgboost")
+
+from sklearn.feature_selection import VarianceThreshold  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+
+from ml_model.modeling.data_preprocessor import DataPreprocessor  # noqa: E402
+from ml_model.modeling.fast_inference import (  # noqa: E402
+    FastPredictor,
+    export_fast_inference,
+    verify_fast_inference,
+)
+from ml_model.modeling.pipeline import ProcessingPipeline  # noqa: E402
+
+FEATURES = ["temperature", "exhaust_vacuum", "atmospheric_pressure", "relative_humidity"]
+
+
+def fit_pipeline(normalization_method: str) -> tuple:
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(500, len(FEATURES))), columns=FEATURES)
+    X["constant"] = 1.0  # Removed by the feature selector
+    X.iloc[::10, 0] = np.nan
+    y = X["temperature"].fillna(0) * 3 - X["relative_humidity"] + rng.normal(scale=0.1, size=len(X))
+    pipeline = Pipeline(
+        [
+            ("data_preprocessor", DataPreprocessor()),
+            (
+                "processing_pipeline",
+                ProcessingPipeline({"normalization_method": normalization_method}).preprocessor,
+            ),
+            ("feature_selector", VarianceThreshold()),
+            ("estimator", xgboost.XGBRegressor(n_estimators=20, max_depth=3)),
+        ]
+    )
+    return pipeline.fit(X, y), X
+
+
+class TestFastInference:
+    @pytest.mark.parametrize("normalization_method", ["STANDARDIZE", "NORMALIZE"])
+    def test_export_matches_pipeline(self, tmp_path, normalization_method):
+        pipeline, X = fit_pipeline(normalization_method)
+        export_dir = export_fast_inference(pipeline, tmp_path / "fast_inference")
+        assert verify_fast_inference(pipeline, export_dir, X) <= 1e-4
+
+        predictor = FastPredictor.load(export_dir, nthread=1)
+        assert predictor.feature_names == FEATURES + ["constant"]
+        predictions = predictor.predict(X[predictor.feature_names].to_numpy(dtype=np.float64))
+        np.testing.assert_allclose(predictions, pipeline.predict(X), atol=1e-4)
+
+    def test_outlier_removal_not_exportable(self, tmp_path):
+        pipeline, _ = fit_pipeline("STANDARDIZE")
+        pipeline.named_steps["data_preprocessor"].remove_outliers = True
+        with pytest.raises(ValueError):
+            export_fast_inference(pipeline, tmp_path)
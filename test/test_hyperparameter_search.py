@@ -0,0 +1,94 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("xgboost")
+
+from ml_model.modeling.hyperparameter_search import (  # noqa: E402
+    ASHAScheduler,
+    HyperparameterSearch,
+    sample_params,
+)
+
+SEARCH_SPACE = {
+    "learning_rate": {"type": "loguniform", "low": 0.01, "high": 0.3},
+    "subsample": {"type": "uniform", "low": 0.5, "high": 1.0},
+    "max_depth": {"type": "int", "low": 2, "high": 4},
+    "tree_method": {"type": "choice", "values": ["hist", "approx"]},
+}
+
+
+class TestSampleParams:
+    def test_distributions(self):
+        rng = np.random.default_rng(0)
+        samples = [sample_params(SEARCH_SPACE, rng) for _ in range(200)]
+        assert all(0.01 <= sample["learning_rate"] <= 0.3 for sample in samples)
+        assert all(0.5 <= sample["subsample"] <= 1.0 for sample in samples)
+        # Integer bounds are inclusive
+        assert {sample["max_depth"] for sample in samples} == {2, 3, 4}
+        assert {sample["tree_method"] for sample in samples} == {"hist", "approx"}
+        # Log uniform samples are spread evenly over the orders of magnitude
+        assert 0.3 < np.mean([sample["learning_rate"] < 0.055 for sample in samples]) < 0.7
+
+    def test_seed(self):
+        samples = [sample_params(SEARCH_SPACE, np.random.default_rng(1)) for _ in range(2)]
+        assert samples[0] == samples[1]
+
+    def test_unknown_distribution(self):
+        with pytest.raises(ValueError):
+            sample_params({"gamma": {"type": "normal", "low": 0, "high": 1}}, np.random.default_rng(0))
+
+
+class TestASHAScheduler:
+    def test_rung_resources(self):
+        assert ASHAScheduler(10, 100, 3).rung_resources == [10, 30, 100]
+        assert ASHAScheduler(100, 100, 3).rung_resources == [100]
+
+    def test_promotions(self):
+        scheduler = ASHAScheduler(10, 100, 3)
+        for trial_id, score in enumerate([3.0, 1.0]):
+            scheduler.report(trial_id, 0, score)
+        # Promotions don't wait for the rung to be complete, only for enough trials to pick the top third
+        assert scheduler.next_promotion() is None
+        scheduler.report(2, 0, 2.0)
+        assert scheduler.next_promotion() == (1, 1)
+        assert scheduler.next_promotion() is None
+        for trial_id, score in enumerate([0.5, 4.0, 5.0], start=3):
+            scheduler.report(trial_id, 0, score)
+        assert scheduler.next_promotion() == (3, 1)
+
+        for trial_id, score in [(1, 0.9), (3, 0.4), (4, 0.8)]:
+            scheduler.report(trial_id, 1, score)
+        # Higher rungs are promoted first
+        assert scheduler.next_promotion() == (3, 2)
+        # The top third of rung 0 (trials 3 and 1) was already promoted
+        assert scheduler.next_promotion() is None
+
+    def test_best_trial(self):
+        scheduler = ASHAScheduler(10, 100, 3)
+        assert scheduler.best_trial() is None
+        scheduler.report(0, 0, 0.1)
+        scheduler.report(1, 0, 0.5)
+        scheduler.report(1, 1, 0.3)
+        # Trials that reached a higher rung are preferred, even if a lower rung had a better score
+        assert scheduler.best_trial() == (1, 1, 0.3)
+
+
+class TestHyperparameterSearch:
+    def test_run(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(400, 4))
+        y = X[:, 0] * 3 - X[:, 1] + rng.normal(scale=0.1, size=len(X))
+        completed = []
+        search = HyperparameterSearch(
+            SEARCH_SPACE, n_trials=6, n_workers=2, min_resource=5, max_resource=45, early_stopping_rounds=5
+        )
+        best = search.run(X[:300], y[:300], X[300:], y[300:], callback=lambda *args: completed.append(args[:2]))
+        assert len(search.trials) == 6
+        # Every trial ran the first rung and the top third of them the second one, too few to promote any further
+        assert [rung for _, rung in completed].count(0) == 6
+        assert [rung for _, rung in completed].count(1) == 2
+        assert best["rung"] == 1
+        rung_scores = [trial["results"][1]["score"] for trial in search.trials.values() if 1 in trial["results"]]
+        assert best["score"] == min(rung_scores)
+        assert best["best_iteration"] < 15
+        assert set(SEARCH_SPACE) <= set(best["params"])
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import pytest
+
+from ml_model_api.utils.inference_executor import (
+    InferenceExecutor,
+    InferenceQueueFullError,
+)
+
+
+class TestInferenceExecutor:
+    def test_run(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, nthread=1)
+        assert asyncio.run(executor.run(lambda x, y=0: x + y, 1, y=2)) == 3
+        assert executor.stats()["completed"] == 1
+        executor.shutdown()
+
+    def test_full_queue_is_rejected(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, nthread=1)
+        release = threading.Event()
+
+        async def run_calls():
+            # One call running and one queued fill the executor, the third one is rejected right away
+            calls = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with pytest.raises(InferenceQueueFullError):
+                await executor.run(release.wait)
+            stats = executor.stats()
+            release.set()
+            await asyncio.gather(*calls)
+            return stats
+
+        stats = asyncio.run(run_calls())
+        assert (stats["running"], stats["queued"], stats["rejected"]) == (1, 1, 1)
+        assert executor.stats()["completed"] == 2
+        executor.shutdown()
+
+    def test_failures_free_their_slot(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=0, nthread=1)
+
+        def fail():
+            raise RuntimeError("Prediction failed")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(executor.run(fail))
+        assert asyncio.run(executor.run(lambda: "ok")) == "ok"
+        assert executor.stats()["failed"] == 1
+        executor.shutdown()
+
+    def test_invalid_workers(self):
+        with pytest.raises(ValueError):
+            InferenceExecutor(max_workers=0)
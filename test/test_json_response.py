@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("orjson")
+prometheus_client = pytest.importorskip("prometheus_client")
+
+COLUMNS = ["id", "temperature", "recorded_at", "plant_id"]
+ROWS = [
+    (1, Decimal("14.96"), datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc), 3),
+    (2, 25.18, datetime(2024, 1, 1, 13, tzinfo=timezone.utc), None),
+]
+
+
+@pytest.fixture(scope="module")
+def json_response(import_app_module):
+    return import_app_module("data_management_api", "utils.json_response")
+
+
+class TestJSONResponse:
+    def test_rows_to_dict(self, json_response):
+        assert json_response.rows_to_dict(COLUMNS, ROWS) == {
+            1: {"temperature": Decimal("14.96"), "recorded_at": ROWS[0][2], "plant_id": 3},
+            2: {"temperature": 25.18, "recorded_at": ROWS[1][2], "plant_id": None},
+        }
+        assert json_response.rows_to_dict(COLUMNS, []) == {}
+
+    def test_render(self, json_response):
+        body = json_response.ORJSONResponse(json_response.rows_to_dict(COLUMNS, ROWS)).body
+        # The ids become string keys, like the standard library json module does
+        assert json.loads(body) == {
+            "1": {"temperature": 14.96, "recorded_at": "2024-01-01T12:30:00+00:00", "plant_id": 3},
+            "2": {"temperature": 25.18, "recorded_at": "2024-01-01T13:00:00+00:00", "plant_id": None},
+        }
+
+    def test_rendering_is_timed(self, json_response):
+        def renders() -> float:
+            return prometheus_client.REGISTRY.get_sample_value(
+                "stage_duration_seconds_count", {"stage": "response_rendering"}
+            )
+
+        json_response.ORJSONResponse({})
+        before = renders()
+        json_response.ORJSONResponse({1: {"temperature": 1.0}})
+        assert renders() == before + 1
+
+    def test_unsupported_type(self, json_response):
+        with pytest.raises(TypeError):
+            json_response.ORJSONResponse({1: {"value": object()}})
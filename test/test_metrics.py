@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+prometheus_client = pytest.importorskip("prometheus_client")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def metrics(import_app_module):
+    return import_app_module("data_management_api", "utils.metrics")
+
+
+@pytest.fixture(scope="module")
+def client(metrics):
+    app = FastAPI()
+    app.middleware("http")(metrics.metrics_middleware)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with metrics.stage_timer("read_item"):
+            return {"id": item_id}
+
+    @app.get("/failure")
+    def failure():
+        raise RuntimeError("Failed")
+
+    @app.get("/metrics")
+    def read_metrics():
+        return metrics.metrics_response()
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def sample(name: str, **labels) -> float:
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetricsMiddleware:
+    def test_requests_are_labelled_by_route(self, client):
+        labels = {"method": "GET", "route": "/items/{item_id}", "status_code": "200"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        stage_before = sample("stage_duration_seconds_count", stage="read_item")
+        for item_id in range(3):
+            assert client.get(f"/items/{item_id}").status_code == 200
+        assert sample("http_request_duration_seconds_count", **labels) == before + 3
+        assert sample("stage_duration_seconds_count", stage="read_item") == stage_before + 3
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    def test_validation_errors_and_unmatched_paths(self, client):
+        invalid = {"method": "GET", "route": "/items/{item_id}", "status_code": "422"}
+        unmatched = {"method": "GET", "route": "unmatched", "status_code": "404"}
+        before = [sample("http_request_duration_seconds_count", **labels) for labels in (invalid, unmatched)]
+        assert client.get("/items/first").status_code == 422
+        assert client.get("/other/1").status_code == 404
+        after = [sample("http_request_duration_seconds_count", **labels) for labels in (invalid, unmatched)]
+        assert after == [value + 1 for value in before]
+
+    def test_exceptions_are_recorded_as_server_errors(self, client):
+        labels = {"method": "GET", "route": "/failure", "status_code": "500"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        assert client.get("/failure").status_code == 500
+        assert sample("http_request_duration_seconds_count", **labels) == before + 1
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    def test_metrics_endpoint(self, client):
+        client.get("/items/1")
+        response = client.get("/metrics")
+        assert response.headers["content-type"] == prometheus_client.CONTENT_TYPE_LATEST
+        assert 'route="/items/{item_id}"' in response.text
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from ml_model_api.utils.micro_batcher import MicroBatcher
+
+
+class TestMicroBatcher:
+    def test_concurrent_items_are_batched(self):
+        batches = []
+
+        async def process_batch(key, items):
+            batches.append((key, items))
+            return [item * 2 for item in items]
+
+        async def run():
+            micro_batcher = MicroBatcher(process_batch, max_batch_size=8, max_wait_ms=20)
+            results = await asyncio.gather(*[micro_batcher.submit("XGB", item) for item in range(5)])
+            await micro_batcher.stop()
+            return results, micro_batcher.stats()
+
+        results, stats = asyncio.run(run())
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [("XGB", [0, 1, 2, 3, 4])]
+        assert stats["batch_size_histogram"]["count"] == 1
+
+    def test_max_batch_size(self):
+        batch_sizes = []
+
+        async def process_batch(key, items):
+            batch_sizes.append(len(items))
+            return items
+
+        async def run():
+            micro_batcher = MicroBatcher(process_batch, max_batch_size=4, max_wait_ms=20)
+            results = await asyncio.gather(*[micro_batcher.submit("XGB", item) for item in range(10)])
+            await micro_batcher.stop()
+            return results
+
+        assert asyncio.run(run()) == list(range(10))
+        assert batch_sizes == [4, 4, 2]
+
+    def test_items_grouped_by_key(self):
+        batches = {}
+
+        async def process_batch(key, items):
+            batches[key] = items
+            return [key for _ in items]
+
+        async def run():
+            micro_batcher = MicroBatcher(process_batch, max_wait_ms=20)
+            keys = ["1", "2", "1", "2", "1"]
+            results = await asyncio.gather(*[micro_batcher.submit(key, i) for i, key in enumerate(keys)])
+            await micro_batcher.stop()
+            return results
+
+        assert asyncio.run(run()) == ["1", "2", "1", "2", "1"]
+        assert batches == {"1": [0, 2, 4], "2": [1, 3]}
+
+    def test_batch_error_propagated(self):
+        async def process_batch(key, items):
+            raise RuntimeError("Prediction failed")
+
+        async def run():
+            micro_batcher = MicroBatcher(process_batch, max_wait_ms=1)
+            try:
+                await micro_batcher.submit("XGB", 1)
+            finally:
+                await micro_batcher.stop()
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(run())
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from ml_model_api.utils.model_cache import ModelCache
+
+
+class TestModelCache:
+    def test_cache_hit(self):
+        loads = []
+        model_cache = ModelCache(loader=lambda name, version: loads.append(version) or object(), resolver=None)
+        model, version = model_cache.get("XGB", "1")
+        assert model_cache.get("XGB", "1") == (model, "1")
+        assert loads == ["1"]
+        assert model_cache.stats()["hits"] == 1
+        assert model_cache.stats()["misses"] == 1
+
+    def test_alias_resolution(self):
+        resolutions = []
+        model_cache = ModelCache(
+            loader=lambda name, version: version,
+            resolver=lambda name, alias: resolutions.append(alias) or "3",
+            alias_ttl=None,
+        )
+        assert model_cache.get("XGB", "latest") == ("3", "3")
+        assert model_cache.get("XGB", "latest") == ("3", "3")
+        assert model_cache.get("XGB", "3") == ("3", "3")
+        assert resolutions == ["latest"]
+
+    def test_alias_ttl_expired(self):
+        versions = iter(["1", "2"])
+        model_cache = ModelCache(loader=lambda name, version: version, resolver=lambda *_: next(versions), alias_ttl=0)
+        assert model_cache.get("XGB", "latest")[1] == "1"
+        assert model_cache.get("XGB", "latest")[1] == "2"
+
+    def test_lru_eviction(self):
+        model_cache = ModelCache(loader=lambda name, version: version, resolver=None, max_models=2)
+        model_cache.get("XGB", "1")
+        model_cache.get("XGB", "2")
+        model_cache.get("XGB", "1")
+        model_cache.get("XGB", "3")
+        assert model_cache.stats()["cached_models"] == ["XGB/1", "XGB/3"]
+        assert model_cache.stats()["evictions"] == 1
+
+    def test_single_flight(self):
+        loads = []
+
+        def slow_loader(name, version):
+            loads.append(version)
+            time.sleep(0.1)
+            return version
+
+        model_cache = ModelCache(loader=slow_loader, resolver=None)
+        threads = [threading.Thread(target=model_cache.get, args=("XGB", "1")) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert loads == ["1"]
+        assert model_cache.stats()["coalesced_loads"] == 4
+
+    def test_load_failure_not_cached(self):
+        def failing_loader(name, version):
+            raise RuntimeError("Model not found")
+
+        model_cache = ModelCache(loader=failing_loader, resolver=None)
+        with pytest.raises(RuntimeError):
+            model_cache.get("XGB", "1")
+        assert model_cache.stats()["load_failures"] == 1
+        assert model_cache.stats()["cached_models"] == []
+
+    def test_pinned_alias_is_not_resolved_again(self):
+        resolutions = []
+
+        def resolver(name, alias):
+            resolutions.append(alias)
+            return "1"
+
+        model_cache = ModelCache(loader=lambda name, version: version, resolver=resolver, alias_ttl=0)
+        assert model_cache.pin_alias("XGB", "latest", "2") is None
+        assert model_cache.get("XGB", "latest") == ("2", "2")
+        assert model_cache.get("XGB", "latest") == ("2", "2")
+        assert model_cache.pin_alias("XGB", "latest", "3") == "2"
+        assert model_cache.get("XGB", "latest") == ("3", "3")
+        assert resolutions == []
+        assert model_cache.stats()["pinned_aliases"] == ["XGB/latest"]
@@ -0,0 +1,114 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("sklearn")
+xgboost = pytest.importorskip("xgboost")
+
+FEATURES = ["temperature", "exhaust_vacuum", "atmospheric_pressure", "relative_humidity"]
+
+
+@pytest.fixture(scope="module")
+def out_of_core(import_app_module):
+    return import_app_module("ml_model", "modeling.out_of_core")
+
+
+def make_table(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame(rng.normal(size=(rows, len(FEATURES))), columns=FEATURES, index=np.arange(1, rows + 1))
+    table.index.name = "id"
+    table["electrical_output"] = table["temperature"] * 3 - table["relative_humidity"]
+    table["recorded_at"] = pd.Timestamp("2024-01-01")
+    return table
+
+
+def write_chunks(table: pd.DataFrame, chunk_size: int, directory) -> list:
+    chunk_paths = []
+    for i, start in enumerate(range(0, len(table), chunk_size)):
+        chunk_paths.append(directory / f"chunk_{i}.parquet")
+        table.iloc[start : start + chunk_size].to_parquet(chunk_paths[-1])
+    return chunk_paths
+
+
+class TestIsTestRow:
+    def test_split_does_not_depend_on_chunking(self, out_of_core):
+        ids = pd.Index(np.arange(1, 10001))
+        test_rows = out_of_core.is_test_row(ids, 0.2, random_seed=42)
+        chunked = np.concatenate([out_of_core.is_test_row(ids[i : i + 999], 0.2, 42) for i in range(0, 10000, 999)])
+        np.testing.assert_array_equal(test_rows, chunked)
+        assert 0.18 < test_rows.mean() < 0.22
+
+    def test_seed(self, out_of_core):
+        ids = pd.Index(np.arange(1, 1001))
+        test_rows = out_of_core.is_test_row(ids, 0.5, random_seed=0)
+        np.testing.assert_array_equal(test_rows, out_of_core.is_test_row(ids, 0.5, random_seed=0))
+        assert not np.array_equal(test_rows, out_of_core.is_test_row(ids, 0.5, random_seed=1))
+        assert not out_of_core.is_test_row(ids, 0.0, random_seed=0).any()
+
+
+class TestChunkedDataset:
+    def test_subsets_partition_the_rows(self, out_of_core, tmp_path):
+        table = make_table(1000)
+        dataset = out_of_core.ChunkedDataset(
+            write_chunks(table, 300, tmp_path),
+            "electrical_output",
+            test_size=0.2,
+            random_seed=42,
+            validation_size=0.1,
+            excluded_columns=("recorded_at",),
+        )
+        subsets = {subset: dataset.load_subset(subset) for subset in dataset.SUBSETS}
+        ids = np.concatenate([X.index.to_numpy() for X, _ in subsets.values()])
+        np.testing.assert_array_equal(np.sort(ids), table.index.to_numpy())
+        for X, y in subsets.values():
+            assert list(X.columns) == FEATURES
+            pd.testing.assert_series_equal(y, table.loc[X.index, "electrical_output"])
+        X_test, _ = subsets["test"]
+        np.testing.assert_array_equal(X_test.index, table.index[out_of_core.is_test_row(table.index, 0.2, 42)])
+
+    def test_load_subset(self, out_of_core, tmp_path):
+        dataset = out_of_core.ChunkedDataset(write_chunks(make_table(100), 10, tmp_path), "electrical_output", 0.5, 0)
+        X, y = dataset.load_subset("train", max_rows=15)
+        assert len(X) == len(y) == 15
+        with pytest.raises(ValueError):
+            dataset.load_subset("validation")
+        with pytest.raises(ValueError):
+            list(dataset.iter_chunks("holdout"))
+
+
+class TestChunkIterator:
+    def test_external_memory_matrix(self, out_of_core, tmp_path):
+        table = make_table(500).drop(columns=["recorded_at"])
+        dataset = out_of_core.ChunkedDataset(write_chunks(table, 100, tmp_path), "electrical_output", 0.2, 42)
+        iterator = out_of_core.ChunkIterator(dataset, lambda X, y: (X.to_numpy(), y), str(tmp_path / "cache"))
+        dtrain = xgboost.DMatrix(iterator)
+        X_train, y_train = dataset.load_subset("train")
+        assert (dtrain.num_row(), dtrain.num_col()) == X_train.shape
+        np.testing.assert_allclose(dtrain.get_label(), y_train.to_numpy(), rtol=1e-6)
+
+
+class TestTrainOutOfCore:
+    def test_matches_in_memory_preprocessing(self, out_of_core, tmp_path):
+        table = make_table(1000).drop(columns=["recorded_at"])
+        dataset = out_of_core.ChunkedDataset(
+            write_chunks(table, 150, tmp_path), "electrical_output", 0.2, 42, validation_size=0.2
+        )
+        processing_pipeline = out_of_core.ProcessingPipeline({"normalization_method": "STANDARDIZE"})
+        pipeline = out_of_core.train_out_of_core(
+            dataset,
+            out_of_core.DataPreprocessor(),
+            processing_pipeline.preprocessor,
+            out_of_core.VarianceThreshold(),
+            {"n_estimators": 200, "max_depth": 3, "early_stopping_rounds": 5},
+            tmp_path / "cache",
+        )
+        X_train, _ = dataset.load_subset("train")
+        scaler = pipeline.named_steps["processing_pipeline"].named_transformers_["numeric"].named_steps["scaler"]
+        np.testing.assert_allclose(scaler.mean_, X_train.mean().to_numpy())
+        np.testing.assert_allclose(scaler.var_, X_train.var(ddof=0).to_numpy())
+
+        estimator = pipeline.named_steps["estimator"]
+        assert estimator.get_booster().num_boosted_rounds() == estimator.best_iteration + 1 < 200
+        X_test, y_test = dataset.load_subset("test")
+        assert np.corrcoef(pipeline.predict(X_test), y_test)[0, 1] > 0.9
@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pydantic = pytest.importorskip("pydantic")
+
+from ml_model_api.utils.power_plant_data import (  # noqa: E402
+    FEATURE_NAMES,
+    PowerPlantData,
+    PowerPlantDataBatch,
+    PowerPlantDataColumns,
+)
+
+READINGS = [
+    {"temperature": 14.96, "exhaust_vacuum": 41.76, "atmospheric_pressure": 1024.07, "relative_humidity": 73.17},
+    {"temperature": 25.18, "exhaust_vacuum": 62.96, "atmospheric_pressure": 1020.04, "relative_humidity": 59.08},
+]
+
+
+class TestPowerPlantDataBatch:
+    def test_row_and_column_formats_match(self):
+        batch = PowerPlantDataBatch(readings=[PowerPlantData(**reading) for reading in READINGS])
+        columns = PowerPlantDataColumns(
+            **{feature: [reading[feature] for reading in READINGS] for feature in FEATURE_NAMES}
+        )
+        assert len(batch) == len(columns) == 2
+        assert batch.to_rows() == columns.to_rows()
+        np.testing.assert_array_equal(batch.to_array(), columns.to_array())
+        assert batch.to_frame().equals(columns.to_frame())
+        assert PowerPlantDataColumns.from_rows(batch.to_rows()).to_rows() == batch.to_rows()
+
+    def test_ids(self):
+        batch = PowerPlantDataBatch(readings=[PowerPlantData(**reading) for reading in READINGS], ids=["a", 7])
+        assert batch.get_ids() == ["a", 7]
+        assert PowerPlantDataBatch(readings=[PowerPlantData(**READINGS[0])]).get_ids() == [0]
+
+    def test_mismatched_lengths(self):
+        with pytest.raises(pydantic.ValidationError):
+            PowerPlantDataBatch(readings=[PowerPlantData(**READINGS[0])], ids=[1, 2])
+        values = {feature: [reading[feature] for reading in READINGS] for feature in FEATURE_NAMES}
+        values["temperature"] = values["temperature"][:1]
+        with pytest.raises(pydantic.ValidationError):
+            PowerPlantDataColumns(**values)
+
+    def test_empty_batch(self):
+        assert PowerPlantDataBatch(readings=[]).to_array().shape == (0, len(FEATURE_NAMES))
@@ -0,0 +1,31 @@
+from ml_model_api.utils.prediction_cache import PredictionCache
+
+
+class TestPredictionCache:
+    def test_quantized_hits(self):
+        prediction_cache = PredictionCache(decimals=1)
+        prediction_cache.put_many("XGB", "1", [(20.01, 55.0, 1013.0, 70.0)], [450.0])
+        assert prediction_cache.get_many("XGB", "1", [(20.04, 55.0, 1013.0, 70.0), (25.0, 55.0, 1013.0, 70.0)]) == [
+            450.0,
+            None,
+        ]
+        assert prediction_cache.get_many("XGB", "2", [(20.01, 55.0, 1013.0, 70.0)]) == [None]
+        stats = prediction_cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+        assert stats["hit_ratio"] == 1 / 3
+
+    def test_lru_eviction(self):
+        prediction_cache = PredictionCache(max_entries=2)
+        prediction_cache.put_many("XGB", "1", [(1.0,), (2.0,)], [1.0, 2.0])
+        prediction_cache.get_many("XGB", "1", [(1.0,)])
+        prediction_cache.put_many("XGB", "1", [(3.0,)], [3.0])
+        assert prediction_cache.get_many("XGB", "1", [(1.0,), (2.0,), (3.0,)]) == [1.0, None, 3.0]
+        assert prediction_cache.stats()["evictions"] == 1
+
+    def test_invalidate_version(self):
+        prediction_cache = PredictionCache()
+        prediction_cache.put_many("XGB", "1", [(1.0,)], [1.0])
+        prediction_cache.put_many("XGB", "2", [(1.0,)], [2.0])
+        prediction_cache.invalidate("XGB", "1")
+        assert prediction_cache.get_many("XGB", "1", [(1.0,)]) == [None]
+        assert prediction_cache.get_many("XGB", "2", [(1.0,)]) == [2.0]
@@ -0,0 +1,47 @@
+from ml_model_api.utils.model_cache import ModelCache
+from ml_model_api.utils.registry_watcher import RegistryWatcher
+
+
+class TestRegistryWatcher:
+    def test_swaps_to_new_version(self):
+        registry = {"latest": "1"}
+        warmed_up = []
+        model_cache = ModelCache(loader=lambda name, version: f"model_{version}", resolver=None)
+        registry_watcher = RegistryWatcher(
+            model_cache=model_cache,
+            resolver=lambda name, alias: registry[alias],
+            models=[("XGB", "latest")],
+            warm_up=lambda name, version: warmed_up.append(version),
+        )
+
+        assert registry_watcher.check("XGB", "latest")
+        assert model_cache.get("XGB", "latest") == ("model_1", "1")
+        assert not registry_watcher.check("XGB", "latest")
+
+        registry["latest"] = "2"
+        assert registry_watcher.check("XGB", "latest")
+        assert model_cache.get("XGB", "latest") == ("model_2", "2")
+        assert warmed_up == ["1", "2"]
+
+        status = registry_watcher.status()
+        assert status["models"]["XGB/latest"]["version"] == "2"
+        assert [(swap["previous_version"], swap["version"]) for swap in status["swaps"]] == [("1", "2"), (None, "1")]
+
+    def test_failed_load_keeps_previous_version(self):
+        registry = {"latest": "1"}
+
+        def loader(name, version):
+            if version == "2":
+                raise RuntimeError("Model artifacts not found")
+            return f"model_{version}"
+
+        model_cache = ModelCache(loader=loader, resolver=None)
+        registry_watcher = RegistryWatcher(
+            model_cache=model_cache, resolver=lambda name, alias: registry[alias], models=[("XGB", "latest")]
+        )
+        registry_watcher.check("XGB", "latest")
+
+        registry["latest"] = "2"
+        assert not registry_watcher.check("XGB", "latest")
+        assert model_cache.get("XGB", "latest") == ("model_1", "1")
+        assert registry_watcher.status()["models"]["XGB/latest"]["last_error"] == "Model artifacts not found"
@@ -0,0 +1,88 @@
+import csv
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+from data_management_api.utils.row_filter import (
+    RowFilter,
+    select_insert_columns,
+    write_rows_csv,
+)
+
+COLUMN_TYPES = {
+    "id": "integer",
+    "temperature": "double precision",
+    "relative_humidity": "double precision",
+    "recorded_at": "timestamp with time zone",
+    "plant_id": "integer",
+}
+
+
+class TestRowFilter:
+    def test_parse_value_ranges(self):
+        assert RowFilter.parse_value_ranges(["Temperature:10:20.5", "relative_humidity::50", "exhaust_vacuum:1:"]) == {
+            "temperature": (10.0, 20.5),
+            "relative_humidity": (None, 50.0),
+            "exhaust_vacuum": (1.0, None),
+        }
+        assert RowFilter.parse_value_ranges(None) == {}
+
+    @pytest.mark.parametrize("value_range", ["temperature:10", ":10:20", "temperature:1:2:3", "temperature:a:2"])
+    def test_invalid_value_ranges(self, value_range):
+        with pytest.raises(ValueError):
+            RowFilter.parse_value_ranges([value_range])
+
+    def test_condition(self):
+        start_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        row_filter = RowFilter(
+            start_id=10,
+            start_time=start_time,
+            plant_id=3,
+            value_ranges={"temperature": (10.0, 20.0), "relative_humidity": (None, 50.0)},
+        )
+        params = ["powerplant"]
+        condition = row_filter.build_condition(params, COLUMN_TYPES)
+        # Placeholders are numbered after the parameters already in the query
+        assert condition == (
+            "WHERE id >= $2 AND recorded_at >= $3 AND plant_id = $4 AND temperature >= $5 AND temperature <= $6 "
+            "AND relative_humidity <= $7"
+        )
+        assert params == ["powerplant", 10, start_time, 3, 10.0, 20.0, 50.0]
+
+    def test_no_conditions(self):
+        params = []
+        assert RowFilter().build_condition(params, COLUMN_TYPES) == ""
+        assert params == []
+
+    @pytest.mark.parametrize(
+        "row_filter", [RowFilter(plant_id=1), RowFilter(value_ranges={"electrical_output": (None, 400.0)})]
+    )
+    def test_missing_columns(self, row_filter):
+        with pytest.raises(ValueError):
+            row_filter.build_condition([], {"id": "integer", "temperature": "double precision"})
+
+
+class TestRowWriting:
+    def test_optional_columns_are_only_written_when_given(self):
+        columns = ["temperature", "recorded_at", "plant_id"]
+        assert select_insert_columns(columns, [{"temperature": 1.0}]) == ["temperature"]
+        assert select_insert_columns(columns, [{"temperature": 1.0}, {"temperature": 2.0, "plant_id": 2}]) == [
+            "temperature",
+            "plant_id",
+        ]
+
+    def test_write_rows_csv(self):
+        recorded_at = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+        rows = [
+            {"temperature": 14.96, "recorded_at": recorded_at, "plant_id": 1},
+            {"temperature": 25.18},
+        ]
+        buffer = io.StringIO()
+        time_start = datetime.now(timezone.utc)
+        write_rows_csv(buffer, ["temperature", "recorded_at", "plant_id"], rows)
+        written = list(csv.reader(io.StringIO(buffer.getvalue())))
+        assert written[0] == ["14.96", str(recorded_at), "1"]
+        # Missing times default to the insertion time, missing plants are written as NULL (empty)
+        assert written[1][0] == "25.18" and written[1][2] == ""
+        assert time_start <= datetime.fromisoformat(written[1][1]) <= datetime.now(timezone.utc)
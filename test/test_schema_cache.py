@@ -0,0 +1,34 @@
+from data_management_api.utils.schema_cache import TableMetadata, TableMetadataCache
+
+COLUMN_TYPES = {"temperature": "double precision", "electrical_output": "double precision"}
+
+
+class TestTableMetadataCache:
+    def test_entries_without_ttl_never_expire(self):
+        cache = TableMetadataCache()
+        metadata = TableMetadata(exists=True, column_types=COLUMN_TYPES)
+        metadata.created_at -= 10**6
+        cache.set("powerplant", metadata)
+        assert cache.get("powerplant") is metadata
+        assert cache.get("other") is None
+
+    def test_ttl(self):
+        cache = TableMetadataCache(ttl=60)
+        metadata = TableMetadata(exists=True, column_types=COLUMN_TYPES)
+        cache.set("powerplant", metadata)
+        assert cache.get("powerplant") is metadata
+        metadata.created_at -= 60
+        assert cache.get("powerplant") is None
+        # Expired entries are removed, not just skipped
+        metadata.created_at += 60
+        assert cache.get("powerplant") is None
+
+    def test_invalidate(self):
+        cache = TableMetadataCache()
+        for table_name in ["powerplant", "other"]:
+            cache.set(table_name, TableMetadata(exists=False, column_types={}))
+        cache.invalidate("powerplant")
+        assert cache.get("powerplant") is None
+        assert cache.get("other") is not None
+        cache.invalidate()
+        assert cache.get("other") is None
@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import orjson
+import pytest
+
+from data_management_api.utils.serialization import rows_to_ndjson
+
+
+class TestSerialization:
+    def test_rows_to_ndjson(self):
+        columns = ["id", "temperature", "recorded_at", "plant_id"]
+        rows = [
+            (1, Decimal("14.96"), datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc), 3),
+            (2, 25.18, datetime(2024, 1, 1, 13, tzinfo=timezone.utc), None),
+        ]
+        lines = rows_to_ndjson(columns, rows).splitlines()
+        assert [orjson.loads(line) for line in lines] == [
+            {"id": 1, "temperature": 14.96, "recorded_at": "2024-01-01T12:30:00+00:00", "plant_id": 3},
+            {"id": 2, "temperature": 25.18, "recorded_at": "2024-01-01T13:00:00+00:00", "plant_id": None},
+        ]
+        assert rows_to_ndjson(columns, []) == b""
+
+    def test_unsupported_type(self):
+        with pytest.raises(TypeError):
+            rows_to_ndjson(["id", "value"], [(1, object())])
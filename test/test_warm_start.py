@@ -0,0 +1,90 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+xgboost = pytest.importorskip("xgboost")
+
+from sklearn.feature_selection import VarianceThreshold  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+
+from ml_model.modeling.data_preprocessor import DataPreprocessor  # noqa: E402
+from ml_model.modeling.pipeline import ProcessingPipeline  # noqa: E402
+
+FEATURES = ["temperature", "exhaust_vacuum", "atmospheric_pressure", "relative_humidity"]
+
+
+def make_data(rows: int, seed: int) -> tuple:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, len(FEATURES))), columns=FEATURES)
+    y = X["temperature"] * 3 - X["relative_humidity"] + rng.normal(scale=0.1, size=len(X))
+    return X, y
+
+
+def build_pipeline(**estimator_params) -> Pipeline:
+    return Pipeline(
+        [
+            ("data_preprocessor", DataPreprocessor()),
+            ("processing_pipeline", ProcessingPipeline({"normalization_method": "STANDARDIZE"}).preprocessor),
+            ("feature_selector", VarianceThreshold()),
+            ("estimator", xgboost.XGBRegressor(max_depth=3, **estimator_params)),
+        ]
+    )
+
+
+def fit_pipeline(X, y) -> Pipeline:
+    return build_pipeline(n_estimators=20).fit(X, y)
+
+
+class TestWarmStart:
+    def test_continue_boosting(self):
+        X, y = make_data(500, seed=0)
+        pipeline = fit_pipeline(X, y)
+        X_new, y_new = make_data(200, seed=1)
+
+        continued = ProcessingPipeline.continue_boosting(pipeline, X_new, y_new, n_estimators=10)
+        assert continued.named_steps["estimator"].get_booster().num_boosted_rounds() == 30
+        # The previous pipeline is left untouched and the fitted preprocessing is reused as is
+        assert pipeline.named_steps["estimator"].get_booster().num_boosted_rounds() == 20
+        scalers = [
+            model.named_steps["processing_pipeline"].named_transformers_["numeric"].named_steps["scaler"]
+            for model in (pipeline, continued)
+        ]
+        np.testing.assert_array_equal(scalers[0].mean_, scalers[1].mean_)
+
+    def test_continue_boosting_with_early_stopping(self):
+        X, y = make_data(500, seed=0)
+        pipeline = fit_pipeline(X, y)
+        X_new, y_new = make_data(300, seed=1)
+
+        continued = ProcessingPipeline.continue_boosting(
+            pipeline,
+            X_new.iloc[:200],
+            y_new.iloc[:200],
+            n_estimators=500,
+            X_valid=X_new.iloc[200:],
+            y_valid=y_new.iloc[200:],
+            early_stopping_rounds=5,
+        )
+        estimator = continued.named_steps["estimator"]
+        # Only the trees up to the best iteration are kept, and at least one was added
+        assert 20 < estimator.get_booster().num_boosted_rounds() == estimator.best_iteration + 1 <= 520
+
+    def test_continue_early_stopped_model_without_early_stopping(self):
+        X, y = make_data(500, seed=0)
+        pipeline = build_pipeline(n_estimators=500, early_stopping_rounds=5)
+        ProcessingPipeline.fit_with_early_stopping(pipeline, X.iloc[:400], y.iloc[:400], X.iloc[400:], y.iloc[400:])
+        trees = pipeline.named_steps["estimator"].get_booster().num_boosted_rounds()
+        X_new, y_new = make_data(200, seed=1)
+
+        continued = ProcessingPipeline.continue_boosting(pipeline, X_new, y_new, n_estimators=10)
+        booster = continued.named_steps["estimator"].get_booster()
+        assert booster.num_boosted_rounds() == trees + 10
+        # The previous best iteration isn't carried over, the continued model ends at its last round
+        best_iteration = booster.attr("best_iteration")
+        assert best_iteration is None or int(best_iteration) == booster.num_boosted_rounds() - 1
+        # Predictions use all the trees, including the added ones
+        X_transformed = continued[:-1].transform(X_new)
+        all_trees = booster.predict(xgboost.DMatrix(X_transformed), iteration_range=(0, trees + 10))
+        np.testing.assert_allclose(continued.predict(X_new), all_trees, rtol=1e-6)
+        assert not np.allclose(continued.predict(X_new), pipeline.predict(X_new))